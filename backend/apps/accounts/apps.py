@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class AccountsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.accounts"   # <-- IMPORTANT (was "accounts")
-    # optional: label = "accounts"
\ No newline at end of file
+    # optional: label = "accounts"
+
+    def ready(self):
+        from . import signals  # noqa: F401
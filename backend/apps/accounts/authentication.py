@@ -0,0 +1,140 @@
+# apps/accounts/authentication.py
+"""
+Token authentication with a process-local cache.
+
+DRF's TokenAuthentication joins Token to User on every request. Here a hit
+is served from a bounded LRU (keyed by a SHA-256 of the token, so raw keys
+are never held as dict keys) and costs no query. Entries live for
+AUTH_TOKEN_CACHE_TTL seconds.
+
+Logout, token deletion and any save of the user (deactivation, staff flag,
+password) drop that user's entries in this process via signals. Other worker
+processes catch up when their entry expires, so keep the TTL short.
+
+Each hit returns a fresh User instance built from the cached field values, so
+relation caches (request.user.wallet, ...) never leak between requests.
+
+Optional expiry: with AUTH_TOKEN_TTL set (seconds), tokens older than that
+are rejected and deleted; LoginView then issues a new one.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+
+def token_expired(created, now=None) -> bool:
+    ttl = getattr(settings, "AUTH_TOKEN_TTL", None)
+    if not ttl:
+        return False
+    return created + timedelta(seconds=ttl) <= (now or timezone.now())
+
+
+class TokenCache:
+    """Thread-safe LRU of token hash -> (user_id, field values, token created, expires)."""
+
+    def __init__(self, maxsize=10_000, ttl=60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._by_user = {}   # user_id -> {token hash}
+
+    @staticmethod
+    def digest(key):
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def get(self, digest):
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                return None
+            if entry[3] <= time.monotonic():
+                self._drop(digest)
+                return None
+            self._entries.move_to_end(digest)
+            return entry
+
+    def set(self, digest, user_id, values, created):
+        with self._lock:
+            self._drop(digest)
+            self._entries[digest] = (user_id, values, created, time.monotonic() + self.ttl)
+            self._by_user.setdefault(user_id, set()).add(digest)
+            while len(self._entries) > self.maxsize:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, digest):
+        entry = self._entries.pop(digest, None)
+        if entry is not None:
+            digests = self._by_user.get(entry[0])
+            if digests is not None:
+                digests.discard(digest)
+                if not digests:
+                    del self._by_user[entry[0]]
+
+    def invalidate_key(self, key):
+        with self._lock:
+            self._drop(self.digest(key))
+
+    def invalidate_user(self, user_id):
+        with self._lock:
+            for digest in list(self._by_user.get(user_id, ())):
+                self._drop(digest)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+token_cache = TokenCache(
+    maxsize=getattr(settings, "AUTH_TOKEN_CACHE_SIZE", 10_000),
+    ttl=getattr(settings, "AUTH_TOKEN_CACHE_TTL", 60),
+)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Drop-in replacement for TokenAuthentication backed by token_cache."""
+
+    def authenticate_credentials(self, key):
+        digest = token_cache.digest(key)
+        entry = token_cache.get(digest)
+        if entry is not None:
+            values, created = entry[1], entry[2]
+            if token_expired(created):
+                token_cache.invalidate_key(key)
+                return self._expire(key)
+            User = get_user_model()
+            user = User.from_db(DEFAULT_DB_ALIAS, [f.attname for f in User._meta.concrete_fields], values)
+            return user, self.get_model()(key=key, user=user, created=created)
+
+        model = self.get_model()
+        try:
+            token = model.objects.select_related("user").get(key=key)
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_("Invalid token."))
+        user = token.user
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+        if token_expired(token.created):
+            return self._expire(key)
+
+        values = tuple(getattr(user, f.attname) for f in user._meta.concrete_fields)
+        token_cache.set(digest, user.pk, values, token.created)
+        return user, token
+
+    def _expire(self, key):
+        self.get_model().objects.filter(key=key).delete()
+        raise exceptions.AuthenticationFailed(_("Token has expired."))
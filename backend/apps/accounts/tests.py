@@ -1,3 +1,87 @@
-from django.test import TestCase
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from .authentication import TokenCache, token_cache
+
+User = get_user_model()
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.user = User.objects.create_user("student", password="pw123456")
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def test_cache_hit_skips_token_lookup(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get("/api/accounts/me/").status_code, 200)
+        with self.assertNumQueries(0):
+            res = self.client.get("/api/accounts/me/")
+        self.assertEqual(res.json()["username"], "student")
+
+    def test_logout_invalidates(self):
+        self.client.get("/api/accounts/me/")
+        self.assertEqual(self.client.post("/api/accounts/logout/").status_code, 200)
+        self.assertEqual(self.client.get("/api/accounts/me/").status_code, 401)
+
+    def test_deactivation_invalidates(self):
+        self.client.get("/api/accounts/me/")
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get("/api/accounts/me/").status_code, 401)
+
+    def test_cached_user_is_a_fresh_instance(self):
+        from .authentication import CachedTokenAuthentication
+        auth = CachedTokenAuthentication()
+        auth.authenticate_credentials(self.token.key)
+        first, _ = auth.authenticate_credentials(self.token.key)
+        second, _ = auth.authenticate_credentials(self.token.key)
+        self.assertIsNot(first, second)
+        self.assertEqual(first.pk, second.pk)
+
+    @override_settings(AUTH_TOKEN_TTL=3600)
+    def test_expired_token_is_rejected_and_replaced_on_login(self):
+        self.client.get("/api/accounts/me/")   # cached while still valid
+        Token.objects.filter(pk=self.token.pk).update(created=timezone.now() - timedelta(hours=2))
+        token_cache.clear()
+        self.assertEqual(self.client.get("/api/accounts/me/").status_code, 401)
+        self.assertFalse(Token.objects.filter(pk=self.token.pk).exists())
+
+        res = APIClient().post("/api/accounts/login/", {"username": "student", "password": "pw123456"}, format="json")
+        self.assertNotEqual(res.json()["token"], self.token.key)
+        self.assertIn("expires_at", res.json())
+
+    @override_settings(AUTH_TOKEN_ROTATE_ON_LOGIN=True)
+    def test_login_rotates_token(self):
+        res = APIClient().post("/api/accounts/login/", {"username": "student", "password": "pw123456"}, format="json")
+        self.assertNotEqual(res.json()["token"], self.token.key)
+        self.assertEqual(self.client.get("/api/accounts/me/").status_code, 401)
+
+
+class TokenCacheTests(TestCase):
+    def test_lru_eviction_and_ttl(self):
+        cache = TokenCache(maxsize=2, ttl=60)
+        for i in range(3):
+            cache.set(f"d{i}", i, (), None)
+        self.assertIsNone(cache.get("d0"))
+        self.assertIsNotNone(cache.get("d2"))
+        self.assertEqual(len(cache), 2)
+
+        expired = TokenCache(maxsize=2, ttl=0)
+        expired.set("d", 1, (), None)
+        self.assertIsNone(expired.get("d"))
+
+    def test_invalidate_user(self):
+        cache = TokenCache()
+        cache.set("a", 1, (), None)
+        cache.set("b", 1, (), None)
+        cache.set("c", 2, (), None)
+        cache.invalidate_user(1)
+        self.assertEqual(len(cache), 1)
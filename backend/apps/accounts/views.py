@@ -1,9 +1,13 @@
+from datetime import timedelta
+
+from django.conf import settings
 from django.contrib.auth import get_user_model, authenticate
 from rest_framework import generics, permissions, status
 from rest_framework.authtoken.models import Token
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from .authentication import token_cache, token_expired
 from .serializers import RegisterSerializer, UserSerializer
 
 # Create your views here.
@@ -40,7 +44,16 @@ class LoginView(APIView):
             )
         
         token, created = Token.objects.get_or_create(user=user)
-        return Response({"token": token.key}, status=status.HTTP_200_OK)
+        if not created and (token_expired(token.created) or getattr(settings, "AUTH_TOKEN_ROTATE_ON_LOGIN", False)):
+            # Token's pk is the key itself, so rotating means delete + create
+            token.delete()
+            token = Token.objects.create(user=user)
+
+        data = {"token": token.key}
+        ttl = getattr(settings, "AUTH_TOKEN_TTL", None)
+        if ttl:
+            data["expires_at"] = (token.created + timedelta(seconds=ttl)).isoformat()
+        return Response(data, status=status.HTTP_200_OK)
 
 class MeView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -55,4 +68,5 @@ class LogoutView(APIView):
     def post(self, request):
         # delete the token (simple logout)
         Token.objects.filter(user=request.user).delete()
+        token_cache.invalidate_user(request.user.pk)
         return Response({"detail": "Logged out"}, status=status.HTTP_200_OK)
\ No newline at end of file
@@ -3,4 +3,7 @@ from django.apps import AppConfig
 # catalog/apps.py
 class CatalogConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
-    name = "apps.catalog"
\ No newline at end of file
+    name = "apps.catalog"
+
+    def ready(self):
+        from . import signals  # noqa: F401  (connects catalog version bumps)
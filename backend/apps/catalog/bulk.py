@@ -0,0 +1,182 @@
+# apps/catalog/bulk.py
+"""
+Bulk catalog import/export.
+
+A catalog row is flat: the item's fields plus its category's name (and
+optionally the category's sort order). Rows are matched to existing items by
+the natural key (category name, item name). Unknown categories are created,
+unknown items are created, and known items are updated only when a field
+actually changes.
+
+An import validates every row first and reports errors per row (1-based,
+header excluded). If any row is invalid nothing is written. Otherwise all
+writes run in one transaction: bulk_create/bulk_update in chunks of
+CHUNK_SIZE, then a single catalog version bump on commit. Bulk writes skip
+the post_save signal, so the menu snapshot is invalidated once per import,
+not once per row. dry_run=True stops after working out what would change.
+"""
+import csv
+import json
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from rest_framework import serializers
+
+from .cache import bump_catalog_version_on_commit
+from .models import Category, Item
+
+CHUNK_SIZE = 500
+ITEM_FIELDS = ("description", "price_minor", "is_active", "image_url")
+COLUMNS = ("category", "category_sort_order", "name", *ITEM_FIELDS)
+
+
+class CatalogRowSerializer(serializers.Serializer):
+    category = serializers.CharField(max_length=120)
+    category_sort_order = serializers.IntegerField(min_value=0, required=False)
+    name = serializers.CharField(max_length=200)
+    description = serializers.CharField(allow_blank=True, required=False)
+    price_minor = serializers.IntegerField(min_value=0, required=False)
+    is_active = serializers.BooleanField(required=False)
+    image_url = serializers.URLField(allow_blank=True, required=False)
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    categories_created: int = 0
+    errors: list = field(default_factory=list)   # [{"row": n, "errors": {...}}]
+    dry_run: bool = False
+
+    def as_dict(self):
+        return {
+            "created": self.created,
+            "updated": self.updated,
+            "unchanged": self.unchanged,
+            "categories_created": self.categories_created,
+            "errors": self.errors,
+            "dry_run": self.dry_run,
+        }
+
+
+def _validate(rows, result):
+    valid, seen = [], {}
+    for n, row in enumerate(rows, start=1):
+        s = CatalogRowSerializer(data=row)
+        if not s.is_valid():
+            result.errors.append({"row": n, "errors": s.errors})
+            continue
+        key = (s.validated_data["category"], s.validated_data["name"])
+        if key in seen:
+            result.errors.append({"row": n, "errors": {"name": [f"Duplicate of row {seen[key]}."]}})
+            continue
+        seen[key] = n
+        valid.append((n, s.validated_data))
+    return valid
+
+
+def import_rows(rows, dry_run=False, chunk_size=CHUNK_SIZE):
+    """Upsert catalog rows (dicts, see COLUMNS). Returns an ImportResult."""
+    result = ImportResult(dry_run=dry_run)
+    valid = _validate(rows, result)
+
+    categories = {}
+    for c in Category.objects.filter(name__in={row["category"] for _, row in valid}).order_by("id"):
+        categories.setdefault(c.name, c)   # names aren't unique in the table: the oldest wins
+    existing = {
+        (i.category.name, i.name): i
+        for i in Item.objects.filter(category__in=categories.values()).select_related("category").order_by("-id")
+    }
+
+    new_categories, moved_categories = {}, {}
+    to_create, to_update, update_fields = [], [], set()
+    for n, row in valid:
+        category = categories.get(row["category"]) or new_categories.get(row["category"])
+        sort_order = row.get("category_sort_order")
+        if category is None:
+            category = new_categories[row["category"]] = Category(name=row["category"], sort_order=sort_order or 0)
+        elif sort_order is not None and category.pk and category.sort_order != sort_order:
+            category.sort_order = sort_order
+            moved_categories[category.pk] = category
+
+        fields = {f: row[f] for f in ITEM_FIELDS if f in row}
+        item = existing.get((row["category"], row["name"]))
+        if item is None:
+            if "price_minor" not in fields:
+                result.errors.append({"row": n, "errors": {"price_minor": ["Required for a new item."]}})
+                continue
+            to_create.append((category, Item(name=row["name"], **fields)))
+            continue
+        changed = {f for f, v in fields.items() if getattr(item, f) != v}
+        if changed:
+            for f in changed:
+                setattr(item, f, fields[f])
+            to_update.append(item)
+            update_fields |= changed
+        else:
+            result.unchanged += 1
+
+    result.created = len(to_create)
+    result.updated = len(to_update)
+    result.categories_created = len(new_categories)
+    result.errors.sort(key=lambda e: e["row"])
+    if result.errors or dry_run:
+        return result
+
+    with transaction.atomic():
+        Category.objects.bulk_create(new_categories.values(), batch_size=chunk_size)
+        Category.objects.bulk_update(moved_categories.values(), ["sort_order"], batch_size=chunk_size)
+        for category, item in to_create:
+            item.category = category   # now has a pk
+        Item.objects.bulk_create([item for _, item in to_create], batch_size=chunk_size)
+        if to_update:
+            Item.objects.bulk_update(to_update, sorted(update_fields), batch_size=chunk_size)
+        if new_categories or moved_categories or to_create or to_update:
+            bump_catalog_version_on_commit()
+    return result
+
+
+def bulk_update_items(items, changes):
+    """One UPDATE over `items` (a queryset); returns the number of rows changed."""
+    with transaction.atomic():
+        count = items.update(**changes)
+        if count:
+            bump_catalog_version_on_commit()
+    return count
+
+
+# ---------- CSV / JSON ----------
+def export_rows():
+    """Every category and item as catalog rows, in menu order."""
+    items = Item.objects.select_related("category").order_by("category__sort_order", "category__name", "name")
+    for item in items.iterator(chunk_size=CHUNK_SIZE):
+        yield {
+            "category": item.category.name,
+            "category_sort_order": item.category.sort_order,
+            "name": item.name,
+            **{f: getattr(item, f) for f in ITEM_FIELDS},
+        }
+
+
+def read_csv(fh):
+    # empty cells in typed columns mean "leave as is", not "set to empty"
+    return [{k: v for k, v in row.items() if v is not None and (v != "" or k in ("description", "image_url"))}
+            for row in csv.DictReader(fh)]
+
+
+def write_csv(rows, fh):
+    writer = csv.DictWriter(fh, fieldnames=COLUMNS)
+    writer.writeheader()
+    writer.writerows(rows)
+
+
+def read_json(fh):
+    rows = json.load(fh)
+    if not isinstance(rows, list):
+        raise ValueError("Expected a JSON list of catalog rows.")
+    return rows
+
+
+def write_json(rows, fh):
+    json.dump(list(rows), fh, indent=2)
@@ -0,0 +1,112 @@
+# apps/catalog/cache.py
+"""
+Versioned menu snapshot.
+
+The public menu (active categories + their items) is serialized once per
+catalog version and kept in two places:
+  - a process-local copy (no cache round trip on the hot path)
+  - the shared Django cache (so other workers don't rebuild it)
+
+The version counter lives in the shared cache and is bumped after every
+Category/Item write commits (see signals.py). A bumped version simply makes
+the old snapshot unreachable; nothing has to be deleted.
+"""
+import hashlib
+import json
+import time
+from typing import NamedTuple
+
+from django.core.cache import cache
+from django.db import transaction
+
+VERSION_KEY = "catalog:version"
+SNAPSHOT_KEY = "catalog:menu:{version}"
+SNAPSHOT_TIMEOUT = 60 * 60 * 24
+
+
+class MenuSnapshot(NamedTuple):
+    version: int
+    etag: str
+    data: list
+
+
+# process-local copy of the latest snapshot we have seen
+_local = {"snapshot": None}
+
+
+def _fresh_version() -> int:
+    # Time based so a version lost to cache eviction is never reused.
+    return time.time_ns() // 1000
+
+
+def get_catalog_version() -> int:
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, _fresh_version(), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_catalog_version() -> None:
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, _fresh_version(), timeout=None)
+
+
+def bump_catalog_version_on_commit() -> None:
+    """Bump once the current transaction commits, so readers never cache
+    a snapshot of uncommitted (or rolled back) data under the new version."""
+    transaction.on_commit(bump_catalog_version)
+
+
+def _build_snapshot(version: int) -> MenuSnapshot:
+    # imported lazily: serializers -> models -> app registry
+    from apps.core.routers import primary_reads
+    from .serializers import menu_data
+
+    # shared with every worker under this version: never from a lagging replica
+    with primary_reads():
+        data = menu_data()  # plain lists/dicts, safe to share and pickle
+    digest = hashlib.sha1(json.dumps(data, sort_keys=True).encode()).hexdigest()
+    return MenuSnapshot(version=version, etag=f'"menu-{digest}"', data=data)
+
+
+def get_menu_snapshot() -> MenuSnapshot:
+    """Return the snapshot for the current catalog version, building it at
+    most once per version across all workers sharing the cache."""
+    version = get_catalog_version()
+
+    snapshot = _local["snapshot"]
+    if snapshot is not None and snapshot.version == version:
+        return snapshot
+
+    key = SNAPSHOT_KEY.format(version=version)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = _build_snapshot(version)
+        cache.set(key, tuple(snapshot), timeout=SNAPSHOT_TIMEOUT)
+    else:
+        snapshot = MenuSnapshot(*snapshot)
+
+    _local["snapshot"] = snapshot
+    return snapshot
+
+
+def snapshot_items(snapshot: MenuSnapshot) -> dict:
+    """{item_id: item dict + category_id/category} for every active item on the menu."""
+    items = {}
+    for category in snapshot.data:
+        for item in category["items"]:
+            if item["is_active"]:
+                items[item["id"]] = {**item, "category_id": category["id"], "category": category["name"]}
+    return items
+
+
+def get_menu_items() -> dict:
+    """snapshot_items() of the current snapshot, built once per version per process."""
+    snapshot = get_menu_snapshot()
+    cached = _local.get("items")
+    if cached is None or cached[0] != snapshot.version:
+        cached = _local["items"] = (snapshot.version, snapshot_items(snapshot))
+    return cached[1]
@@ -0,0 +1,23 @@
+import io
+
+from django.core.management.base import BaseCommand
+
+from apps.catalog import bulk
+
+
+class Command(BaseCommand):
+    help = "Write every category and item as CSV or JSON (the format import_catalog reads)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=("csv", "json"), default="csv")
+        parser.add_argument("-o", "--output", help="file to write (default: stdout)")
+
+    def handle(self, *args, **options):
+        write = bulk.write_csv if options["format"] == "csv" else bulk.write_json
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8", newline="") as fh:
+                write(bulk.export_rows(), fh)
+        else:
+            buf = io.StringIO()
+            write(bulk.export_rows(), buf)
+            self.stdout.write(buf.getvalue(), ending="")
@@ -0,0 +1,38 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.catalog import bulk
+
+
+class Command(BaseCommand):
+    help = "Upsert categories and items from a CSV or JSON file, matched by (category name, item name)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=("csv", "json"), default=None,
+                            help="default: from the file extension")
+        parser.add_argument("--dry-run", action="store_true", help="validate and report, write nothing")
+        parser.add_argument("--chunk-size", type=int, default=bulk.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        fmt = options["format"] or path.suffix.lstrip(".").lower()
+        if fmt not in ("csv", "json"):
+            raise CommandError("Use a .csv or .json file, or pass --format.")
+        try:
+            with path.open(encoding="utf-8-sig", newline="") as fh:
+                rows = bulk.read_csv(fh) if fmt == "csv" else bulk.read_json(fh)
+        except (OSError, ValueError) as exc:
+            raise CommandError(f"Can't read {path}: {exc}")
+
+        result = bulk.import_rows(rows, dry_run=options["dry_run"], chunk_size=options["chunk_size"])
+        for error in result.errors:
+            self.stderr.write(f"row {error['row']}: {json.dumps(error['errors'])}")
+        summary = (f"{result.created} created, {result.updated} updated, {result.unchanged} unchanged, "
+                   f"{result.categories_created} new categories")
+        if result.errors:
+            raise CommandError(f"{len(result.errors)} invalid row(s); nothing written ({summary} if fixed).")
+        prefix = "Dry run, nothing written: " if result.dry_run else ""
+        self.stdout.write(self.style.SUCCESS(f"{prefix}{summary}."))
@@ -0,0 +1,254 @@
+# apps/catalog/search.py
+"""
+Menu search.
+
+Each worker keeps an index of the active menu items, built from the
+versioned menu snapshot (cache.py) rather than from the Item table, so a
+query costs no database round trip and never scans a table. When the catalog
+version moves, the index is brought up to date by diffing the new snapshot
+against the items it already holds: only items whose name or description
+changed (or that appeared or disappeared) are re-indexed.
+
+Two backends, chosen with CATALOG_SEARCH_BACKEND:
+
+  "memory" (default) an inverted index term -> {item_id: weight}. Prefixes
+           are found by bisecting the sorted vocabulary (a flattened trie),
+           typos through a deletion index (every term with up to
+           MAX_EDITS characters removed) whose candidates are then checked
+           with a bounded Damerau-Levenshtein distance.
+  "fts5"   an in-memory SQLite FTS5 table per worker, ranked with bm25.
+           Prefix matching only, no typo tolerance. It never touches the
+           application database.
+
+Items are found by name, description and category name. Every word of the
+query has to match (AND). Name matches outrank the other fields, and for
+the memory backend exact > prefix > typo.
+"""
+import bisect
+import heapq
+import re
+import sqlite3
+import threading
+from itertools import combinations
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from .cache import get_menu_snapshot, snapshot_items
+
+TOKEN_RE = re.compile(r"\w+")
+MAX_QUERY_TERMS = 8
+MAX_EDITS = 2
+EXACT, PREFIX, FUZZY = 3.0, 2.0, 1.0
+NAME, DESCRIPTION = 1.0, 0.5       # field weights
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def allowed_edits(term):
+    """Typos tolerated in a query word: none below 4 letters, 2 from 8."""
+    return 0 if len(term) < 4 else 1 if len(term) < 8 else 2
+
+
+def deletions(term, edits):
+    """term with up to `edits` characters removed (term itself included)."""
+    out = {term}
+    for n in range(1, min(edits, len(term) - 1) + 1):
+        for drop in combinations(range(len(term)), n):
+            out.add("".join(c for i, c in enumerate(term) if i not in drop))
+    return out
+
+
+def edit_distance(a, b, limit):
+    """Damerau-Levenshtein (adjacent swaps count once); limit + 1 once it's over."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2, prev = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = a[i - 1] != b[j - 1]
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > limit and min(prev) > limit:   # a swap can still reach back one row
+            return limit + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+def _text(item):
+    return item["name"], item["description"], item["category"]
+
+
+class _Index:
+    """Keeps `items` in step with the menu snapshot; subclasses index the text."""
+
+    def __init__(self):
+        self.version = None
+        self.items = {}
+
+    def sync(self, snapshot):
+        items = snapshot_items(snapshot)
+        for item_id, old in self.items.items():
+            new = items.get(item_id)
+            if new is None or _text(new) != _text(old):
+                self._remove(item_id, old)
+        for item_id, new in items.items():
+            old = self.items.get(item_id)
+            if old is None or _text(new) != _text(old):
+                self._add(item_id, new)
+        self.items = items
+        self.version = snapshot.version
+
+    def _add(self, item_id, item):
+        raise NotImplementedError
+
+    def _remove(self, item_id, item):
+        raise NotImplementedError
+
+    def search(self, query, limit):
+        raise NotImplementedError
+
+
+class MemoryIndex(_Index):
+    def __init__(self):
+        super().__init__()
+        self.postings = {}     # term -> {item_id: field weight}
+        self.vocabulary = []   # sorted terms
+        self.variants = {}     # deletion variant -> {terms}
+        self.rank = {}         # item_id -> position by name, the tie-breaker
+
+    def sync(self, snapshot):
+        super().sync(snapshot)
+        by_name = sorted(self.items, key=lambda i: (self.items[i]["name"].lower(), i))
+        self.rank = {item_id: n for n, item_id in enumerate(by_name)}
+
+    @staticmethod
+    def _terms(item):
+        weights = dict.fromkeys(tokenize(f'{item["category"]} {item["description"]}'), DESCRIPTION)
+        weights.update(dict.fromkeys(tokenize(item["name"]), NAME))
+        return weights
+
+    def _add(self, item_id, item):
+        for term, weight in self._terms(item).items():
+            posting = self.postings.get(term)
+            if posting is None:
+                posting = self.postings[term] = {}
+                bisect.insort(self.vocabulary, term)
+                for variant in deletions(term, MAX_EDITS):
+                    self.variants.setdefault(variant, set()).add(term)
+            posting[item_id] = weight
+
+    def _remove(self, item_id, item):
+        for term in self._terms(item):
+            posting = self.postings[term]
+            del posting[item_id]
+            if posting:
+                continue
+            del self.postings[term]
+            del self.vocabulary[bisect.bisect_left(self.vocabulary, term)]
+            for variant in deletions(term, MAX_EDITS):
+                terms = self.variants[variant]
+                terms.discard(term)
+                if not terms:
+                    del self.variants[variant]
+
+    def _expand(self, word):
+        """{term: match score} for every indexed term that `word` can stand for."""
+        matches = {}
+        edits = allowed_edits(word)
+        if edits:
+            candidates = set()
+            for variant in deletions(word, edits):
+                candidates |= self.variants.get(variant, set())
+            for term in candidates:
+                if edit_distance(word, term, edits) <= edits:
+                    matches[term] = FUZZY
+        start = bisect.bisect_left(self.vocabulary, word)
+        for term in self.vocabulary[start:bisect.bisect_left(self.vocabulary, word + "\uffff")]:
+            matches[term] = PREFIX
+        if word in self.postings:
+            matches[word] = EXACT
+        return matches
+
+    def search(self, query, limit):
+        scores = None
+        for word in tokenize(query)[:MAX_QUERY_TERMS]:
+            word_scores = {}
+            for term, score in self._expand(word).items():
+                posting = self.postings[term]
+                if not word_scores:
+                    word_scores = {item_id: score * weight for item_id, weight in posting.items()}
+                    continue
+                for item_id, weight in posting.items():
+                    if score * weight > word_scores.get(item_id, 0):
+                        word_scores[item_id] = score * weight
+            if scores is None:
+                scores = word_scores
+            else:
+                if len(word_scores) < len(scores):
+                    scores, word_scores = word_scores, scores
+                scores = {i: s + word_scores[i] for i, s in scores.items() if i in word_scores}
+            if not scores:
+                return []
+        if not scores:
+            return []
+        rank = self.rank
+        best = heapq.nsmallest(limit, [(-score, rank[i], i) for i, score in scores.items()])
+        return [self.items[i] for _, _, i in best]
+
+
+class Fts5Index(_Index):
+    def __init__(self):
+        super().__init__()
+        self.db = sqlite3.connect(":memory:", check_same_thread=False)
+        try:
+            self.db.execute("CREATE VIRTUAL TABLE menu USING fts5(name, description, category, prefix='2 3')")
+        except sqlite3.OperationalError as exc:
+            raise ImproperlyConfigured("CATALOG_SEARCH_BACKEND = 'fts5' needs SQLite built with FTS5.") from exc
+
+    def _add(self, item_id, item):
+        self.db.execute("INSERT INTO menu (rowid, name, description, category) VALUES (?, ?, ?, ?)",
+                        (item_id, *_text(item)))
+
+    def _remove(self, item_id, item):
+        self.db.execute("DELETE FROM menu WHERE rowid = ?", (item_id,))
+
+    def search(self, query, limit):
+        words = tokenize(query)[:MAX_QUERY_TERMS]
+        if not words:
+            return []
+        match = " ".join(f'"{w}"*' for w in words)
+        rows = self.db.execute(
+            "SELECT rowid FROM menu WHERE menu MATCH ? ORDER BY bm25(menu, 2.0, 1.0, 1.0) LIMIT ?", (match, limit))
+        return [self.items[item_id] for item_id, in rows]
+
+
+BACKENDS = {"memory": MemoryIndex, "fts5": Fts5Index}
+
+# this worker's index; rebuilt from scratch only when the backend setting changes
+_local = {"index": None}
+_lock = threading.Lock()
+
+
+def search_backend():
+    name = getattr(settings, "CATALOG_SEARCH_BACKEND", "memory")
+    if name not in BACKENDS:
+        raise ImproperlyConfigured(f"Unknown CATALOG_SEARCH_BACKEND {name!r}; use one of {sorted(BACKENDS)}.")
+    return BACKENDS[name]
+
+
+def search_menu(query, limit=20):
+    """Active items matching every word of `query`, best first."""
+    snapshot = get_menu_snapshot()
+    backend = search_backend()
+    with _lock:
+        index = _local["index"]
+        if type(index) is not backend:
+            index = _local["index"] = backend()
+        if index.version != snapshot.version:
+            index.sync(snapshot)
+        return index.search(query, limit)
@@ -1,10 +1,13 @@
 from rest_framework import serializers
 from .models import Category, Item
 
+ITEM_FIELDS = ("id", "name", "description", "price_minor", "is_active", "image_url")
+
+
 class ItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = Item
-        fields = ["id", "name", "description", "price_minor", "is_active", "image_url"]
+        fields = list(ITEM_FIELDS)
 
 class CategorySerializer(serializers.ModelSerializer):
     items = ItemSerializer(many=True, read_only=True)
@@ -12,3 +15,21 @@ class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ["id", "name", "is_active", "sort_order", "items"]
+
+
+def menu_data():
+    """
+    CategorySerializer(active categories, many=True).data as plain dicts,
+    from two values() queries: no model instances, no per-field serializer
+    calls. Same keys, order and values as the serializer.
+    """
+    categories = {
+        row["id"]: {**row, "items": []}
+        for row in Category.objects.filter(is_active=True).order_by("sort_order", "name")
+        .values("id", "name", "is_active", "sort_order")
+    }
+    # within one category Item's default ordering comes down to the name
+    items = Item.objects.filter(category_id__in=list(categories)).order_by("name")
+    for category_id, *values in items.values_list("category_id", *ITEM_FIELDS):
+        categories[category_id]["items"].append(dict(zip(ITEM_FIELDS, values)))
+    return list(categories.values())
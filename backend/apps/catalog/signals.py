@@ -0,0 +1,16 @@
+# apps/catalog/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import bump_catalog_version_on_commit
+from .models import Category, Item
+
+
+# Covers the admin viewsets, Django admin and any other model save/delete.
+# Queryset .update()/.bulk_* skip signals and must bump the version themselves.
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Item)
+@receiver(post_delete, sender=Item)
+def catalog_changed(sender, **kwargs):
+    bump_catalog_version_on_commit()
@@ -1,3 +1,214 @@
-from django.test import TestCase
+import os
+import tempfile
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from .cache import get_catalog_version
+from .models import Category, Item
+from .search import edit_distance
+from .serializers import CategorySerializer, menu_data
+
+User = get_user_model()
+
+
+class MenuSnapshotTests(TestCase):
+    url = "/api/catalog/categories/"
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("student", password="pw123456"))
+        self.drinks = Category.objects.create(name="Drinks", sort_order=1)
+        self.food = Category.objects.create(name="Food", sort_order=2)
+        for i in range(3):
+            Item.objects.create(category=self.drinks, name=f"Drink {i}", price_minor=500 + i)
+            Item.objects.create(category=self.food, name=f"Wrap {i}", price_minor=1500 + i)
+
+    def test_snapshot_matches_serializer_output(self):
+        res = self.client.get(self.url)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual([c["name"] for c in res.json()], ["Drinks", "Food"])
+        self.assertEqual(len(res.json()[1]["items"]), 3)
+        self.assertTrue(res["ETag"].startswith('"menu-'))
+
+    def test_menu_data_renders_like_category_serializer(self):
+        Item.objects.create(category=self.food, name="Çay — sold out", price_minor=300, is_active=False,
+                            image_url="https://example.com/çay.png")
+        Category.objects.create(name="Hidden", is_active=False)
+        empty = Category.objects.create(name="Empty", sort_order=3)
+        categories = Category.objects.filter(is_active=True).order_by("sort_order", "name").prefetch_related("items")
+        expected = CategorySerializer(categories, many=True).data
+        with self.assertNumQueries(2):
+            data = menu_data()
+        self.assertEqual(data[-1], {"id": empty.id, "name": "Empty", "is_active": True, "sort_order": 3, "items": []})
+        self.assertEqual(JSONRenderer().render(data), JSONRenderer().render(expected))
+
+    def test_steady_state_serves_without_queries(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(0):
+            res = self.client.get(self.url)
+        self.assertEqual(res.status_code, 200)
+
+    def test_matching_etag_returns_304(self):
+        etag = self.client.get(self.url)["ETag"]
+        with self.assertNumQueries(0):
+            res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 304)
+        self.assertEqual(res["ETag"], etag)
+
+    def test_item_write_bumps_version_after_commit(self):
+        etag = self.client.get(self.url)["ETag"]
+        version = get_catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            Item.objects.filter(category=self.food).first().delete()
+        self.assertNotEqual(get_catalog_version(), version)
+
+        res = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertNotEqual(res["ETag"], etag)
+        self.assertEqual(len(res.json()[1]["items"]), 2)
+
+    def test_admin_viewset_write_invalidates_snapshot(self):
+        admin = User.objects.create_user("admin", password="pw123456", is_staff=True)
+        self.client.get(self.url)
+        self.client.force_authenticate(admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self.client.patch(f"/api/catalog/admin/categories/{self.food.id}/",
+                                    {"is_active": False}, format="json")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual([c["name"] for c in self.client.get(self.url).json()], ["Drinks"])
+
+
+class CatalogBulkTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user("admin", password="pw123456", is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.food = Category.objects.create(name="Food", sort_order=1)
+        self.wrap = Item.objects.create(category=self.food, name="Wrap", price_minor=1500)
+        self.soup = Item.objects.create(category=self.food, name="Soup", price_minor=900)
+
+    def test_import_upserts_by_natural_key_and_bumps_version_once(self):
+        version = get_catalog_version()
+        rows = [
+            {"category": "Food", "name": "Wrap", "price_minor": 1600},           # update
+            {"category": "Food", "name": "Soup", "price_minor": 900},            # unchanged
+            {"category": "Drinks", "category_sort_order": 2, "name": "Tea", "price_minor": 300},
+            {"category": "Drinks", "name": "Juice", "price_minor": 700, "is_active": False},
+        ]
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            res = self.client.post("/api/catalog/admin/items/import/", rows, format="json")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual({k: res.json()[k] for k in ("created", "updated", "unchanged", "categories_created")},
+                         {"created": 2, "updated": 1, "unchanged": 1, "categories_created": 1})
+        self.assertEqual(len(callbacks), 1)
+        self.assertNotEqual(get_catalog_version(), version)
+        self.wrap.refresh_from_db()
+        self.assertEqual(self.wrap.price_minor, 1600)
+        self.assertEqual(Item.objects.get(name="Juice").category.sort_order, 2)
+
+    def test_errors_per_row_and_nothing_written(self):
+        rows = [
+            {"category": "Food", "name": "Wrap", "price_minor": -5},
+            {"category": "Food", "name": "Pasta"},                         # new item needs a price
+            {"category": "Food", "name": "Salad", "price_minor": 800},
+            {"category": "Food", "name": "Salad", "price_minor": 850},
+        ]
+        res = self.client.post("/api/catalog/admin/items/import/", rows, format="json")
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual([e["row"] for e in res.json()["errors"]], [1, 2, 4])
+        self.assertIn("price_minor", res.json()["errors"][0]["errors"])
+        self.assertFalse(Item.objects.filter(name="Salad").exists())
+
+    def test_dry_run_and_csv(self):
+        body = "category,name,price_minor,is_active\nFood,Wrap,,false\nFood,Salad,800,\n"
+        res = self.client.post("/api/catalog/admin/items/import/?dry_run=1", body, content_type="text/csv")
+        self.assertEqual((res.json()["created"], res.json()["updated"], res.json()["dry_run"]), (1, 1, True))
+        self.assertFalse(Item.objects.filter(name="Salad").exists())
+        self.client.post("/api/catalog/admin/items/import/", body, content_type="text/csv")
+        self.wrap.refresh_from_db()
+        self.assertEqual((self.wrap.price_minor, self.wrap.is_active), (1500, False))
+
+    def test_bulk_update_category(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            res = self.client.post("/api/catalog/admin/items/bulk-update/",
+                                   {"category_id": self.food.id, "is_active": False}, format="json")
+        self.assertEqual(res.json(), {"updated": 2})
+        self.assertEqual(len(callbacks), 1)
+        self.assertFalse(Item.objects.filter(is_active=True).exists())
+        res = self.client.post("/api/catalog/admin/items/bulk-update/", {"ids": [self.wrap.id]}, format="json")
+        self.assertEqual(res.status_code, 400)
+
+    def test_export_round_trips_through_command(self):
+        out = StringIO()
+        call_command("export_catalog", stdout=out)
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as fh:
+            fh.write(out.getvalue().replace("Wrap,,1500", "Wrap,,1750"))
+        self.addCleanup(os.remove, fh.name)
+        result = StringIO()
+        call_command("import_catalog", fh.name, stdout=result)
+        self.assertIn("0 created, 1 updated, 1 unchanged", result.getvalue())
+        self.assertEqual(self.client.get("/api/catalog/admin/items/export/?as=json").json()[1]["price_minor"], 1750)
+        self.client.force_authenticate(User.objects.create_user("student"))
+        self.assertEqual(self.client.get("/api/catalog/admin/items/export/").status_code, 403)
+
+
+class MenuSearchTests(TestCase):
+    url = "/api/catalog/search/"
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("student", password="pw123456"))
+        self.food = Category.objects.create(name="Food", sort_order=1)
+        self.drinks = Category.objects.create(name="Drinks", sort_order=2)
+        self.wrap = Item.objects.create(category=self.food, name="Chicken Wrap", price_minor=1500,
+                                        description="Grilled chicken, garlic sauce")
+        Item.objects.create(category=self.food, name="Falafel Wrap", price_minor=1200, description="With tahini")
+        Item.objects.create(category=self.food, name="Chicken Soup", price_minor=900)
+        Item.objects.create(category=self.drinks, name="Mint Tea", price_minor=300)
+        Item.objects.create(category=self.drinks, name="Old Lemonade", price_minor=400, is_active=False)
+
+    def _names(self, q, **params):
+        return [r["name"] for r in self.client.get(self.url, {"q": q, **params}).json()["results"]]
+
+    def test_prefix_and_every_word_must_match(self):
+        self.assertEqual(self._names("chick"), ["Chicken Soup", "Chicken Wrap"])
+        self.assertEqual(self._names("chicken wr"), ["Chicken Wrap"])
+        self.assertEqual(self._names("wrap garlic"), ["Chicken Wrap"])
+        self.assertEqual(self._names("drinks"), ["Mint Tea"])          # category name, inactive item left out
+        self.assertEqual(self._names(""), [])
+
+    def test_typos_and_ranking(self):
+        self.assertEqual(self._names("chiken"), ["Chicken Soup", "Chicken Wrap"])
+        self.assertEqual(self._names("flafel"), ["Falafel Wrap"])
+        self.assertEqual(self._names("tahini"), ["Falafel Wrap"])     # description only
+        self.assertEqual(self._names("wrap", limit=1), ["Chicken Wrap"])
+        self.assertEqual(edit_distance("tea", "eta", 1), 1)           # a swap is one edit
+        self.assertEqual(edit_distance("soup", "wrap", 1), 2)
+
+    def test_index_follows_catalog_version_without_queries(self):
+        self.assertEqual(self._names("halloumi"), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.wrap.name = "Halloumi Wrap"
+            self.wrap.save()
+            Item.objects.create(category=self.drinks, name="Iced Tea", price_minor=350)
+        self.assertEqual(self._names("halloumi"), ["Halloumi Wrap"])
+        self.assertEqual(self._names("tea"), ["Iced Tea", "Mint Tea"])
+        self.assertEqual(self._names("chicken"), ["Chicken Soup", "Halloumi Wrap"])   # still in its description
+        with self.assertNumQueries(0):
+            res = self.client.get(self.url, {"q": "wrap"})
+        self.assertEqual(res.json()["results"][0]["category_id"], self.food.id)
+
+    @override_settings(CATALOG_SEARCH_BACKEND="fts5")
+    def test_fts5_backend(self):
+        self.assertEqual(set(self._names("chick")), {"Chicken Soup", "Chicken Wrap"})
+        self.assertEqual(self._names("mint"), ["Mint Tea"])
+        self.assertEqual(self._names("chiken"), [])                   # no typo tolerance
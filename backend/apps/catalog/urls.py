@@ -1,6 +1,7 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import CategoryListView, ItemListView, ItemDetailView, CategoryAdminViewSet, ItemAdminViewSet
+from .views import (CategoryListView, ItemListView, ItemDetailView, MenuSearchView, RecommendationsView,
+                    CategoryAdminViewSet, ItemAdminViewSet)
 
 router = DefaultRouter()
 router.register(r'admin/categories', CategoryAdminViewSet, basename='admin-categories')
@@ -9,6 +10,8 @@ router.register(r'admin/items', ItemAdminViewSet, basename='admin-items')
 urlpatterns = [
     path("categories/", CategoryListView.as_view(), name="catalog-categories"),
     path("items/", ItemListView.as_view(), name="catalog-items"),
+    path("search/", MenuSearchView.as_view(), name="catalog-search"),
+    path("recommendations/", RecommendationsView.as_view(), name="catalog-recommendations"),
     path("items/<int:pk>/", ItemDetailView.as_view(), name="catalog-item-detail"),
         path("", include(router.urls)),
 
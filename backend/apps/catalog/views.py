@@ -1,18 +1,52 @@
 # apps/catalog/views.py
-from rest_framework import generics, viewsets
-from rest_framework.permissions import BasePermission, SAFE_METHODS
+import io
 
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from rest_framework import generics, serializers, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ParseError
+from rest_framework.permissions import BasePermission, IsAdminUser, SAFE_METHODS
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from apps.core.routers import ReplicaReadMixin
+from apps.orders.recommendations import recommendations_for
+from . import bulk
+from .cache import get_menu_snapshot
 from .models import Category, Item
+from .search import search_menu
 from .serializers import CategorySerializer, ItemSerializer
 
 
 # ---------- Public, read-only endpoints ----------
-class CategoryListView(generics.ListAPIView):
+class CategoryListView(ReplicaReadMixin, generics.ListAPIView):
+    """
+    Served from the versioned menu snapshot (see cache.py): no DB queries
+    in steady state, a 304 when the client's ETag is still current, and
+    the body compressed once per version (see core/compression.py).
+    """
     queryset = Category.objects.filter(is_active=True).order_by("sort_order", "name")
     serializer_class = CategorySerializer
 
+    def list(self, request, *args, **kwargs):
+        snapshot = get_menu_snapshot()
+        headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+        # weak comparison: a compressed copy of the menu carries W/"menu-..."
+        precondition = get_conditional_response(request, etag=snapshot.etag)
+        if precondition is not None:   # 304, or 412 for a failed If-Match
+            return Response(status=precondition.status_code, headers=headers)
+        response = Response(snapshot.data, headers=headers)
+        renderer = request.accepted_renderer
+        # only the default compact JSON is the same bytes for every request of a
+        # version; ?indent, the browsable API etc. are compressed per request
+        if isinstance(renderer, JSONRenderer) and renderer.get_indent(request.accepted_media_type, {}) is None:
+            response.compression_key = snapshot.etag
+        return response
+
 
-class ItemListView(generics.ListAPIView):
+class ItemListView(ReplicaReadMixin, generics.ListAPIView):
     serializer_class = ItemSerializer
 
     def get_queryset(self):
@@ -23,6 +57,36 @@ class ItemListView(generics.ListAPIView):
         return qs
 
 
+class MenuSearchView(ReplicaReadMixin, generics.GenericAPIView):
+    """
+    GET ?q=&limit= : active items matching every word of q, best first, with
+    prefix and typo tolerance. Answered from the per-worker search index
+    (see search.py), which is rebuilt from the menu snapshot, so no DB
+    queries in steady state.
+    """
+    MAX_LIMIT = 50
+
+    def get(self, request, *args, **kwargs):
+        query = request.query_params.get("q", "").strip()
+        try:
+            limit = int(request.query_params.get("limit", 20))
+        except ValueError:
+            raise ParseError("limit must be an integer.")
+        limit = max(1, min(limit, self.MAX_LIMIT))
+        return Response({"query": query, "results": search_menu(query, limit) if query else []})
+
+
+class RecommendationsView(ReplicaReadMixin, APIView):
+    """
+    GET: the user's usual items and combos plus what's popular at this
+    hour. Two primary key reads of rows built by `manage.py
+    build_recommendations`; items come from the menu snapshot.
+    """
+
+    def get(self, request):
+        return Response(recommendations_for(request.user))
+
+
 class ItemDetailView(generics.RetrieveAPIView):
     queryset = Item.objects.all()
     serializer_class = ItemSerializer
@@ -43,7 +107,63 @@ class CategoryAdminViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAdminOrReadOnly]
 
 
+class BulkItemUpdateSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, max_length=5000)
+    category_id = serializers.IntegerField(required=False)
+    price_minor = serializers.IntegerField(min_value=0, required=False)
+    is_active = serializers.BooleanField(required=False)
+
+    def validate(self, data):
+        if ("ids" in data) == ("category_id" in data):
+            raise serializers.ValidationError("Give either ids or category_id.")
+        if "price_minor" not in data and "is_active" not in data:
+            raise serializers.ValidationError("Nothing to change: set price_minor and/or is_active.")
+        return data
+
+
 class ItemAdminViewSet(viewsets.ModelViewSet):
     queryset = Item.objects.select_related("category").order_by("category__sort_order", "name")
     serializer_class = ItemSerializer
     permission_classes = [IsAdminOrReadOnly]
+
+    @action(detail=False, methods=["post"], url_path="import")
+    def import_catalog(self, request):
+        """
+        POST /api/catalog/admin/items/import/[?dry_run=1]
+        Body: a JSON list of catalog rows (see apps.catalog.bulk), or text/csv.
+        """
+        if request.content_type.startswith("text/csv"):
+            rows = bulk.read_csv(io.StringIO(request.body.decode("utf-8-sig")))
+        elif isinstance(request.data, list):
+            rows = request.data
+        else:
+            return Response({"detail": "Send a JSON list of rows or text/csv."}, status=status.HTTP_400_BAD_REQUEST)
+        dry_run = request.query_params.get("dry_run") in ("1", "true")
+        result = bulk.import_rows(rows, dry_run=dry_run)
+        code = status.HTTP_400_BAD_REQUEST if result.errors else status.HTTP_200_OK
+        return Response(result.as_dict(), status=code)
+
+    @action(detail=False, methods=["post"], url_path="bulk-update")
+    def bulk_update(self, request):
+        """
+        POST /api/catalog/admin/items/bulk-update/
+        Body: {"category_id": 3, "is_active": false} or {"ids": [1, 2], "price_minor": 1500}
+        One UPDATE and one menu invalidation for the whole set.
+        """
+        s = BulkItemUpdateSerializer(data=request.data)
+        s.is_valid(raise_exception=True)
+        data = s.validated_data
+        items = Item.objects.filter(id__in=data["ids"]) if "ids" in data else Item.objects.filter(
+            category_id=data["category_id"])
+        changes = {f: data[f] for f in ("price_minor", "is_active") if f in data}
+        return Response({"updated": bulk.bulk_update_items(items, changes)})
+
+    @action(detail=False, methods=["get"], permission_classes=[IsAdminUser])
+    def export(self, request):
+        """GET /api/catalog/admin/items/export/[?as=json] (CSV by default; inactive items included)."""
+        if request.query_params.get("as") == "json":
+            return Response(list(bulk.export_rows()))
+        response = HttpResponse(content_type="text/csv")
+        response["Content-Disposition"] = 'attachment; filename="catalog.csv"'
+        bulk.write_csv(bulk.export_rows(), response)
+        return response
@@ -0,0 +1,10 @@
+from django.contrib import admin
+
+from .models import IdempotencyKey
+
+
+@admin.register(IdempotencyKey)
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+    list_display = ("scope", "key", "user", "status_code", "created_at", "expires_at")
+    list_filter = ("scope",)
+    search_fields = ("key", "user__username")
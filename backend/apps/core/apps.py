@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+# core/apps.py
+class CoreConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "apps.core"
+
+    def ready(self):
+        from . import instrumentation, metrics  # noqa: F401  (install the DB execute wrappers)
@@ -0,0 +1,137 @@
+# apps/core/compression.py
+"""
+Response compression.
+
+CompressionMiddleware encodes GET/HEAD responses with brotli when the
+client accepts it and the `brotli` (or `brotlicffi`) package is installed,
+otherwise with gzip, and leaves them alone when the client accepts
+neither. Only compressible content types are touched, and only bodies of
+at least COMPRESSION_MIN_SIZE bytes: below that the saving doesn't pay for
+the work. Unsafe methods are never compressed, so a response carrying a
+secret (login) can't be probed by mixing in attacker-chosen input (BREACH).
+Streaming responses pass through untouched: the order event stream has to
+reach the client event by event.
+
+Views whose body only changes with a version can set
+`response.compression_key` (the menu sets its snapshot ETag). Bodies with a
+key are compressed once per key, content type and encoding at the highest
+level and kept in a small process-local LRU, so the menu is sent
+precompressed instead of recompressed on every request. The key must pin
+down the bytes: a view only sets it for a rendering that doesn't vary per
+request (the menu: compact JSON, not ?indent or the browsable API).
+
+Compressing a response turns a strong ETag weak (the bytes differ per
+encoding); conditional.py and the menu compare ETags weakly.
+"""
+import gzip
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+
+try:
+    import brotli
+except ImportError:   # optional: same API in the cffi build, else gzip only
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "application/xml", "image/svg+xml")
+# (level per request, level for bodies compressed once per key)
+GZIP_LEVELS = (6, 9)
+BROTLI_QUALITY = (4, 11)
+CACHE_SIZE = 32
+
+
+def accepted_encodings(header):
+    """Codings in an Accept-Encoding header with a non-zero q, as a set."""
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.strip().lower().partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding and q > 0:
+            accepted.add(coding.strip())
+    return accepted
+
+
+def choose_encoding(header):
+    accepted = accepted_encodings(header)
+    if brotli is not None and ("br" in accepted or "*" in accepted):
+        return "br"
+    if "gzip" in accepted or "*" in accepted:
+        return "gzip"
+    return None
+
+
+def compress(content, encoding, precompress=False):
+    if encoding == "br":
+        return brotli.compress(content, quality=BROTLI_QUALITY[precompress])
+    # mtime=0: the same body always gives the same bytes
+    return gzip.compress(content, compresslevel=GZIP_LEVELS[precompress], mtime=0)
+
+
+# (compression_key, content type, encoding) -> compressed body
+_precompressed = OrderedDict()
+_lock = threading.Lock()
+
+
+def precompressed(key, content, encoding):
+    with _lock:
+        body = _precompressed.get(key)
+        if body is not None:
+            _precompressed.move_to_end(key)
+            return body
+    body = compress(content, encoding, precompress=True)
+    with _lock:
+        _precompressed[key] = body
+        while len(_precompressed) > CACHE_SIZE:
+            _precompressed.popitem(last=False)
+    return body
+
+
+def clear():
+    with _lock:
+        _precompressed.clear()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+
+    def process_response(self, request, response):
+        if request.method not in ("GET", "HEAD") or response.streaming or response.has_header("Content-Encoding"):
+            return response
+        content_type = response.get("Content-Type", "")
+        if not content_type.startswith(COMPRESSIBLE_TYPES):
+            return response
+        if len(response.content) < getattr(settings, "COMPRESSION_MIN_SIZE", 1024):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = choose_encoding(request.headers.get("Accept-Encoding", ""))
+        if encoding is None:
+            return response
+
+        key = getattr(response, "compression_key", None)
+        if key is not None:
+            body = precompressed((key, content_type, encoding), response.content, encoding)
+        else:
+            body = compress(response.content, encoding)
+        if len(body) >= len(response.content):
+            return response
+
+        response.content = body
+        response["Content-Length"] = str(len(body))
+        response["Content-Encoding"] = encoding
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        return response
@@ -0,0 +1,54 @@
+# apps/core/conditional.py
+"""
+Conditional GET for per-user read endpoints.
+
+`@conditional("cart", stamp)` on an APIView's get() asks `stamp(request,
+*args, **kwargs)` for a cheap version of what get() would return: usually
+one indexed read of an updated_at or a latest id, rather than the rows and
+their serialization. The stamp becomes an ETag (hashed with the user and
+the negotiated format) and, when it carries a datetime, a Last-Modified
+header. A request whose If-None-Match / If-Modified-Since still matches
+gets a 304 without get() running; anything else runs get() and the
+headers are added to its response.
+
+Responses are `Cache-Control: private, no-cache`, so browsers keep them and
+revalidate on every use, and shared caches don't keep them at all.
+"""
+import hashlib
+from functools import wraps
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+CACHE_CONTROL = "private, no-cache"
+
+
+def conditional(prefix, stamp):
+    """stamp(request, *args, **kwargs) -> (version, last_modified or None), or None to skip."""
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            current = stamp(request, *args, **kwargs)
+            if current is None:
+                return method(view, request, *args, **kwargs)
+            version, last_modified = current
+            key = (request.user.pk, request.accepted_renderer.format, version)
+            digest = hashlib.sha1(repr(key).encode()).hexdigest()[:20]
+            headers = {"ETag": quote_etag(f"{prefix}-{digest}"), "Cache-Control": CACHE_CONTROL}
+            if last_modified is not None:
+                headers["Last-Modified"] = http_date(last_modified.timestamp())
+
+            response = get_conditional_response(
+                request, etag=headers["ETag"],
+                last_modified=int(last_modified.timestamp()) if last_modified is not None else None)
+            if response is None:
+                # stamped before reading: a write in between leaves an older tag on
+                # newer data, which the next request simply doesn't match
+                response = method(view, request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            for name, value in headers.items():
+                response.headers.setdefault(name, value)
+            return response
+        return wrapper
+    return decorator
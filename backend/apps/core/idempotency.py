@@ -0,0 +1,138 @@
+# apps/core/idempotency.py
+"""
+Idempotency-Key support for unsafe API calls.
+
+A client that may retry (flaky Wi-Fi) sends the same `Idempotency-Key` header
+with every attempt. The first attempt claims the key and runs the view; its
+response is stored next to the claim. Retries then get the stored response
+back (with an `Idempotent-Replayed: true` header) and the view does not run
+again.
+
+By default the view runs in one transaction with storing its response, so
+the response is stored exactly when the view's writes commit. Views that
+keep their own write transactions short (checkout: read-only checks first,
+then one run_write) use `@idempotent(scope, atomic=False)`: an outer atomic
+block would take the SQLite write lock at BEGIN (transaction_mode
+IMMEDIATE), hold it through the checks and make run_write run inline instead
+of on the writer queue. Their response is stored in its own short write
+once the view returns. If that write fails the response is still returned,
+and the claim stays in progress: retries get a 409 until
+IN_PROGRESS_TIMEOUT, never a second run while the first one may have
+committed.
+
+Keys are scoped per user and endpoint and expire after
+IDEMPOTENCY_KEY_TTL seconds (see `manage.py purge_idempotency_keys`).
+"""
+import hashlib
+import json
+import logging
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+from .writes import run_write
+
+HEADER = "Idempotency-Key"
+# A claim with no stored response after this long is treated as abandoned
+# (worker died mid-request) and may be taken over by a retry.
+IN_PROGRESS_TIMEOUT = timedelta(seconds=60)
+
+logger = logging.getLogger(__name__)
+
+
+def _ttl():
+    return timedelta(seconds=getattr(settings, "IDEMPOTENCY_KEY_TTL", 24 * 60 * 60))
+
+
+def _fingerprint(request) -> str:
+    body = json.dumps(request.data, sort_keys=True, default=str)
+    return hashlib.sha256(f"{request.method} {request.path}\n{body}".encode()).hexdigest()
+
+
+def _replay(record, fingerprint):
+    if record.request_hash != fingerprint:
+        return Response({"ok": False, "code": "IDEMPOTENCY_KEY_REUSED",
+                         "message": "This Idempotency-Key was already used for a different request."},
+                        status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+    if record.status_code is None:
+        return Response({"ok": False, "code": "IDEMPOTENCY_REQUEST_IN_PROGRESS",
+                         "message": "A request with this Idempotency-Key is still being processed."},
+                        status=status.HTTP_409_CONFLICT)
+    return Response(record.response_body, status=record.status_code, headers={"Idempotent-Replayed": "true"})
+
+
+def _claim(user, scope, key, fingerprint):
+    """Return (record, claimed). Expired or abandoned records are replaced."""
+    now = timezone.now()
+    lookup = {"user": user, "scope": scope, "key": key}
+    record = IdempotencyKey.objects.filter(**lookup).first()
+    if record is not None:
+        abandoned = record.status_code is None and record.created_at < now - IN_PROGRESS_TIMEOUT
+        if record.expires_at > now and not abandoned:
+            return record, False
+        IdempotencyKey.objects.filter(pk=record.pk).delete()
+    try:
+        with transaction.atomic():
+            record = IdempotencyKey.objects.create(request_hash=fingerprint, expires_at=now + _ttl(), **lookup)
+        return record, True
+    except IntegrityError:
+        # a concurrent attempt with the same key claimed it first
+        return IdempotencyKey.objects.get(**lookup), False
+
+
+def _store(record, response):
+    record.status_code = response.status_code
+    record.response_body = response.data
+    record.save(update_fields=["status_code", "response_body"])
+
+
+def idempotent(scope, atomic=True):
+    """Decorator for APIView handlers that honours the Idempotency-Key header.
+
+    Requests without the header run unchanged. 5xx responses and exceptions
+    release the key so the client can retry. atomic=False: see the module
+    docstring.
+    """
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(self, request, *args, **kwargs):
+            key = request.headers.get(HEADER)
+            if not key:
+                return handler(self, request, *args, **kwargs)
+            if len(key) > 255:
+                return Response({"detail": f"{HEADER} must be at most 255 characters."},
+                                status=status.HTTP_400_BAD_REQUEST)
+
+            fingerprint = _fingerprint(request)
+            record, claimed = _claim(request.user, scope, key, fingerprint)
+            if not claimed:
+                return _replay(record, fingerprint)
+
+            try:
+                if atomic:
+                    with transaction.atomic():
+                        response = handler(self, request, *args, **kwargs)
+                        if response.status_code < 500:
+                            _store(record, response)
+                else:
+                    response = handler(self, request, *args, **kwargs)
+            except Exception:
+                record.delete()
+                raise
+            if response.status_code >= 500:
+                record.delete()
+            elif not atomic:
+                try:
+                    run_write(_store, record, response)
+                except Exception:
+                    logger.exception("Could not store the response for %s key %r; it stays in progress",
+                                     scope, key)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,222 @@
+# apps/core/instrumentation.py
+"""
+Per-request SQL and timing instrumentation.
+
+An execute wrapper is installed on every DB connection as it is opened. While
+RequestInstrumentationMiddleware has a request in flight (tracked in a
+contextvar, so it follows sync_to_async into worker threads), the wrapper
+counts each query, adds up DB time and tallies the SQL text. Django passes
+parameters separately, so an N+1 loop shows up as the same SQL repeated.
+
+Each response gets a Server-Timing header:
+
+    Server-Timing: db;dur=3.1;desc="4 queries", dup;desc="1 repeated x12", app;dur=9.8
+
+and the numbers are added to an in-process aggregate per URL name (`cart`,
+`checkout`, `admin-dashboard`, ...), see `endpoint_stats()`.
+
+QUERY_BUDGETS in settings maps URL names to a maximum query count. A request
+over budget is logged; `QueryBudgetMixin.assertWithinQueryBudget` turns the
+same budgets into test assertions.
+"""
+import logging
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar("request_stats", default=None)
+
+# BEGIN/COMMIT/SAVEPOINT vary with the transaction nesting (tests run every
+# request inside an outer atomic), so they are timed but not counted.
+TRANSACTION_CONTROL = ("BEGIN", "COMMIT", "ROLLBACK", "SAVEPOINT", "RELEASE SAVEPOINT")
+
+
+def is_transaction_control(sql):
+    return sql.lstrip()[:17].upper().startswith(TRANSACTION_CONTROL)
+
+
+class RequestStats:
+    __slots__ = ("started", "queries", "db_time", "statements")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.statements = Counter()
+
+    def duplicates(self):
+        """(sql, count) for statements run more than once, most repeated first."""
+        return [(sql, n) for sql, n in self.statements.most_common() if n > 1]
+
+
+def record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.db_time += time.perf_counter() - started
+        if not is_transaction_control(sql):
+            stats.queries += 1
+            stats.statements[sql] += 1
+
+
+def install_execute_wrapper(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+connection_created.connect(install_execute_wrapper, dispatch_uid="core.instrumentation")
+
+
+class EndpointStats:
+    """Running totals per URL name (thread-safe)."""
+
+    FIELDS = ("requests", "queries", "db_ms", "total_ms", "max_queries", "over_budget", "with_duplicates")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rows = {}
+
+    def add(self, name, stats, total, over_budget):
+        with self._lock:
+            row = self._rows.get(name)
+            if row is None:
+                row = self._rows[name] = dict.fromkeys(self.FIELDS, 0)
+            row["requests"] += 1
+            row["queries"] += stats.queries
+            row["db_ms"] += stats.db_time * 1000
+            row["total_ms"] += total * 1000
+            row["max_queries"] = max(row["max_queries"], stats.queries)
+            row["over_budget"] += over_budget
+            row["with_duplicates"] += bool(stats.duplicates())
+
+    def snapshot(self):
+        with self._lock:
+            return {name: dict(row) for name, row in self._rows.items()}
+
+    def reset(self):
+        with self._lock:
+            self._rows.clear()
+
+
+_endpoints = EndpointStats()
+
+
+def endpoint_stats():
+    return _endpoints.snapshot()
+
+
+def reset_endpoint_stats():
+    _endpoints.reset()
+
+
+def query_budget(url_name):
+    return getattr(settings, "QUERY_BUDGETS", {}).get(url_name)
+
+
+def _server_timing(stats, total):
+    parts = [f'db;dur={stats.db_time * 1000:.1f};desc="{stats.queries} queries"']
+    duplicates = stats.duplicates()
+    if duplicates:
+        parts.append(f'dup;desc="{len(duplicates)} repeated x{duplicates[0][1]}"')
+    parts.append(f"app;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+class RequestInstrumentationMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = _current.set(stats)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, stats)
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, stats)
+
+    def _finish(self, request, response, stats):
+        total = time.perf_counter() - stats.started
+        response["Server-Timing"] = _server_timing(stats, total)
+
+        match = getattr(request, "resolver_match", None)
+        name = match.url_name if match and match.url_name else None
+        metrics.observe_request(name or "unmatched", request.method, response.status_code, total)
+        if name is None:
+            return response
+        budget = query_budget(name)
+        over_budget = budget is not None and stats.queries > budget
+        if over_budget:
+            logger.warning("%s %s ran %d queries (budget %d)", request.method, name, stats.queries, budget)
+        duplicates = stats.duplicates()
+        if duplicates and duplicates[0][1] >= getattr(settings, "QUERY_REPEAT_WARNING", 5):
+            sql, n = duplicates[0]
+            logger.warning("%s %s repeated a query %d times (possible N+1): %s", request.method, name, n, sql[:200])
+        _endpoints.add(name, stats, total, over_budget)
+        return response
+
+
+class QueryBudgetMixin:
+    """TestCase mixin: `with self.assertWithinQueryBudget("cart"): client.get(...)`."""
+
+    def assertWithinQueryBudget(self, url_name):
+        budget = query_budget(url_name)
+        if budget is None:
+            self.fail(f"No QUERY_BUDGETS entry for {url_name!r}")
+        return _BudgetContext(self, url_name, budget)
+
+
+class _BudgetContext:
+    def __init__(self, test_case, url_name, budget):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        self.test_case = test_case
+        self.url_name = url_name
+        self.budget = budget
+        self.capture = CaptureQueriesContext(connection)
+
+    def __enter__(self):
+        return self.capture.__enter__()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.capture.__exit__(exc_type, exc, tb)
+        if exc_type is not None:
+            return
+        captured = [q["sql"] for q in self.capture.captured_queries if not is_transaction_control(q["sql"])]
+        executed = len(captured)
+        if executed > self.budget:
+            queries = "\n".join(f"{i}. {sql}" for i, sql in enumerate(captured, start=1))
+            self.test_case.fail(
+                f"{self.url_name} ran {executed} queries, budget is {self.budget}:\n{queries}"
+            )
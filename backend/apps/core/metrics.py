@@ -0,0 +1,355 @@
+# apps/core/metrics.py
+"""
+Prometheus-style counters and histograms, served at /api/metrics.
+
+Values live in flat `array('d')` buffers, one per thread: every series owns a
+fixed range of slots, and a thread only ever writes its own buffer. Updating
+a metric is a dict lookup plus `arr[i] += v`, with no lock and no contention
+between worker threads. A scrape sums the buffers of all threads. A lock is
+taken only when a new label combination is seen for the first time. When a
+thread ends (runserver starts one per connection) its buffer is added into
+a shared base buffer and dropped, so buffers only exist for live threads.
+
+Multi-process servers (several gunicorn/uvicorn workers) set
+METRICS_MULTIPROCESS_DIR. Each process then writes its totals to
+`<dir>/<pid>.json` at most every METRICS_FLUSH_INTERVAL seconds (and at
+exit), and a scrape adds up every file in the directory. Empty the
+directory when deploying, as with prometheus_client's multiprocess mode.
+
+Gauges that are cheaper to read than to maintain (orders per status) are
+registered as collectors and computed at scrape time.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+import weakref
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.utils import OperationalError
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Holder:
+    """The thread-local reference to a thread's buffer; collected when the thread ends."""
+    __slots__ = ("buf", "__weakref__")
+
+    def __init__(self, buf):
+        self.buf = buf
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._buffers = []        # one array per live thread that has written
+        self._base = array("d")   # what threads that have ended wrote
+        self._size = 0            # slots allocated so far
+        self.metrics = {}       # name -> metric, in registration order
+        self.collectors = []
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self.metrics:
+                raise ValueError(f"Duplicate metric {metric.name}")
+            self.metrics[metric.name] = metric
+        return metric
+
+    def register_collector(self, fn):
+        """fn() -> iterable of (name, type, help, [(labels dict, value), ...])."""
+        self.collectors.append(fn)
+        return fn
+
+    def allocate(self, width):
+        with self._lock:
+            offset = self._size
+            self._size += width
+        return offset
+
+    def buffer(self, needed):
+        """This thread's buffer, grown to at least `needed` slots."""
+        holder = getattr(self._local, "holder", None)
+        if holder is None:
+            holder = self._local.holder = _Holder(array("d"))
+            with self._lock:
+                self._buffers.append(holder.buf)
+            weakref.finalize(holder, self._retire, holder.buf)
+        buf = holder.buf
+        if len(buf) < needed:
+            buf.extend([0.0] * (max(needed, self._size) - len(buf)))
+        return buf
+
+    def _retire(self, buf):
+        """Fold an ended thread's buffer into the base buffer."""
+        with self._lock:
+            if len(self._base) < len(buf):
+                self._base.extend([0.0] * (len(buf) - len(self._base)))
+            for i, v in enumerate(buf):
+                self._base[i] += v
+            self._buffers = [b for b in self._buffers if b is not buf]
+
+    def totals(self):
+        """{(metric name, label values): [slot values]} summed over all threads."""
+        with self._lock:
+            # a copy of the base: a thread retired mid-scrape is counted once
+            buffers = [array("d", self._base), *self._buffers]
+        out = {}
+        for metric in list(self.metrics.values()):
+            for labelvalues, child in list(metric.children.items()):
+                values = [0.0] * metric.width
+                for buf in buffers:
+                    chunk = buf[child.offset:child.offset + metric.width]
+                    for i, v in enumerate(chunk):
+                        values[i] += v
+                out[(metric.name, labelvalues)] = values
+        return out
+
+    def reset(self):
+        """Zero every series (tests)."""
+        with self._lock:
+            for buf in (self._base, *self._buffers):
+                for i in range(len(buf)):
+                    buf[i] = 0.0
+
+
+class _Child:
+    __slots__ = ("registry", "offset", "end")
+
+    def __init__(self, registry, offset, width):
+        self.registry = registry
+        self.offset = offset
+        self.end = offset + width
+
+
+class CounterChild(_Child):
+    __slots__ = ()
+
+    def inc(self, amount=1.0):
+        self.registry.buffer(self.end)[self.offset] += amount
+
+
+class HistogramChild(_Child):
+    __slots__ = ("buckets",)
+
+    def __init__(self, registry, offset, width, buckets):
+        super().__init__(registry, offset, width)
+        self.buckets = buckets
+
+    def observe(self, value):
+        buf = self.registry.buffer(self.end)
+        # slots: one per bucket (non-cumulative), +Inf, then the sum
+        buf[self.offset + bisect_left(self.buckets, value)] += 1
+        buf[self.end - 1] += value
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, help, labelnames=(), registry=None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.registry = registry or REGISTRY
+        self.children = {}
+        self._lock = threading.Lock()
+        self.registry.register(self)
+
+    def labels(self, *labelvalues):
+        child = self.children.get(labelvalues)
+        if child is None:
+            if len(labelvalues) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self.children.get(labelvalues)
+                if child is None:
+                    child = self._make_child(self.registry.allocate(self.width))
+                    self.children[labelvalues] = child
+        return child
+
+    def _make_child(self, offset):
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    type = "counter"
+    width = 1
+
+    def _make_child(self, offset):
+        return CounterChild(self.registry, offset, self.width)
+
+    def inc(self, amount=1.0):
+        self.labels().inc(amount)
+
+    def samples(self, labelvalues, values):
+        yield self.name, labelvalues, (), values[0]
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets))
+        self.width = len(self.buckets) + 2
+        super().__init__(name, help, labelnames, registry)
+
+    def _make_child(self, offset):
+        return HistogramChild(self.registry, offset, self.width, self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def samples(self, labelvalues, values):
+        cumulative = 0.0
+        for bound, n in zip((*self.buckets, "+Inf"), values):
+            cumulative += n
+            yield f"{self.name}_bucket", labelvalues, (("le", _format_bound(bound)),), cumulative
+        yield f"{self.name}_count", labelvalues, (), cumulative
+        yield f"{self.name}_sum", labelvalues, (), values[-1]
+
+
+REGISTRY = Registry()
+
+
+# ---------- exposition ----------
+def _format_bound(bound):
+    return bound if isinstance(bound, str) else repr(float(bound))
+
+
+def _escape(value):
+    return str(value).replace("\\", r"\\").replace("\n", r"\n").replace('"', r'\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _number(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render(totals, registry=REGISTRY):
+    lines = []
+    by_metric = {}
+    for (name, labelvalues), values in totals.items():
+        by_metric.setdefault(name, []).append((labelvalues, values))
+    for name, metric in registry.metrics.items():
+        lines.append(f"# HELP {name} {metric.help}")
+        lines.append(f"# TYPE {name} {metric.type}")
+        for labelvalues, values in sorted(by_metric.get(name, ())):
+            for sample, lv, extra, value in metric.samples(labelvalues, values):
+                lines.append(f"{sample}{_labels(metric.labelnames, lv, extra)} {_number(value)}")
+    for collect in registry.collectors:
+        for name, type_, help_, samples in collect():
+            lines.append(f"# HELP {name} {help_}")
+            lines.append(f"# TYPE {name} {type_}")
+            for labels, value in samples:
+                lines.append(f"{name}{_labels(labels.keys(), labels.values())} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+# ---------- multi-process mode ----------
+_last_flush = 0.0
+
+
+def _multiprocess_dir():
+    return getattr(settings, "METRICS_MULTIPROCESS_DIR", None)
+
+
+def _key(name, labelvalues):
+    return json.dumps([name, list(labelvalues)])
+
+
+def flush(registry=REGISTRY):
+    """Write this process's totals to METRICS_MULTIPROCESS_DIR (atomic replace)."""
+    global _last_flush
+    directory = _multiprocess_dir()
+    if not directory:
+        return
+    _last_flush = time.monotonic()
+    data = {_key(name, lv): values for (name, lv), values in registry.totals().items()}
+    path = os.path.join(directory, f"{os.getpid()}.json")
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as fh:
+        json.dump(data, fh)
+    os.replace(tmp, path)
+
+
+def maybe_flush():
+    if _multiprocess_dir() and time.monotonic() - _last_flush >= getattr(settings, "METRICS_FLUSH_INTERVAL", 1.0):
+        flush()
+
+
+def collect(registry=REGISTRY):
+    """Totals for this process, or for every process in multi-process mode."""
+    directory = _multiprocess_dir()
+    if not directory:
+        return registry.totals()
+    flush(registry)
+    merged = {}
+    for entry in os.scandir(directory):
+        if not entry.name.endswith(".json"):
+            continue
+        try:
+            with open(entry.path) as fh:
+                data = json.load(fh)
+        except (OSError, ValueError):
+            continue  # being replaced right now, or not ours
+        for key, values in data.items():
+            name, labelvalues = json.loads(key)
+            slot = merged.setdefault((name, tuple(labelvalues)), [0.0] * len(values))
+            for i, v in enumerate(values):
+                slot[i] += v
+    # series only other processes have seen need local definitions to render
+    return {k: v for k, v in merged.items() if k[0] in registry.metrics}
+
+
+atexit.register(flush)
+
+
+# ---------- request and database metrics ----------
+REQUEST_LATENCY = Histogram("http_request_duration_seconds", "Request latency by view.", ("view", "method"))
+REQUESTS = Counter("http_requests_total", "Requests by view and status code.", ("view", "method", "status"))
+DB_WRITE_WAIT = Histogram(
+    "db_write_duration_seconds",
+    "Duration of write statements (INSERT/UPDATE/DELETE/BEGIN), including time spent waiting for the write lock.",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 20.0),
+)
+DB_LOCK_ERRORS = Counter("db_lock_errors_total", "Statements that failed with 'database is locked'.")
+
+_WRITES = ("INSERT", "UPDATE", "DELETE", "BEGIN", "REPLACE")
+
+
+def observe_request(view, method, status_code, duration):
+    REQUEST_LATENCY.labels(view, method).observe(duration)
+    REQUESTS.labels(view, method, str(status_code)).inc()
+    maybe_flush()
+
+
+def record_db_write(execute, sql, params, many, context):
+    if not sql.lstrip()[:7].upper().startswith(_WRITES):
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    except OperationalError as exc:
+        if "locked" in str(exc):
+            DB_LOCK_ERRORS.inc()
+        raise
+    finally:
+        DB_WRITE_WAIT.observe(time.perf_counter() - started)
+
+
+def install_execute_wrapper(sender, connection, **kwargs):
+    if record_db_write not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_db_write)
+
+
+connection_created.connect(install_execute_wrapper, dispatch_uid="core.metrics")
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+
+class IdempotencyKey(models.Model):
+    """Stored outcome of a request sent with an Idempotency-Key header."""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    scope = models.CharField(max_length=64)          # e.g. "orders.checkout"
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)   # sha256 of method + path + body
+    status_code = models.PositiveSmallIntegerField(null=True)  # null while the first request runs
+    response_body = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        # the unique index doubles as the point-lookup index
+        unique_together = (("user", "scope", "key"),)
+        indexes = [models.Index(fields=["expires_at"])]
+
+    def __str__(self):
+        return f"IdempotencyKey<{self.scope}:{self.key}> user={self.user_id} status={self.status_code}"
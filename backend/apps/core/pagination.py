@@ -0,0 +1,121 @@
+# apps/core/pagination.py
+"""
+Keyset (cursor) pagination on a (timestamp, id) pair.
+
+Each page is `WHERE (ts, id) < (cursor_ts, cursor_id) ORDER BY ts DESC, id DESC
+LIMIT n`, which an index on (..., ts, id) answers by seeking straight to the
+cursor (no sort, no scan of earlier pages), so page 10,000 costs the same as
+page 1. Unlike DRF's CursorPagination there is no OFFSET for rows sharing a
+timestamp.
+
+Rows may be model instances or values() dicts (which must include "id").
+"""
+import base64
+from collections import OrderedDict
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    page_size = 20
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    time_field = "created_at"   # newest first, ties broken by id
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def position(self, row):
+        if isinstance(row, dict):
+            return row[self.time_field], row["id"]
+        return getattr(row, self.time_field), row.pk
+
+    def encode_cursor(self, obj):
+        ts, pk = self.position(obj)
+        raw = f"{ts.isoformat()}|{pk}"
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            ts, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+            ts, pk = parse_datetime(ts), int(pk)
+        except (ValueError, TypeError, UnicodeDecodeError):
+            raise NotFound("Invalid cursor.")
+        if ts is None:
+            raise NotFound("Invalid cursor.")
+        return ts, pk
+
+    def seek(self, queryset, position):
+        """Rows strictly after `position` in (time_field DESC, id DESC) order."""
+        ts, pk = position
+        # `ts <= cursor` on its own lets the index seek; the OR only trims ties
+        return queryset.filter(
+            Q(**{f"{self.time_field}__lte": ts}),
+            Q(**{f"{self.time_field}__lt": ts}) | Q(pk__lt=pk),
+        )
+
+    def fetch(self, queryset, position, size):
+        if position is not None:
+            queryset = self.seek(queryset, position)
+        return list(queryset.order_by(f"-{self.time_field}", "-pk")[:size + 1])
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        size = self.get_page_size(request)
+        rows = self.fetch(queryset, self.decode_cursor(request), size)
+        self.has_next = len(rows) > size
+        self.page = rows[:size]
+        return self.page
+
+    def paginate_with_fallback(self, queryset, fallback, request, horizon):
+        """
+        Paginate two querysets as one (ids must not collide), where every
+        `fallback` row is older than `horizon`. The fallback is only queried
+        when the page from `queryset` runs short or reaches back past the
+        horizon, so recent pages cost one query as before. fallback=None
+        means there is nothing older to merge.
+        """
+        if fallback is None:
+            return self.paginate_queryset(queryset, request)
+        self.request = request
+        size = self.get_page_size(request)
+        position = self.decode_cursor(request)
+        rows = self.fetch(queryset, position, size)
+        if len(rows) <= size or self.position(rows[-1])[0] < horizon:
+            rows += self.fetch(fallback, position, size)
+            rows.sort(key=self.position, reverse=True)
+            rows = rows[:size + 1]
+        self.has_next = len(rows) > size
+        self.page = rows[:size]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([("next", self.get_next_link()), ("results", data)]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
@@ -0,0 +1,39 @@
+# apps/core/renderers.py
+"""
+JSON renderer backed by orjson when it is installed.
+
+FastJSONRenderer renders the same bytes as DRF's JSONRenderer with the
+default settings (compact separators, UTF-8, U+2028/U+2029 escaped), only
+faster: orjson encodes dicts, lists, strings and numbers natively and hands
+everything else (datetimes, Decimals, lazy strings, querysets ...) to DRF's
+encoder, so those come out exactly as before. Requests that ask for
+indentation, non-compact or ASCII output, data orjson refuses (integers
+beyond 64 bits) and installs without orjson all go through JSONRenderer
+itself. Floats are the one known difference: orjson writes 1e16 where the
+json module writes 1e+16, and NaN/Infinity become null instead of failing.
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:   # optional: fall back to the json module
+    orjson = None
+
+if orjson is not None:
+    OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+    _default = encoders.JSONEncoder().default
+
+
+class FastJSONRenderer(JSONRenderer):
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or data is None or self.ensure_ascii or not self.compact
+                or self.get_indent(accepted_media_type, renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=_default, option=OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # same as JSONRenderer: these are valid JSON but not valid JavaScript
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
@@ -0,0 +1,101 @@
+# apps/core/routers.py
+"""
+Primary/replica routing.
+
+Writes always go to "default". Reads go to the "replica" alias only inside a
+view that opts in with ReplicaReadMixin (`read_replica = True`), only for
+safe methods, and only when a replica is configured (DB_REPLICA_NAME). The
+decision sits in a contextvar, so reads anywhere else (auth, permissions,
+checkout's pre-checks) stay on the primary.
+
+Read-your-writes: after an authenticated unsafe request succeeds,
+ReplicaStickinessMiddleware pins that user to the primary for
+REPLICA_STICKY_SECONDS, which covers the replica's lag. Without this a user
+could check out and not see the new order in their list. The pin lives in
+the cache, so workers share it only if the cache is shared.
+
+Data that is built once and then shared with everyone (the menu snapshot)
+is read inside `primary_reads()`: built from a lagging replica, it would be
+stored under the new version and served stale until the next change.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework.permissions import SAFE_METHODS
+
+from config.database import REPLICA
+
+_reads_on_replica = ContextVar("reads_on_replica", default=False)
+
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+
+def _pin_key(user_id):
+    return f"db:primary-pin:{user_id}"
+
+
+def pin_to_primary(user_id):
+    cache.set(_pin_key(user_id), 1, timeout=getattr(settings, "REPLICA_STICKY_SECONDS", 5))
+
+
+def pinned_to_primary(user_id):
+    return cache.get(_pin_key(user_id)) is not None
+
+
+@contextmanager
+def primary_reads():
+    """Route reads to the primary inside the block, even within a ReplicaReadMixin view."""
+    token = _reads_on_replica.set(False)
+    try:
+        yield
+    finally:
+        _reads_on_replica.reset(token)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _reads_on_replica.get() and replica_configured():
+            return REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # same data on both aliases
+        return True
+
+
+class ReplicaReadMixin:
+    """For read-only APIViews: GET/HEAD run their queries on the replica."""
+    read_replica = True
+
+    def dispatch(self, request, *args, **kwargs):
+        token = _reads_on_replica.set(False)
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            _reads_on_replica.reset(token)
+
+    def initial(self, request, *args, **kwargs):
+        # authentication and permission checks above run on the primary
+        super().initial(request, *args, **kwargs)
+        if (self.read_replica and request.method in SAFE_METHODS and replica_configured()
+                and not (request.user.is_authenticated and pinned_to_primary(request.user.pk))):
+            _reads_on_replica.set(True)
+
+
+class ReplicaStickinessMiddleware(MiddlewareMixin):
+    def process_response(self, request, response):
+        if request.method in SAFE_METHODS or response.status_code >= 400 or not replica_configured():
+            return response
+        # DRF copies the token-authenticated user onto the Django request
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated:
+            pin_to_primary(user.pk)
+        return response
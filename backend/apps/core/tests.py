@@ -0,0 +1,574 @@
+import gc
+import gzip
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from unittest import mock, skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections, transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from apps.catalog.models import Category, Item
+from apps.orders import slots
+from apps.orders.models import Cart, CartItem, Order
+from apps.wallet.models import Wallet, WalletTx
+from apps.accounts.authentication import token_cache
+from config.database import REPLICA, database_settings
+from . import compression, idempotency, metrics, renderers, routers, writes
+from .instrumentation import QueryBudgetMixin, RequestStats, endpoint_stats, reset_endpoint_stats
+from .models import IdempotencyKey
+from .routers import PrimaryReplicaRouter, pinned_to_primary, replica_configured
+
+User = get_user_model()
+
+
+class IdempotencyKeyTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("student", password="pw123456")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _topup(self, amount, key="topup-1"):
+        return self.client.post("/api/wallet/topup/", {"amount_minor": amount}, format="json",
+                                HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_topup_retry_replays_stored_response(self):
+        first = self._topup(5000)
+        second = self._topup(5000)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second["Idempotent-Replayed"], "true")
+        self.assertEqual(WalletTx.objects.count(), 1)
+        self.assertEqual(Wallet.objects.get(user=self.user).balance_minor, 5000)
+
+    def test_replay_is_a_single_point_lookup(self):
+        self._topup(5000)
+        with self.assertNumQueries(1):
+            self._topup(5000)
+
+    def test_same_key_different_body_is_rejected(self):
+        self._topup(5000)
+        res = self._topup(9000)
+        self.assertEqual(res.status_code, 422)
+        self.assertEqual(res.json()["code"], "IDEMPOTENCY_KEY_REUSED")
+
+    def test_keys_are_scoped_per_user(self):
+        self._topup(5000)
+        other = User.objects.create_user("other", password="pw123456")
+        self.client.force_authenticate(other)
+        self._topup(5000)
+        self.assertEqual(WalletTx.objects.count(), 2)
+
+    def test_without_header_every_request_runs(self):
+        self.client.post("/api/wallet/topup/", {"amount_minor": 100}, format="json")
+        self.client.post("/api/wallet/topup/", {"amount_minor": 100}, format="json")
+        self.assertEqual(WalletTx.objects.count(), 2)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_validation_error_releases_key(self):
+        self.assertEqual(self._topup(0).status_code, 400)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_in_progress_key_conflicts(self):
+        self._topup(5000)
+        IdempotencyKey.objects.update(status_code=None)
+        self.assertEqual(self._topup(5000).status_code, 409)
+
+    def test_expired_key_runs_again(self):
+        self._topup(5000)
+        IdempotencyKey.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertNotIn("Idempotent-Replayed", self._topup(5000))
+        self.assertEqual(WalletTx.objects.count(), 2)
+
+    def test_checkout_retry_creates_one_order(self):
+        item = Item.objects.create(category=Category.objects.create(name="Food"), name="Wrap", price_minor=1500)
+        Wallet.objects.create(user=self.user, balance_minor=5000)
+        CartItem.objects.create(cart=Cart.objects.create(user=self.user), item=item, qty=1)
+        body = {"pickup_time": "2025-10-25T12:30:00"}
+        first = self.client.post("/api/orders/checkout/", body, format="json", HTTP_IDEMPOTENCY_KEY="co-1")
+        second = self.client.post("/api/orders/checkout/", body, format="json", HTTP_IDEMPOTENCY_KEY="co-1")
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second.json()["data"]["id"], first.json()["data"]["id"])
+        self.assertEqual(Order.objects.count(), 1)
+
+    def _checkout_cart(self):
+        item = Item.objects.create(category=Category.objects.create(name="Food"), name="Wrap", price_minor=1500)
+        Wallet.objects.create(user=self.user, balance_minor=5000)
+        CartItem.objects.create(cart=Cart.objects.create(user=self.user), item=item, qty=1)
+
+    def test_checkout_checks_run_outside_a_transaction(self):
+        # an outer atomic block would hold the SQLite write lock through the read-only checks
+        self._checkout_cart()
+        depth, seen = len(connection.atomic_blocks), []
+        has_room = slots.has_room
+
+        def spy(*args):
+            seen.append(len(connection.atomic_blocks))
+            return has_room(*args)
+        with mock.patch.object(slots, "has_room", side_effect=spy):
+            res = self.client.post("/api/orders/checkout/", {"pickup_time": "2025-10-25T12:30:00"}, format="json",
+                                   HTTP_IDEMPOTENCY_KEY="co-1")
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(seen, [depth])
+        self.assertEqual(IdempotencyKey.objects.get().status_code, 201)
+
+    def test_checkout_response_survives_a_failed_store(self):
+        self._checkout_cart()
+        body = {"pickup_time": "2025-10-25T12:30:00"}
+        with mock.patch.object(idempotency, "run_write", side_effect=OperationalError("database is locked")), \
+                self.assertLogs("apps.core.idempotency", level="ERROR"):
+            res = self.client.post("/api/orders/checkout/", body, format="json", HTTP_IDEMPOTENCY_KEY="co-1")
+        self.assertEqual(res.status_code, 201)
+        # the order committed, so a retry must not run checkout again
+        retry = self.client.post("/api/orders/checkout/", body, format="json", HTTP_IDEMPOTENCY_KEY="co-1")
+        self.assertEqual(retry.status_code, 409)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_purge_command_removes_expired_keys(self):
+        self._topup(5000, key="old")
+        self._topup(100, key="fresh")
+        IdempotencyKey.objects.filter(key="old").update(expires_at=timezone.now() - timedelta(seconds=1))
+        call_command("purge_idempotency_keys", stdout=StringIO())
+        self.assertEqual(list(IdempotencyKey.objects.values_list("key", flat=True)), ["fresh"])
+
+
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        reset_endpoint_stats()
+        token_cache.clear()
+        self.user = User.objects.create_user("student", password="pw123456")
+        Wallet.objects.create(user=self.user, balance_minor=500)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=self.user).key}")
+
+    def test_server_timing_and_per_endpoint_totals(self):
+        res = self.client.get("/api/wallet/")
+        self.assertRegex(res["Server-Timing"], r'^db;dur=[\d.]+;desc="3 queries", app;dur=[\d.]+$')
+        self.client.get("/api/wallet/")   # token now cached
+        stats = endpoint_stats()["wallet"]
+        self.assertEqual((stats["requests"], stats["queries"], stats["max_queries"]), (2, 5, 3))
+
+    @override_settings(QUERY_BUDGETS={"wallet": 1})
+    def test_over_budget_is_logged_and_counted(self):
+        with self.assertLogs("apps.core.instrumentation", level="WARNING") as logs:
+            self.client.get("/api/wallet/")
+        self.assertIn("budget 1", logs.output[0])
+        self.assertEqual(endpoint_stats()["wallet"]["over_budget"], 1)
+
+    def test_repeated_statements(self):
+        stats = RequestStats()
+        stats.statements.update(["SELECT a WHERE id = %s"] * 3 + ["SELECT b"])
+        self.assertEqual(stats.duplicates(), [("SELECT a WHERE id = %s", 3)])
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Hot endpoints stay within settings.QUERY_BUDGETS (real token auth, cold cache)."""
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = User.objects.create_user("student", password="pw123456")
+        Wallet.objects.create(user=self.user, balance_minor=50_000)
+        for c in range(5):
+            cat = Category.objects.create(name=f"Cat {c}")
+            self.item = Item.objects.create(category=cat, name=f"Item {c}", price_minor=100)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=self.user).key}")
+
+    def test_student_flow(self):
+        with self.assertWithinQueryBudget("catalog-categories"):
+            self.client.get("/api/catalog/categories/")
+        token_cache.clear()
+        with self.assertWithinQueryBudget("cart-items"):
+            self.client.post("/api/orders/cart/items/", {"item_id": self.item.id, "qty": 1}, format="json")
+        token_cache.clear()
+        with self.assertWithinQueryBudget("cart"):
+            self.client.get("/api/orders/cart/")
+        token_cache.clear()
+        with self.assertWithinQueryBudget("checkout"):
+            res = self.client.post("/api/orders/checkout/", {"pickup_time": "2025-10-25T12:30:00"}, format="json")
+        self.assertEqual(res.status_code, 201)
+        token_cache.clear()
+        with self.assertWithinQueryBudget("my-orders"):
+            self.client.get("/api/orders/orders/")
+        token_cache.clear()
+        with self.assertWithinQueryBudget("wallet-transactions"):
+            self.client.get("/api/wallet/transactions/")
+
+    def test_wallet_topup(self):
+        with self.assertWithinQueryBudget("wallet-topup"):
+            res = self.client.post("/api/wallet/topup/", {"amount_minor": 5000}, format="json",
+                                   HTTP_IDEMPOTENCY_KEY="topup-1")
+        self.assertEqual(res.status_code, 200)
+
+    def test_admin_dashboard(self):
+        self.user.is_staff = True
+        self.user.save()
+        with self.assertWithinQueryBudget("admin-dashboard"):
+            self.client.get("/api/orders/admin/dashboard/")
+
+    @override_settings(QUERY_BUDGETS={"wallet": 0})
+    def test_budget_failure_lists_queries(self):
+        with self.assertLogs("apps.core.instrumentation", level="WARNING") as logs, \
+                self.assertRaisesMessage(AssertionError, "wallet ran 3 queries, budget is 0"):
+            with self.assertWithinQueryBudget("wallet"):
+                self.client.get("/api/wallet/")
+        self.assertEqual(logs.output, ["WARNING:apps.core.instrumentation:GET wallet ran 3 queries (budget 0)"])
+
+
+class MetricsRegistryTests(TestCase):
+    def test_threads_update_without_losing_increments(self):
+        registry = metrics.Registry()
+        hits = metrics.Counter("hits_total", "Hits.", ("kind",), registry=registry)
+
+        def work():
+            child = hits.labels("a")
+            for _ in range(10_000):
+                child.inc()
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(registry.totals()[("hits_total", ("a",))], [80_000.0])
+
+    def test_ended_threads_leave_no_buffers(self):
+        registry = metrics.Registry()
+        hits = metrics.Counter("hits_total", "Hits.", registry=registry)
+        hits.inc()
+        for _ in range(50):
+            thread = threading.Thread(target=hits.inc, args=(2,))
+            thread.start()
+            thread.join()
+        gc.collect()
+        self.assertEqual(len(registry._buffers), 1)   # this thread's
+        self.assertEqual(registry.totals()[("hits_total", ())], [101.0])
+
+    def test_histogram_exposition(self):
+        registry = metrics.Registry()
+        latency = metrics.Histogram("latency_seconds", "Latency.", buckets=(0.1, 1.0), registry=registry)
+        for v in (0.05, 0.1, 0.5, 3.0):
+            latency.observe(v)
+        text = metrics.render(registry.totals(), registry)
+        self.assertIn('latency_seconds_bucket{le="0.1"} 2\n', text)
+        self.assertIn('latency_seconds_bucket{le="1.0"} 3\n', text)
+        self.assertIn('latency_seconds_bucket{le="+Inf"} 4\n', text)
+        self.assertIn("latency_seconds_count 4\n", text)
+        self.assertIn("latency_seconds_sum 3.65\n", text)
+
+    def test_multiprocess_files_are_summed(self):
+        registry = metrics.Registry()
+        hits = metrics.Counter("hits_total", "Hits.", registry=registry)
+        hits.inc(2)
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_MULTIPROCESS_DIR=directory):
+            with open(os.path.join(directory, "99999.json"), "w") as fh:
+                json.dump({json.dumps(["hits_total", []]): [5.0]}, fh)
+            totals = metrics.collect(registry)
+            self.assertTrue(os.path.exists(os.path.join(directory, f"{os.getpid()}.json")))
+        self.assertEqual(totals[("hits_total", ())], [7.0])
+
+
+class MetricsEndpointTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("student", password="pw123456")
+        Wallet.objects.create(user=self.user, balance_minor=0)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        staff = User.objects.create_user("admin", password="pw123456", is_staff=True)
+        self.staff_auth = f"Token {Token.objects.create(user=staff).key}"
+
+    def _scrape(self):
+        return self.client.get("/api/metrics", HTTP_AUTHORIZATION=self.staff_auth)
+
+    def _value(self, text, sample):
+        for line in text.splitlines():
+            if line.startswith(sample + " "):
+                return float(line.split()[-1])
+        return 0.0
+
+    def test_exports_request_checkout_and_wallet_metrics(self):
+        before = self._scrape().content.decode()
+        self.client.get("/api/wallet/")
+        self.client.post("/api/orders/checkout/", {"pickup_time": "2025-10-25T12:30:00"}, format="json")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/api/wallet/topup/", {"amount_minor": 2500}, format="json")
+        Order.objects.create(user=self.user, status=Order.PAID, total_minor=1, pickup_time=timezone.now(),
+                             service_day=timezone.localdate())
+
+        res = self._scrape()
+        self.assertTrue(res["Content-Type"].startswith("text/plain; version=0.0.4"))
+        text = res.content.decode()
+        for sample, delta in [
+            ('http_requests_total{view="wallet",method="GET",status="200"}', 1),
+            ('checkout_outcomes_total{code="CART_EMPTY"}', 1),
+            ("wallet_topups_total", 1),
+            ("wallet_topup_minor_total", 2500),
+        ]:
+            self.assertEqual(self._value(text, sample) - self._value(before, sample), delta, sample)
+        self.assertIn('http_request_duration_seconds_bucket{view="wallet",method="GET",le="+Inf"}', text)
+        self.assertIn('orders_today{status="paid"} 1', text)
+        self.assertIn("# TYPE db_write_duration_seconds histogram", text)
+
+    @override_settings(METRICS_TOKEN="s3cret")
+    def test_token(self):
+        self.assertEqual(self.client.get("/api/metrics").status_code, 401)
+        self.assertEqual(self.client.get("/api/metrics", HTTP_AUTHORIZATION="Bearer wrong").status_code, 401)
+        res = self.client.get("/api/metrics", HTTP_AUTHORIZATION="Bearer s3cret")
+        self.assertEqual(res.status_code, 200)
+
+    def test_staff_only_by_default(self):
+        student = f"Token {Token.objects.create(user=self.user).key}"
+        self.assertEqual(self.client.get("/api/metrics").status_code, 401)
+        self.assertEqual(self.client.get("/api/metrics", HTTP_AUTHORIZATION=student).status_code, 401)
+        self.assertEqual(self.client.get("/api/metrics", HTTP_AUTHORIZATION="Bearer ").status_code, 401)
+        self.assertEqual(self._scrape().status_code, 200)
+        with override_settings(METRICS_PUBLIC=True):
+            self.assertEqual(self.client.get("/api/metrics").status_code, 200)
+
+
+class SQLiteProfileTests(TransactionTestCase):
+    def tearDown(self):
+        writes.write_queue.stop()
+
+    def test_pragmas_applied_on_connect(self):
+        with connection.cursor() as cursor:
+            self.assertEqual(cursor.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+            self.assertEqual(cursor.execute("PRAGMA synchronous").fetchone()[0], 1)   # NORMAL
+            self.assertEqual(cursor.execute("PRAGMA busy_timeout").fetchone()[0], 20_000)
+
+    @override_settings(SQLITE_WRITE_QUEUE=True)
+    def test_write_queue_runs_on_writer_thread(self):
+        def create(name):
+            User.objects.create_user(name)
+            return threading.current_thread().name
+
+        self.assertEqual(writes.run_write(create, "queued"), "sqlite-writer")
+        self.assertTrue(User.objects.filter(username="queued").exists())
+
+        def fail():
+            User.objects.create_user("rolled-back")
+            raise ValueError("boom")
+
+        with self.assertRaisesMessage(ValueError, "boom"):
+            writes.run_write(fail)
+        self.assertFalse(User.objects.filter(username="rolled-back").exists())
+
+        # inside a transaction the caller already holds the write lock: run inline
+        with transaction.atomic():
+            self.assertEqual(writes.run_write(create, "inline"), threading.current_thread().name)
+
+
+class DatabaseSettingsTests(TestCase):
+    base = Path("/srv/cafe")
+
+    def test_sqlite_default(self):
+        dbs = database_settings(self.base, env={})
+        self.assertEqual(list(dbs), ["default"])
+        self.assertEqual(dbs["default"]["NAME"], self.base / "db.sqlite3")
+        self.assertEqual(dbs["default"]["OPTIONS"]["transaction_mode"], "IMMEDIATE")
+        self.assertEqual(dbs["default"]["CONN_MAX_AGE"], 600)
+
+    def test_postgresql_pool(self):
+        dbs = database_settings(self.base, env={
+            "DB_ENGINE": "postgresql", "DB_NAME": "cafe", "DB_HOST": "db1",
+            "DB_POOL": "1", "DB_POOL_MAX_SIZE": "20",
+        })
+        self.assertEqual(dbs["default"]["ENGINE"], "django.db.backends.postgresql")
+        self.assertEqual(dbs["default"]["OPTIONS"]["pool"], {"min_size": 2, "max_size": 20})
+        self.assertEqual(dbs["default"]["CONN_MAX_AGE"], 0)
+
+    def test_replica(self):
+        dbs = database_settings(self.base, env={
+            "DB_ENGINE": "postgresql", "DB_HOST": "db1", "DB_REPLICA_NAME": "cafe", "DB_REPLICA_HOST": "db2",
+        })
+        self.assertEqual(dbs[REPLICA]["HOST"], "db2")
+        self.assertEqual(dbs[REPLICA]["TEST"], {"MIRROR": "default"})
+        with self.assertRaises(ValueError):
+            database_settings(self.base, env={"DB_ENGINE": "oracle"})
+
+
+class PrimaryReplicaRouterTests(TestCase):
+    def test_outside_replica_views_everything_uses_primary(self):
+        router = PrimaryReplicaRouter()
+        self.assertIsNone(router.db_for_read(Order))
+        self.assertEqual(router.db_for_write(Order), "default")
+
+    def test_primary_reads_override_a_replica_view(self):
+        router = PrimaryReplicaRouter()
+        token = routers._reads_on_replica.set(True)
+        try:
+            with mock.patch.object(routers, "replica_configured", return_value=True):
+                self.assertEqual(router.db_for_read(Order), REPLICA)
+                with routers.primary_reads():
+                    self.assertIsNone(router.db_for_read(Order))
+                self.assertEqual(router.db_for_read(Order), REPLICA)
+        finally:
+            routers._reads_on_replica.reset(token)
+
+
+@skipUnless(replica_configured(), "needs a replica alias")
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    Run on their own with two SQLite files:
+
+        DB_REPLICA_NAME=replica.sqlite3 python manage.py test apps.core.tests.ReplicaRoutingTests
+
+    The replica alias mirrors the test database, so rows committed through
+    "default" are visible through "replica".
+    """
+    databases = "__all__"
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("rep", password="pw")
+        Wallet.objects.create(user=self.user, balance_minor=10_000)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=self.user).key}")
+
+    def tearDown(self):
+        token_cache.clear()
+        cache.clear()
+
+    def test_read_views_use_replica_and_writes_pin_to_primary(self):
+        with CaptureQueriesContext(connections[REPLICA]) as replica:
+            self.assertEqual(self.client.get("/api/orders/orders/").status_code, 200)
+        self.assertTrue(any('"orders_order"' in q["sql"] for q in replica.captured_queries))
+
+        res = self.client.post("/api/wallet/topup/", {"amount_minor": 500}, format="json")
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(pinned_to_primary(self.user.pk))
+
+        with CaptureQueriesContext(connections[REPLICA]) as replica:
+            self.client.get("/api/orders/orders/")
+        self.assertEqual(replica.captured_queries, [])
+
+    def test_menu_snapshot_is_built_on_primary(self):
+        Item.objects.create(category=Category.objects.create(name="Food"), name="Wrap", price_minor=700)
+        with CaptureQueriesContext(connections[REPLICA]) as replica:
+            self.assertEqual(self.client.get("/api/catalog/categories/").status_code, 200)
+        self.assertFalse(any("catalog_" in q["sql"] for q in replica.captured_queries))
+
+    def test_wallet_reads_stay_on_primary(self):
+        with CaptureQueriesContext(connections[REPLICA]) as replica:
+            self.client.get("/api/wallet/")
+        self.assertEqual(replica.captured_queries, [])
+
+
+class FastJSONRendererTests(TestCase):
+    def sample(self):
+        return OrderedDict([
+            ("id", 7), ("name", "Karak chai \u2028 ☕"), ("price", Decimal("12.50")), ("ok", True),
+            ("none", None), ("when", timezone.now().replace(microsecond=123456)), ("day", date(2025, 10, 25)),
+            ("lines", [{"qty": 2, "tags": ("hot", "sweet")}, {1: "int key"}]), ("ratio", 0.25),
+            ("lazy", gettext_lazy("Pickup")),
+        ])
+
+    @skipUnless(renderers.orjson, "needs orjson")
+    def test_orjson_output_matches_json_renderer(self):
+        data = self.sample()
+        self.assertEqual(renderers.FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_fallbacks_match_json_renderer(self):
+        data = self.sample()
+        with mock.patch.object(renderers, "orjson", None):
+            self.assertEqual(renderers.FastJSONRenderer().render(data), JSONRenderer().render(data))
+        indented = "application/json; indent=2"
+        self.assertEqual(renderers.FastJSONRenderer().render(data, indented), JSONRenderer().render(data, indented))
+        huge = {"n": 2 ** 70}
+        self.assertEqual(renderers.FastJSONRenderer().render(huge), JSONRenderer().render(huge))
+        self.assertEqual(renderers.FastJSONRenderer().render(None), b"")
+
+    def test_api_responses_use_it(self):
+        res = APIClient().get("/api/orders/cart/")
+        self.assertEqual(res.status_code, 401)
+        self.assertIsInstance(res.accepted_renderer, renderers.FastJSONRenderer)
+
+
+class CompressionTests(TestCase):
+    url = "/api/catalog/categories/"
+
+    def setUp(self):
+        cache.clear()
+        compression.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user("student", password="pw123456"))
+        category = Category.objects.create(name="Food")
+        Item.objects.bulk_create([Item(category=category, name=f"Item {i}", description="Freshly made " * 5,
+                                       price_minor=100 + i) for i in range(50)])
+
+    def _middleware(self, response):
+        return compression.CompressionMiddleware(lambda request: response)
+
+    def test_menu_is_gzipped_once_per_version(self):
+        plain = self.client.get(self.url)
+        self.assertFalse(plain.has_header("Content-Encoding"))
+        self.assertIn("Accept-Encoding", plain["Vary"])
+        with mock.patch("gzip.compress", wraps=gzip.compress) as compress, \
+                mock.patch.object(compression, "brotli", None):
+            first = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip, deflate")
+            second = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(compress.call_count, 1)
+        self.assertEqual(first["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(first.content), plain.content)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(int(first["Content-Length"]), len(first.content))
+        self.assertEqual(first["ETag"], "W/" + plain["ETag"])
+        # the weak tag still revalidates
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 304)
+
+    def test_precompressed_menu_keeps_renderer_options(self):
+        with mock.patch.object(compression, "brotli", None):
+            compact = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip")
+            indented = self.client.get(self.url, HTTP_ACCEPT="application/json; indent=4",
+                                       HTTP_ACCEPT_ENCODING="gzip")
+        self.assertNotIn(b"\n", gzip.decompress(compact.content))
+        self.assertEqual(gzip.decompress(indented.content),
+                         self.client.get(self.url, HTTP_ACCEPT="application/json; indent=4").content)
+
+    @skipUnless(compression.brotli, "needs brotli")
+    def test_brotli_preferred_when_installed(self):
+        plain = self.client.get(self.url)
+        res = self.client.get(self.url, HTTP_ACCEPT_ENCODING="gzip, br")
+        self.assertEqual(res["Content-Encoding"], "br")
+        self.assertEqual(compression.brotli.decompress(res.content), plain.content)
+
+    def test_encoding_negotiation(self):
+        self.assertEqual(compression.accepted_encodings("gzip;q=0, br;q=0.5, identity"), {"br", "identity"})
+        with mock.patch.object(compression, "brotli", None):
+            self.assertEqual(compression.choose_encoding("br, gzip"), "gzip")
+            self.assertEqual(compression.choose_encoding("*"), "gzip")
+            self.assertIsNone(compression.choose_encoding("br"))
+        self.assertIsNone(compression.choose_encoding("identity, gzip;q=0"))
+
+    def test_skipped_responses(self):
+        factory = RequestFactory()
+        get = factory.get("/", HTTP_ACCEPT_ENCODING="gzip")
+        small = self._middleware(HttpResponse(b"{}", content_type="application/json"))(get)
+        self.assertFalse(small.has_header("Content-Encoding"))
+        image = self._middleware(HttpResponse(b"x" * 4096, content_type="image/png"))(get)
+        self.assertFalse(image.has_header("Content-Encoding"))
+        stream = self._middleware(StreamingHttpResponse(iter([b"x" * 4096]), content_type="text/event-stream"))(get)
+        self.assertFalse(stream.has_header("Content-Encoding"))
+        post = factory.post("/", HTTP_ACCEPT_ENCODING="gzip")
+        login = self._middleware(HttpResponse(b"x" * 4096, content_type="application/json"))(post)
+        self.assertFalse(login.has_header("Content-Encoding"))
+        large = self._middleware(HttpResponse(b"x" * 4096, content_type="application/json"))(get)
+        self.assertEqual(large["Content-Encoding"], "gzip")
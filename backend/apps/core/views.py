@@ -0,0 +1,37 @@
+# apps/core/views.py
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse
+from rest_framework.exceptions import AuthenticationFailed
+
+from apps.accounts.authentication import CachedTokenAuthentication
+from . import metrics as _metrics
+
+
+def _staff(request):
+    """A staff user, by session or by the API's `Authorization: Token <key>`."""
+    if getattr(request, "user", None) is not None and request.user.is_staff:
+        return True
+    try:
+        auth = CachedTokenAuthentication().authenticate(request)
+    except AuthenticationFailed:
+        return False
+    return auth is not None and auth[0].is_staff
+
+
+def metrics(request):
+    """
+    GET /api/metrics  (Prometheus text format 0.0.4)
+    Staff only: scrape with `Authorization: Bearer <METRICS_TOKEN>`, or as a
+    staff user. METRICS_PUBLIC = True opens it to anyone.
+    """
+    if not getattr(settings, "METRICS_PUBLIC", False):
+        token = getattr(settings, "METRICS_TOKEN", None)
+        sent = request.headers.get("Authorization", "")
+        bearer = sent.startswith("Bearer ") and token and hmac.compare_digest(
+            sent.removeprefix("Bearer ").strip().encode(), token.encode())
+        if not bearer and not _staff(request):
+            return HttpResponse("Unauthorized\n", status=401, content_type="text/plain")
+    body = _metrics.render(_metrics.collect())
+    return HttpResponse(body, content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,79 @@
+# apps/core/writes.py
+"""
+Optional single-writer queue for short write transactions.
+
+SQLite allows one writer at a time. Competing writers wait in SQLite's busy
+handler, which polls with growing sleeps, so under a lunch rush a good part
+of each checkout is spent asleep. With SQLITE_WRITE_QUEUE = True,
+`run_write(fn, ...)` hands the transaction to one background thread that runs
+jobs back to back on its own connection. The caller blocks on a future and
+gets the return value or the exception. WAL readers are never blocked either
+way.
+
+Calls made inside an open transaction (e.g. a view under @transaction.atomic)
+run inline. Queuing them would make the writer wait for a lock the caller
+holds.
+"""
+import queue
+import threading
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+
+class WriteQueue:
+    def __init__(self, maxsize=1000):
+        self._jobs = queue.Queue(maxsize)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            fn, args, kwargs, future = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                with transaction.atomic():
+                    result = fn(*args, **kwargs)
+            except BaseException as exc:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+            finally:
+                close_old_connections()
+        connection.close()
+
+    def submit(self, fn, *args, **kwargs):
+        """Queue fn(*args, **kwargs) as one transaction and return a Future."""
+        self._ensure_started()
+        future = Future()
+        self._jobs.put((fn, args, kwargs, future), timeout=getattr(settings, "SQLITE_WRITE_QUEUE_TIMEOUT", 30))
+        return future
+
+    def stop(self):
+        if self._thread is not None and self._thread.is_alive():
+            self._jobs.put(None)
+            self._thread.join()
+        self._thread = None
+
+
+write_queue = WriteQueue()
+
+
+def run_write(fn, *args, **kwargs):
+    """Run fn in a transaction, through the writer thread when the queue is enabled."""
+    if not getattr(settings, "SQLITE_WRITE_QUEUE", False) or connection.in_atomic_block:
+        with transaction.atomic():
+            return fn(*args, **kwargs)
+    return write_queue.submit(fn, *args, **kwargs).result(timeout=getattr(settings, "SQLITE_WRITE_QUEUE_TIMEOUT", 30))
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Cart, CartItem
+from .models import Cart, CartItem, PickupSlot
 
 class CartItemInline(admin.TabularInline):
     model = CartItem
@@ -11,4 +11,11 @@ class CartAdmin(admin.ModelAdmin):
     search_fields = ("user__username", "user__email")
     inlines = [CartItemInline]
 
+@admin.register(PickupSlot)
+class PickupSlotAdmin(admin.ModelAdmin):
+    list_display = ("starts_at", "ends_at", "capacity", "reserved")
+    list_filter = ("service_day",)
+    list_editable = ("capacity",)
+    ordering = ("starts_at",)
+
 # Register your models here.
@@ -4,4 +4,7 @@ from django.apps import AppConfig
 # orders/apps.py
 class OrdersConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
-    name = "apps.orders"
\ No newline at end of file
+    name = "apps.orders"
+
+    def ready(self):
+        from . import metrics  # noqa: F401  (registers the orders_today collector)
@@ -0,0 +1,64 @@
+# apps/orders/archive.py
+"""
+Hot/cold split for order history.
+
+Orders that are COMPLETED or CANCELLED and whose service day is more than
+ORDER_ARCHIVE_AFTER_DAYS old are moved from Order/OrderItem into
+ArchivedOrder, one row per order with its lines inline. Each batch is its own
+short transaction (copy, then delete) so the write lock is never held for
+long and an interrupted run just leaves the remaining orders hot. The Order
+table then only grows with recent activity.
+
+Nothing that reads aggregates changes: DailySalesRollup already holds the
+totals for closed days, and rebuild_rollup counts archived orders too.
+"""
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ArchivedOrder, Order, OrderItem
+
+ARCHIVABLE = (Order.COMPLETED, Order.CANCELLED)
+ITEM_FIELDS = ("item_name", "unit_price_minor", "qty", "line_total_minor")
+
+
+def archive_after_days():
+    return getattr(settings, "ORDER_ARCHIVE_AFTER_DAYS", 90)
+
+
+def archive_cutoff(today, days=None):
+    """Service days before this are archivable."""
+    return today - timedelta(days=archive_after_days() if days is None else days)
+
+
+def archive_horizon(today):
+    """
+    Every archived order was created before this instant (the start of the
+    cutoff day), so a page of hot orders that all are newer can't have an
+    archived order between them.
+    """
+    return timezone.make_aware(datetime.combine(archive_cutoff(today), time.min))
+
+
+def archive_batch(cutoff, batch_size):
+    """Move up to batch_size archivable orders; returns how many were moved."""
+    with transaction.atomic():
+        orders = list(Order.objects.filter(status__in=ARCHIVABLE, service_day__lt=cutoff)
+                      .order_by("id")[:batch_size])
+        if not orders:
+            return 0
+        ids = [o.id for o in orders]
+        lines = {}
+        for row in OrderItem.objects.filter(order_id__in=ids).order_by("id").values("order_id", *ITEM_FIELDS):
+            lines.setdefault(row.pop("order_id"), []).append(row)
+        ArchivedOrder.objects.bulk_create([
+            ArchivedOrder(id=o.id, user_id=o.user_id, status=o.status, total_minor=o.total_minor,
+                          paid_minor=o.paid_minor, pickup_time=o.pickup_time, service_day=o.service_day,
+                          created_at=o.created_at, items=lines.get(o.id, []))
+            for o in orders
+        ])
+        OrderItem.objects.filter(order_id__in=ids).delete()
+        Order.objects.filter(id__in=ids).delete()
+    return len(orders)
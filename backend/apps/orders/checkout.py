@@ -0,0 +1,136 @@
+# apps/orders/checkout.py
+"""
+Checkout pipeline.
+
+Everything that can be decided by reading (empty cart, slot room, wallet
+cover) is checked before any write. The daily quota is claimed up front with
+one counter operation (apps/orders/quota.py) and handed back if the checkout
+fails. The transaction that follows only runs single-statement conditional
+updates and inserts:
+
+  - slot:   UPDATE ... SET reserved = reserved + units WHERE reserved <= capacity - units
+  - wallet: UPDATE ... SET balance_minor = balance_minor - total WHERE balance_minor >= total,
+            then the ledger row with the resulting balance (apps/wallet/ledger.py)
+
+No row is locked with select_for_update, so other writers only wait for the
+few statements below instead of the whole request. If any conditional
+update matches no row, CheckoutError is raised inside the atomic block and
+nothing is committed. With SQLITE_WRITE_QUEUE on, that block runs on the
+single writer thread (apps/core/writes.py).
+"""
+from django.utils import timezone
+from rest_framework import status
+
+from apps.core.writes import run_write
+from apps.wallet import ledger
+from apps.wallet.models import Wallet
+from .events import publish_order_event
+from .models import Cart, CartItem, Order, OrderItem
+from .rollup import record_order_created
+from . import quota, slots
+
+
+class CheckoutError(Exception):
+    def __init__(self, code, message, status_code):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.status_code = status_code
+
+
+def _cart_empty():
+    return CheckoutError("CART_EMPTY", "Cart is empty.", status.HTTP_400_BAD_REQUEST)
+
+
+def _limit_reached(limit):
+    return CheckoutError("ORDER_LIMIT_REACHED", f"You reached today's limit ({limit}).",
+                         status.HTTP_429_TOO_MANY_REQUESTS)
+
+
+def _slot_full():
+    return CheckoutError("PICKUP_SLOT_FULL", "That pickup slot is full, please pick another time.",
+                         status.HTTP_409_CONFLICT)
+
+
+def _insufficient_funds():
+    return CheckoutError("INSUFFICIENT_WALLET_FUNDS", "Not enough wallet balance for this order.",
+                         status.HTTP_402_PAYMENT_REQUIRED)
+
+
+def service_day_for(dt):
+    # if TIME_ZONE is Asia/Dubai and USE_TZ True, dt.astimezone picks it up
+    return dt.astimezone(timezone.get_current_timezone()).date()
+
+
+def checkout(user, pickup_time):
+    """Turn the user's cart into a paid Order. Raises CheckoutError."""
+    cart, _ = Cart.objects.get_or_create(user=user)
+    lines = list(CartItem.objects.filter(cart=cart).select_related("item").order_by("id"))
+    if not lines:
+        raise _cart_empty()
+
+    total_minor = sum(ci.line_total_minor for ci in lines)
+    service_day = service_day_for(timezone.now())
+    limit = quota.limit_for(user)
+    slot_start = slots.slot_start_for(pickup_time)
+    if slot_start is None:
+        raise CheckoutError("INVALID_PICKUP_TIME", "Pickup time is outside opening hours.",
+                            status.HTTP_400_BAD_REQUEST)
+    slot_units = slots.units_for(lines)
+
+    if limit is not None and not quota.claim(user, service_day, limit):
+        raise _limit_reached(limit)
+    try:
+        # validate before writing anything
+        if not slots.has_room(slot_start, slot_units):
+            raise _slot_full()
+        balance = Wallet.objects.filter(user=user).values_list("balance_minor", flat=True).first() or 0
+        if balance < total_minor:
+            raise _insufficient_funds()
+
+        # short write window; the conditional updates re-check under the write lock
+        order = run_write(_write_order, user, cart, lines, total_minor, pickup_time, service_day,
+                          slot_start, slot_units)
+    except Exception:
+        if limit is not None:
+            quota.release(user, service_day)
+        raise
+    if limit is not None:
+        quota.record(user, service_day)
+    return order
+
+
+def _write_order(user, cart, lines, total_minor, pickup_time, service_day, slot_start, slot_units):
+    """The write half of checkout; runs inside one transaction (see run_write)."""
+    slot_id = slots.reserve(slot_start, slot_units)
+    if slot_id is None:
+        raise _slot_full()
+    if total_minor > 0:
+        if ledger.debit(user, total_minor, ref="checkout") is None:
+            raise _insufficient_funds()
+
+    order = Order.objects.create(
+        user=user,
+        status=Order.PAID,
+        total_minor=total_minor,
+        paid_minor=total_minor,
+        pickup_time=pickup_time,
+        pickup_slot_id=slot_id,
+        service_day=service_day,
+    )
+    record_order_created(order)
+    publish_order_event(order, type="order.created")
+    OrderItem.objects.bulk_create([
+        OrderItem(
+            order=order,
+            item=ci.item,
+            item_name=ci.item.name,
+            unit_price_minor=ci.item.price_minor,
+            qty=ci.qty,
+            line_total_minor=ci.line_total_minor,
+        ) for ci in lines
+    ])
+    # only the lines we charged for; anything added meanwhile stays in the cart
+    CartItem.objects.filter(pk__in=[ci.pk for ci in lines]).delete()
+    cart.touch()
+    return order
@@ -0,0 +1,141 @@
+# apps/orders/events.py
+"""
+In-process pub/sub for order status changes (feeds the SSE endpoint).
+
+Sync code (checkout, admin updates) calls `publish_order_event(order)`; it
+fires after the surrounding transaction commits. Each SSE connection is an
+asyncio.Queue fed through `loop.call_soon_threadsafe`, so publishers on worker
+threads never block on slow clients.
+
+The backend is pluggable via settings.ORDER_EVENTS_BACKEND. The default
+InProcessBackend only reaches subscribers in the same process; a multi-worker
+deployment needs a backend with the same interface over Redis/Postgres
+LISTEN/NOTIFY.
+"""
+import asyncio
+import itertools
+import threading
+from collections import defaultdict, deque
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+class OrderEvent(NamedTuple):
+    id: int
+    user_id: int
+    type: str
+    data: dict
+
+
+class InProcessBackend:
+    """Fan-out to subscribers in this process, with a bounded replay buffer
+    for Last-Event-ID resume. Subscribers are indexed by user, so publishing
+    costs O(listeners for that user + staff), not O(all connections)."""
+
+    def __init__(self, history_size=1000):
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._history = deque(maxlen=history_size)
+        self._subscribers = defaultdict(set)   # user_id (None = everything) -> callbacks
+
+    def publish(self, user_id, type, data):
+        with self._lock:
+            event = OrderEvent(next(self._ids), user_id, type, data)
+            self._history.append(event)
+            listeners = [*self._subscribers.get(user_id, ()), *self._subscribers.get(None, ())]
+        for deliver in listeners:
+            deliver(event)
+        return event
+
+    def subscribe(self, deliver, user_id=None):
+        with self._lock:
+            self._subscribers[user_id].add(deliver)
+
+    def unsubscribe(self, deliver, user_id=None):
+        with self._lock:
+            listeners = self._subscribers.get(user_id)
+            if listeners is not None:
+                listeners.discard(deliver)
+                if not listeners:
+                    del self._subscribers[user_id]
+
+    def since(self, last_id):
+        """Events after last_id, or None if the buffer no longer reaches back that far."""
+        with self._lock:
+            history = list(self._history)
+        if not history:
+            return [] if last_id == 0 else None
+        if last_id > history[-1].id or last_id < history[0].id - 1:
+            return None
+        return [e for e in history if e.id > last_id]
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(listeners) for listeners in self._subscribers.values())
+
+
+class Subscription:
+    """One SSE client. Events arrive on the client's event loop; a client that
+    falls `max_pending` events behind is closed and must resume by Last-Event-ID."""
+
+    def __init__(self, backend, user_id=None, max_pending=256):
+        self.backend = backend
+        self.user_id = user_id          # None = all orders (staff)
+        self.queue = asyncio.Queue(maxsize=max_pending)
+        self.overflowed = False
+        self._loop = asyncio.get_running_loop()
+
+    def _accepts(self, event):
+        return self.user_id is None or event.user_id == self.user_id
+
+    def _put(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    def _deliver(self, event):
+        self._loop.call_soon_threadsafe(self._put, event)
+
+    def __enter__(self):
+        self.backend.subscribe(self._deliver, user_id=self.user_id)
+        return self
+
+    def __exit__(self, *exc):
+        self.backend.unsubscribe(self._deliver, user_id=self.user_id)
+
+    def backlog(self, last_id):
+        """Missed events for this subscriber, or None if they can't be replayed."""
+        missed = self.backend.since(last_id)
+        if missed is None:
+            return None
+        return [e for e in missed if self._accepts(e)]
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                path = getattr(settings, "ORDER_EVENTS_BACKEND", "apps.orders.events.InProcessBackend")
+                _backend = import_string(path)()
+    return _backend
+
+
+def publish_order_event(order, type="order.updated"):
+    """Publish after commit, so listeners never see a rolled back change."""
+    data = {
+        "order_id": order.id,
+        "status": order.status,
+        "total_minor": order.total_minor,
+        "pickup_time": order.pickup_time.isoformat() if order.pickup_time else None,
+    }
+    user_id = order.user_id
+    transaction.on_commit(lambda: get_backend().publish(user_id, type, data))
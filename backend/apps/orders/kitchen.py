@@ -0,0 +1,82 @@
+# apps/orders/kitchen.py
+"""
+Kitchen work queue and bulk status changes.
+
+The queue answers "what do we cook next": open orders (paid or preparing)
+due before now + N minutes, summed per item within each pickup slot. It is a
+single GROUP BY over OrderItem joined to Order and PickupSlot, so its cost
+tracks the number of distinct (slot, item) pairs, not the number of orders.
+
+Bulk status changes are one UPDATE for the whole batch. The rollup is
+adjusted from the same rows grouped by (service_day, old status), and one
+event per order is published after commit.
+"""
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from .events import publish_order_event
+from .models import Order, OrderItem
+from .rollup import record_status_change
+from . import slots
+
+OPEN_STATUSES = (Order.PAID, Order.PREPARING)
+MAX_BULK_ORDERS = 500
+
+
+def kitchen_queue(now=None, minutes=30):
+    """Items to prepare for open orders due within `minutes`, grouped by slot.
+
+    Orders already past their pickup time today are included (they are the
+    most urgent); earlier days are not.
+    """
+    now = now or timezone.now()
+    tz = timezone.get_current_timezone()
+    day_start = timezone.make_aware(datetime.combine(timezone.localtime(now).date(), time.min), tz)
+    rows = (
+        OrderItem.objects
+        .filter(order__status__in=OPEN_STATUSES,
+                order__pickup_time__gte=day_start,
+                order__pickup_time__lt=now + timedelta(minutes=minutes))
+        .values("order__pickup_slot__starts_at", "order__pickup_slot__ends_at", "item_name")
+        .annotate(qty=Sum("qty"), orders=Count("order", distinct=True))
+        .order_by("order__pickup_slot__starts_at", "-qty", "item_name")
+    )
+
+    queue, by_slot = [], {}
+    for r in rows:
+        key = r["order__pickup_slot__starts_at"]
+        if key not in by_slot:
+            by_slot[key] = {"starts_at": key, "ends_at": r["order__pickup_slot__ends_at"], "items": []}
+            queue.append(by_slot[key])
+        by_slot[key]["items"].append({"item_name": r["item_name"], "qty": r["qty"], "orders": r["orders"]})
+    return queue
+
+
+def bulk_set_status(order_ids, new_status):
+    """Move the given orders to `new_status` with one UPDATE.
+
+    Orders already in that status are left alone. Returns the ids that changed.
+    """
+    with transaction.atomic():
+        orders = list(
+            Order.objects.select_for_update()
+            .filter(pk__in=order_ids).exclude(status=new_status)
+            .only("id", "user_id", "status", "service_day", "total_minor", "pickup_time", "pickup_slot_id")
+        )
+        if not orders:
+            return []
+        changed = [o.pk for o in orders]
+        Order.objects.filter(pk__in=changed).update(status=new_status, updated_at=timezone.now())
+
+        for (day, old_status), n in Counter((o.service_day, o.status) for o in orders).items():
+            record_status_change(day, old_status, new_status, count=n)
+        if new_status == Order.CANCELLED:
+            slots.release_many(changed)
+        for o in orders:
+            o.status = new_status
+            publish_order_event(o)
+    return changed
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.orders.archive import archive_after_days, archive_batch, archive_cutoff
+from apps.orders.checkout import service_day_for
+
+
+class Command(BaseCommand):
+    help = ("Move completed/cancelled orders older than ORDER_ARCHIVE_AFTER_DAYS into ArchivedOrder, "
+            "one short transaction per batch.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=None,
+                            help="archive service days older than this (at least ORDER_ARCHIVE_AFTER_DAYS)")
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--pause", type=float, default=0.0,
+                            help="seconds to sleep between batches, to leave room for live writes")
+
+    def handle(self, *args, **options):
+        days = options["days"] if options["days"] is not None else archive_after_days()
+        if days < archive_after_days():
+            # MyOrdersView only merges in the archive past that horizon
+            raise CommandError(f"--days must be at least ORDER_ARCHIVE_AFTER_DAYS ({archive_after_days()}).")
+        cutoff = archive_cutoff(service_day_for(timezone.now()), days)
+        total = 0
+        while True:
+            moved = archive_batch(cutoff, options["batch_size"])
+            if not moved:
+                break
+            total += moved
+            if options["pause"]:
+                time.sleep(options["pause"])
+        self.stdout.write(self.style.SUCCESS(f"Archived {total} order(s) from before {cutoff}."))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from apps.orders.recommendations import build
+
+
+class Command(BaseCommand):
+    help = ("Recompute per-user reorder suggestions for users with new orders (or everyone with --full) "
+            "and the popular items per pickup hour.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true",
+                            help="rebuild every user, e.g. nightly, to pick up cancellations and archiving")
+        parser.add_argument("--batch-size", type=int, default=500, help="users per history query")
+
+    def handle(self, *args, **options):
+        users, hours = build(full=options["full"], batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt suggestions for {users} user(s); popular items for {hours} hour(s)."))
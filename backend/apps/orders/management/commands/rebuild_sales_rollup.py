@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.orders.checkout import service_day_for
+from apps.orders.rollup import rebuild_rollup
+
+
+class Command(BaseCommand):
+    help = "Recompute DailySalesRollup from Order rows (all history, or the last N days)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=None,
+                            help="only rebuild the last N service days")
+
+    def handle(self, *args, **options):
+        since = None
+        if options["days"] is not None:
+            since = service_day_for(timezone.now()) - timedelta(days=options["days"] - 1)
+        days = rebuild_rollup(since=since)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {days} rollup day(s)."))
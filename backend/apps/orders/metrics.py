@@ -0,0 +1,19 @@
+# apps/orders/metrics.py
+from django.db.models import Count
+from django.utils import timezone
+
+from apps.core.metrics import REGISTRY, Counter
+
+CHECKOUT_OUTCOMES = Counter("checkout_outcomes_total", "Checkout attempts by result code (OK on success).", ("code",))
+
+
+@REGISTRY.register_collector
+def orders_by_status():
+    """Today's orders per status, from one grouped query at scrape time."""
+    from .checkout import service_day_for
+    from .models import Order
+
+    counts = dict(Order.objects.filter(service_day=service_day_for(timezone.now()))
+                  .values_list("status").annotate(n=Count("id")).order_by())
+    samples = [({"status": s}, counts.get(s, 0)) for s, _ in Order.STATUSES]
+    yield "orders_today", "gauge", "Orders for the current service day by status.", samples
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.7 on 2026-10-18 15:19
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_rollup(apps, schema_editor):
+    Order = apps.get_model("orders", "Order")
+    DailySalesRollup = apps.get_model("orders", "DailySalesRollup")
+    rows = {}
+    grouped = Order.objects.values("service_day", "status").annotate(n=Count("id"), revenue=Sum("total_minor"))
+    for g in grouped.order_by():
+        row = rows.setdefault(g["service_day"], {"order_count": 0, "revenue_minor": 0})
+        row["order_count"] += g["n"]
+        row["revenue_minor"] += g["revenue"] or 0
+        row[f"{g['status']}_count"] = g["n"]
+    DailySalesRollup.objects.bulk_create(
+        [DailySalesRollup(service_day=day, **row) for day, row in rows.items()], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_order_orderitem_orderquota_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('service_day', models.DateField(unique=True)),
+                ('order_count', models.IntegerField(default=0)),
+                ('revenue_minor', models.BigIntegerField(default=0)),
+                ('pending_count', models.IntegerField(default=0)),
+                ('paid_count', models.IntegerField(default=0)),
+                ('preparing_count', models.IntegerField(default=0)),
+                ('ready_count', models.IntegerField(default=0)),
+                ('completed_count', models.IntegerField(default=0)),
+                ('cancelled_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['service_day', 'status'], name='orders_orde_service_9e4804_idx'),
+        ),
+        migrations.RunPython(backfill_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:08
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_order_status_pickup_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('paid', 'Paid'), ('preparing', 'Preparing'), ('ready', 'Ready'), ('completed', 'Completed'), ('cancelled', 'Cancelled')], max_length=12)),
+                ('total_minor', models.PositiveIntegerField(default=0)),
+                ('paid_minor', models.PositiveIntegerField(default=0)),
+                ('pickup_time', models.DateTimeField()),
+                ('service_day', models.DateField()),
+                ('created_at', models.DateTimeField()),
+                ('items', models.JSONField(default=list)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_orders', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'created_at', 'id'], name='orders_arch_user_id_852135_idx'), models.Index(fields=['service_day', 'status'], name='orders_arch_service_7d531c_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.7 on 2026-10-18 16:24
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def link_order_items(apps, schema_editor):
+    """Point existing lines at the item of the same name, where that name is unambiguous."""
+    Item = apps.get_model("catalog", "Item")
+    OrderItem = apps.get_model("orders", "OrderItem")
+    unique = Item.objects.values("name").annotate(n=Count("id")).filter(n=1).values_list("name", flat=True)
+    for item_id, name in Item.objects.filter(name__in=list(unique)).values_list("id", "name"):
+        OrderItem.objects.filter(item_name=name, item__isnull=True).update(item_id=item_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('catalog', '0001_initial'),
+        ('orders', '0007_archived_order'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PopularItems',
+            fields=[
+                ('hour', models.PositiveSmallIntegerField(primary_key=True, serialize=False)),
+                ('items', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UserRecommendation',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('favorites', models.JSONField(default=list)),
+                ('combos', models.JSONField(default=list)),
+                ('last_order_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='item',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='catalog.item'),
+        ),
+        migrations.RunPython(link_order_items, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,6 @@
 from django.conf import settings
 from django.db import models
+from django.db.models import F, Sum
 from django.utils import timezone
 from apps.catalog.models import Item
 
@@ -15,7 +16,17 @@ class Cart(models.Model):
 
     @property
     def total_minor(self) -> int:
-        return sum(ci.line_total_minor for ci in self.items.select_related("item"))
+        # Reuse prefetched lines when present,
+        # otherwise let the DB do the sum instead of loading every line.
+        lines = getattr(self, "_prefetched_objects_cache", {}).get("items")
+        if lines is not None:
+            return sum(ci.line_total_minor for ci in lines)
+        return self.items.aggregate(total=Sum(F("qty") * F("item__price_minor")))["total"] or 0
+
+    def touch(self):
+        """Move updated_at after a change to the lines; CartView's ETag is built from it."""
+        self.updated_at = timezone.now()
+        Cart.objects.filter(pk=self.pk).update(updated_at=self.updated_at)
 
     def __str__(self):
         return f"Cart<{self.id}> user={self.user_id}"
@@ -59,11 +70,26 @@ class Order(models.Model):
     total_minor = models.PositiveIntegerField(default=0)
     paid_minor = models.PositiveIntegerField(default=0)
     pickup_time = models.DateTimeField()  # MVP: exact timestamp
+    pickup_slot = models.ForeignKey("PickupSlot", null=True, blank=True, on_delete=models.SET_NULL,
+                                    related_name="orders")
     service_day = models.DateField()      # denormalized "Dubai day" for quotas
     created_at = models.DateTimeField(auto_now_add=True)
+    # set by every write, including queryset updates (see kitchen.bulk_set_status);
+    # MyOrdersView's ETag is built from it
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
-        indexes = [models.Index(fields=["user", "service_day", "status", "created_at"])]
+        indexes = [
+            models.Index(fields=["user", "service_day", "status", "created_at"]),
+            models.Index(fields=["user", "updated_at"]),
+            models.Index(fields=["service_day", "status"]),
+            # keyset pagination (created_at, id): my orders / admin list / admin list by status
+            models.Index(fields=["user", "created_at", "id"]),
+            models.Index(fields=["created_at", "id"]),
+            models.Index(fields=["status", "created_at", "id"]),
+            # kitchen queue: open orders by due time
+            models.Index(fields=["status", "pickup_time"]),
+        ]
 
     def __str__(self):
         return f"Order<{self.id}> {self.status} user={self.user_id}"
@@ -71,6 +97,9 @@ class Order(models.Model):
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="items")
+    # the menu item this line was bought as (null for lines older than the
+    # link, or once the item is deleted); the name/price stay the record
+    item = models.ForeignKey(Item, null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
     item_name = models.CharField(max_length=200)
     unit_price_minor = models.PositiveIntegerField()
     qty = models.PositiveIntegerField(default=1)
@@ -80,6 +109,62 @@ class OrderItem(models.Model):
         return f"OrderItem order={self.order_id} {self.item_name} x {self.qty}"
 
 
+# ---- ARCHIVE ----
+class ArchivedOrder(models.Model):
+    """
+    A completed or cancelled order moved out of Order/OrderItem by
+    `manage.py archive_orders`. It keeps the original id, and the lines are
+    stored inline as JSON (same keys as OrderItemSerializer), so one row
+    replaces an Order and its OrderItems. MyOrdersView merges these in when a
+    student pages back past ORDER_ARCHIVE_AFTER_DAYS.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="archived_orders")
+    status = models.CharField(max_length=12, choices=Order.STATUSES)
+    total_minor = models.PositiveIntegerField(default=0)
+    paid_minor = models.PositiveIntegerField(default=0)
+    pickup_time = models.DateTimeField()
+    service_day = models.DateField()
+    created_at = models.DateTimeField()
+    items = models.JSONField(default=list)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "created_at", "id"]),
+            models.Index(fields=["service_day", "status"]),
+        ]
+
+    def __str__(self):
+        return f"ArchivedOrder<{self.id}> {self.status} user={self.user_id}"
+
+
+# ---- PICKUP SLOTS ----
+class PickupSlot(models.Model):
+    """
+    A pickup window with a fixed capacity (orders or item units, see
+    settings.PICKUP_SLOT_UNIT). `reserved` is a counter bumped by a
+    conditional UPDATE at checkout (see apps.orders.slots), so listing
+    availability never counts Order rows.
+    """
+    service_day = models.DateField()
+    starts_at = models.DateTimeField(unique=True)
+    ends_at = models.DateTimeField()
+    capacity = models.PositiveIntegerField()
+    reserved = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["starts_at"]
+        indexes = [models.Index(fields=["service_day", "starts_at"])]
+
+    @property
+    def available(self) -> int:
+        return max(0, self.capacity - self.reserved)
+
+    def __str__(self):
+        return f"PickupSlot<{self.starts_at:%Y-%m-%d %H:%M}> {self.reserved}/{self.capacity}"
+
+
 # ---- DAILY QUOTA (5/day) ----
 class OrderQuota(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
@@ -87,4 +172,55 @@ class OrderQuota(models.Model):
     paid_count = models.PositiveIntegerField(default=0)
 
     class Meta:
-        unique_together = (("user", "service_day"),)
\ No newline at end of file
+        unique_together = (("user", "service_day"),)
+
+
+# ---- DAILY SALES ROLLUP (admin dashboard) ----
+class DailySalesRollup(models.Model):
+    """
+    One row per service day, kept up to date by apps.orders.rollup when an
+    order is created or changes status. `manage.py rebuild_sales_rollup`
+    recomputes it from Order rows.
+    """
+    service_day = models.DateField(unique=True)
+    order_count = models.IntegerField(default=0)
+    revenue_minor = models.BigIntegerField(default=0)
+    # per-status counts, named f"{status}_count"
+    pending_count = models.IntegerField(default=0)
+    paid_count = models.IntegerField(default=0)
+    preparing_count = models.IntegerField(default=0)
+    ready_count = models.IntegerField(default=0)
+    completed_count = models.IntegerField(default=0)
+    cancelled_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"DailySalesRollup<{self.service_day}> orders={self.order_count} revenue={self.revenue_minor}"
+
+
+# ---- RECOMMENDATIONS ----
+class UserRecommendation(models.Model):
+    """
+    A user's most ordered items and the item sets they order together,
+    precomputed by apps.orders.recommendations (manage.py
+    build_recommendations). One row per user, read by primary key.
+    """
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True,
+                                related_name="+")
+    favorites = models.JSONField(default=list)   # [[item_id, orders], ...]
+    combos = models.JSONField(default=list)      # [[[item_id, ...], orders], ...]
+    last_order_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"UserRecommendation<{self.user_id}> favorites={len(self.favorites)}"
+
+
+class PopularItems(models.Model):
+    """Most ordered items for pickups in one local hour of the day, over recent days."""
+    hour = models.PositiveSmallIntegerField(primary_key=True)
+    items = models.JSONField(default=list)       # [[item_id, qty], ...]
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"PopularItems<{self.hour:02d}h> {len(self.items)} items"
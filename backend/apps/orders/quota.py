@@ -0,0 +1,311 @@
+# apps/orders/quota.py
+"""
+Daily order quota.
+
+Each user's count for the current service day lives in a counter store, not
+in the database, so checking and taking a slot costs one counter operation:
+an increment that is refused once the count reaches the user's limit. A
+checkout that fails after claiming gives the slot back with `release`.
+
+The store is pluggable via settings.ORDER_QUOTA_STORE:
+
+  CacheCounterStore  (default) counters in the ORDER_QUOTA_CACHE cache alias.
+                     incr/decr are atomic on Redis and memcached, so a shared
+                     cache makes the limit hold across workers. The alias
+                     must not evict these keys.
+  LocalCounterStore  a dict behind a lock, for tests and single-process runs.
+
+The first claim of a day in an empty store (a restart, a flushed cache, a new
+day) rebuilds every counter for that day from Order rows: one aggregate
+query, written with add() so it never overwrites a counter another worker
+has already moved. Counters expire a couple of days later by themselves.
+
+OrderQuota is kept as a persisted copy: users with committed or released
+claims are queued in this process, and a background thread upserts their
+current counters in one statement per ORDER_QUOTA_FLUSH_BATCH users every
+ORDER_QUOTA_FLUSH_INTERVAL seconds, sooner once a batch is full. Checkout
+only adds to the queue, so it never waits on the flush and a failing flush
+(a locked database) can't fail an order that has already committed: the
+users stay queued and the next round writes them. Whatever is still queued
+when the process exits is lost, which the rebuild from Order rows covers.
+Each entry remembers the database its claim committed to, and a flush only
+writes entries for the database OrderQuota writes go to now; the rest are
+dropped (a test database that has since been torn down).
+
+The limit is DAILY_ORDER_LIMIT unless the user belongs to a group in
+DAILY_ORDER_LIMIT_BY_GROUP (highest one wins, None = no limit). Staff have
+no limit. Group membership is remembered per process for
+ORDER_QUOTA_GROUP_TTL seconds.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import close_old_connections, connection, connections, router, transaction
+from django.db.models import Count
+from django.utils.module_loading import import_string
+
+from apps.core.writes import run_write
+from .models import Order, OrderQuota
+
+COUNTER_KEY = "quota:{day}:{user_id}"
+WARM_KEY = "quota:{day}:warm"
+COUNTER_TIMEOUT = 2 * 24 * 60 * 60   # outlives the service day it counts
+
+logger = logging.getLogger(__name__)
+
+
+class LocalCounterStore:
+    """In-process counters; the limit only holds within this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def get_many(self, keys):
+        with self._lock:
+            return {k: self._values[k] for k in keys if k in self._values}
+
+    def add(self, key, value):
+        with self._lock:
+            if key in self._values:
+                return False
+            self._values[key] = value
+            return True
+
+    def incr_below(self, key, limit):
+        with self._lock:
+            value = self._values.get(key)
+            if value is None:
+                return None
+            if value >= limit:
+                return False
+            self._values[key] = value + 1
+            return True
+
+    def decr(self, key):
+        with self._lock:
+            if self._values.get(key, 0) > 0:
+                self._values[key] -= 1
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class CacheCounterStore:
+    """
+    Counters in a Django cache. There is no compare-and-increment in the
+    cache API, so incr_below increments and takes it back when that went
+    over the limit: the count can sit at limit + n for an instant while n
+    refused claims undo themselves, but a claim only succeeds at <= limit.
+    """
+
+    def __init__(self):
+        self.cache = caches[getattr(settings, "ORDER_QUOTA_CACHE", "default")]
+
+    def get_many(self, keys):
+        return self.cache.get_many(keys)
+
+    def add(self, key, value):
+        return self.cache.add(key, value, timeout=COUNTER_TIMEOUT)
+
+    def incr_below(self, key, limit):
+        try:
+            value = self.cache.incr(key)
+        except ValueError:   # no such key
+            return None
+        if value > limit:
+            self.cache.decr(key)
+            return False
+        return True
+
+    def decr(self, key):
+        try:
+            self.cache.decr(key)
+        except ValueError:
+            pass
+
+    def clear(self):
+        self.cache.clear()
+
+
+_local = {"store": None, "path": None}
+_store_lock = threading.Lock()
+
+
+def get_store():
+    path = getattr(settings, "ORDER_QUOTA_STORE", "apps.orders.quota.CacheCounterStore")
+    if _local["path"] != path:
+        with _store_lock:
+            if _local["path"] != path:
+                _local["store"], _local["path"] = import_string(path)(), path
+    return _local["store"]
+
+
+# ---------- limits ----------
+_groups = {}   # user_id -> (expires, frozenset of group names)
+
+
+def _group_names(user_id):
+    cached = _groups.get(user_id)
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1]
+    from django.contrib.auth.models import Group
+    names = frozenset(Group.objects.filter(user__id=user_id).values_list("name", flat=True))
+    _groups[user_id] = (time.monotonic() + getattr(settings, "ORDER_QUOTA_GROUP_TTL", 60), names)
+    return names
+
+
+def limit_for(user):
+    """Orders the user may place per service day, or None for no limit."""
+    if user.is_staff or user.is_superuser:
+        return None
+    default = getattr(settings, "DAILY_ORDER_LIMIT", 5)
+    by_group = getattr(settings, "DAILY_ORDER_LIMIT_BY_GROUP", {})
+    if not by_group:
+        return default
+    limits = [by_group[name] for name in _group_names(user.pk) if name in by_group]
+    if not limits:
+        return default
+    return None if None in limits else max(limits)
+
+
+# ---------- counters ----------
+def _key(user_id, service_day):
+    return COUNTER_KEY.format(day=service_day.isoformat(), user_id=user_id)
+
+
+def warm(service_day, store=None):
+    """Load every user's count for service_day from Order rows into the store."""
+    store = store or get_store()
+    counts = (Order.objects.filter(service_day=service_day)
+              .values("user_id").annotate(n=Count("id")).order_by().values_list("user_id", "n"))
+    for user_id, n in counts:
+        store.add(_key(user_id, service_day), n)
+    store.add(WARM_KEY.format(day=service_day.isoformat()), 1)
+
+
+def used(user, service_day):
+    """Orders counted against the user's quota for service_day."""
+    store = get_store()
+    key, warm_key = _key(user.pk, service_day), WARM_KEY.format(day=service_day.isoformat())
+    values = store.get_many([key, warm_key])
+    if warm_key not in values:
+        warm(service_day, store)
+        values = store.get_many([key])
+    return values.get(key, 0)
+
+
+def claim(user, service_day, limit):
+    """Take one of the user's orders for service_day; False once `limit` is reached."""
+    store = get_store()
+    key = _key(user.pk, service_day)
+    claimed = store.incr_below(key, limit)
+    if claimed is None:
+        # first claim for this user in this store today
+        if not store.get_many([WARM_KEY.format(day=service_day.isoformat())]):
+            warm(service_day, store)
+        store.add(key, 0)
+        claimed = store.incr_below(key, limit)
+    return claimed
+
+
+def release(user, service_day):
+    """Give back a claim whose checkout didn't go through."""
+    get_store().decr(_key(user.pk, service_day))
+    # a flush may have copied the claimed count already; the next one corrects it
+    _queue(user.pk, service_day)
+
+
+# ---------- write-behind to OrderQuota ----------
+_pending = set()   # (database name, user_id, service_day) with claims not yet persisted
+_pending_lock = threading.Lock()
+_wake = threading.Event()
+_flusher = {"thread": None, "stop": None}
+
+
+def record(user, service_day):
+    """Queue the user's count for persisting once the current transaction commits."""
+    transaction.on_commit(lambda: _queue(user.pk, service_day), robust=True)
+
+
+def _database():
+    """Name of the database OrderQuota is written to right now."""
+    return connections[router.db_for_write(OrderQuota)].settings_dict["NAME"]
+
+
+def _queue(user_id, service_day):
+    entry = (_database(), user_id, service_day)
+    with _pending_lock:
+        _pending.add(entry)
+        full = len(_pending) >= getattr(settings, "ORDER_QUOTA_FLUSH_BATCH", 500)
+    _start_flusher()
+    if full:
+        _wake.set()
+
+
+def _start_flusher():
+    with _pending_lock:
+        if _flusher["thread"] is not None and _flusher["thread"].is_alive():
+            return
+        stop = threading.Event()
+        thread = threading.Thread(target=_run_flusher, args=(stop,), name="order-quota-flush", daemon=True)
+        _flusher.update(thread=thread, stop=stop)
+    thread.start()
+
+
+def _run_flusher(stop):
+    while not stop.is_set():
+        _wake.wait(getattr(settings, "ORDER_QUOTA_FLUSH_INTERVAL", 5.0))
+        _wake.clear()
+        if stop.is_set():
+            break
+        try:
+            flush()
+        except Exception:
+            logger.exception("Order quota flush failed; the users stay queued for the next one")
+        finally:
+            close_old_connections()
+    connection.close()
+
+
+def flush():
+    """Upsert the counters of every queued user into OrderQuota; returns how many."""
+    database = _database()
+    with _pending_lock:
+        queued = list(_pending)
+        _pending.clear()
+    batch = [(uid, day) for name, uid, day in queued if name == database]
+    if len(batch) < len(queued):
+        logger.warning("Dropped %d queued order quotas claimed against another database",
+                       len(queued) - len(batch))
+    if not batch:
+        return 0
+    values = get_store().get_many([_key(uid, day) for uid, day in batch])
+    rows = [OrderQuota(user_id=uid, service_day=day, paid_count=values[_key(uid, day)])
+            for uid, day in batch if _key(uid, day) in values]
+    try:
+        run_write(OrderQuota.objects.bulk_create, rows, update_conflicts=True,
+                  unique_fields=["user", "service_day"], update_fields=["paid_count"],
+                  batch_size=getattr(settings, "ORDER_QUOTA_FLUSH_BATCH", 500))
+    except Exception:
+        with _pending_lock:
+            _pending.update((database, uid, day) for uid, day in batch)   # try again with the next flush
+        raise
+    return len(rows)
+
+
+def reset():
+    """Forget all counters and queued writes and stop the flush thread (tests)."""
+    get_store().clear()
+    with _pending_lock:
+        _pending.clear()
+        stop = _flusher["stop"]
+        _flusher.update(thread=None, stop=None)
+    if stop is not None:
+        stop.set()
+        _wake.set()
+    _groups.clear()
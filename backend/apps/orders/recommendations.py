@@ -0,0 +1,161 @@
+# apps/orders/recommendations.py
+"""
+Precomputed "order again" suggestions.
+
+For each user, the lines of their (not cancelled) orders are reduced to
+baskets, i.e. sets of item ids, and mined for:
+  - favorites: the items in the most orders
+  - combos:    item sets of 2..MAX_SET_SIZE that appear together in at least
+               MIN_SUPPORT orders, keeping only closed sets (a set is dropped
+               when a bigger set has the same count, so "wrap + juice" isn't
+               listed next to "wrap + juice + cookie" when they always come
+               together)
+and stored as one UserRecommendation row. PopularItems holds the most
+ordered items per local pickup hour over the last POPULARITY_DAYS days.
+
+`build(full=False)` only rebuilds users with orders newer than the highest
+order already folded in (a primary key range scan); `full=True` rebuilds
+everyone and drops rows of users without orders. Both refresh popularity.
+Run the incremental build every few minutes and a full one nightly (see
+`manage.py build_recommendations`). Orders that have been archived no
+longer count, so suggestions follow the last ORDER_ARCHIVE_AFTER_DAYS.
+
+Serving is two primary key reads; items are resolved against the menu
+snapshot, so anything inactive or deleted since the build is left out.
+"""
+from collections import Counter, defaultdict
+from datetime import timedelta
+from itertools import combinations, islice
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Max, Sum
+from django.db.models.functions import ExtractHour
+from django.utils import timezone
+
+from apps.catalog.cache import get_menu_items
+from .checkout import service_day_for
+from .models import Order, OrderItem, PopularItems, UserRecommendation
+
+MAX_FAVORITES = 8
+MAX_COMBOS = 3
+MAX_SET_SIZE = 3
+MAX_BASKET = 12      # larger baskets only contribute their first items to combos
+MIN_SUPPORT = 2
+MAX_POPULAR = 10
+
+
+def _popularity_days():
+    return getattr(settings, "RECOMMENDATION_POPULARITY_DAYS", 28)
+
+
+# ---------- mining ----------
+def itemsets(baskets):
+    """Counter of item sets (sorted tuples, up to MAX_SET_SIZE) over baskets."""
+    counts = Counter()
+    for basket in baskets:
+        items = sorted(basket)
+        counts.update((i,) for i in items)
+        items = items[:MAX_BASKET]
+        for size in range(2, min(MAX_SET_SIZE, len(items)) + 1):
+            counts.update(combinations(items, size))
+    return counts
+
+
+def summarize(baskets):
+    """(favorites, combos) as stored on UserRecommendation."""
+    counts = itemsets(baskets)
+    singles = sorted(((s[0], n) for s, n in counts.items() if len(s) == 1), key=lambda p: (-p[1], p[0]))
+    sets = [(s, n) for s, n in counts.items() if len(s) > 1 and n >= MIN_SUPPORT]
+    # counts only shrink as sets grow, so checking the next size up is enough
+    covered = {sub for t, m in sets if len(t) > 2
+               for sub in combinations(t, len(t) - 1) if counts[sub] == m}
+    closed = [(s, n) for s, n in sets if s not in covered]
+    closed.sort(key=lambda p: (-p[1], -len(p[0]), p[0]))
+    return ([list(p) for p in singles[:MAX_FAVORITES]],
+            [[list(s), n] for s, n in closed[:MAX_COMBOS]])
+
+
+# ---------- building ----------
+def _baskets(user_ids):
+    """{user_id: [set of item ids per order]} and {user_id: last order id}."""
+    baskets, last = defaultdict(dict), {}
+    lines = (OrderItem.objects.filter(order__user_id__in=user_ids, item__isnull=False)
+             .exclude(order__status=Order.CANCELLED)
+             .values_list("order__user_id", "order_id", "item_id"))
+    for user_id, order_id, item_id in lines.iterator(chunk_size=2000):
+        baskets[user_id].setdefault(order_id, set()).add(item_id)
+        last[user_id] = max(last.get(user_id, 0), order_id)
+    return {uid: list(orders.values()) for uid, orders in baskets.items()}, last
+
+
+def build_users(user_ids):
+    """Recompute and upsert UserRecommendation for user_ids; returns rows written."""
+    baskets, last = _baskets(user_ids)
+    rows = []
+    for user_id, user_baskets in baskets.items():
+        favorites, combos = summarize(user_baskets)
+        rows.append(UserRecommendation(user_id=user_id, favorites=favorites, combos=combos,
+                                       last_order_id=last[user_id]))
+    UserRecommendation.objects.bulk_create(
+        rows, update_conflicts=True, unique_fields=["user"],
+        update_fields=["favorites", "combos", "last_order_id", "updated_at"])
+    # users whose orders were all cancelled
+    UserRecommendation.objects.filter(user_id__in=set(user_ids) - baskets.keys()).delete()
+    return len(rows)
+
+
+def build_popularity(today=None):
+    """Rewrite PopularItems for every hour from the last POPULARITY_DAYS days."""
+    today = today or service_day_for(timezone.now())
+    since = today - timedelta(days=_popularity_days())
+    totals = (OrderItem.objects.filter(order__service_day__gte=since, item__isnull=False)
+              .exclude(order__status=Order.CANCELLED)
+              .annotate(hour=ExtractHour("order__pickup_time"))
+              .values("hour", "item_id").annotate(qty=Sum("qty")).order_by())
+    by_hour = defaultdict(list)
+    for row in totals:
+        by_hour[row["hour"]].append((row["item_id"], row["qty"]))
+    rows = []
+    for hour in range(24):
+        ranked = sorted(by_hour[hour], key=lambda p: (-p[1], p[0]))[:MAX_POPULAR]
+        rows.append(PopularItems(hour=hour, items=[list(p) for p in ranked]))
+    PopularItems.objects.bulk_create(rows, update_conflicts=True, unique_fields=["hour"],
+                                     update_fields=["items", "updated_at"])
+    return sum(1 for row in rows if row.items)
+
+
+def _chunks(iterable, size):
+    it = iter(iterable)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
+
+def build(full=False, batch_size=500):
+    """Returns (users rebuilt, hours with popular items)."""
+    if full:
+        users = (get_user_model().objects.filter(orders__isnull=False).distinct()
+                 .order_by("id").values_list("id", flat=True))
+        UserRecommendation.objects.exclude(user_id__in=users).delete()
+    else:
+        since = UserRecommendation.objects.aggregate(last=Max("last_order_id"))["last"] or 0
+        users = Order.objects.filter(id__gt=since).order_by().values_list("user_id", flat=True).distinct()
+    rebuilt = sum(build_users(chunk) for chunk in _chunks(list(users), batch_size))
+    return rebuilt, build_popularity()
+
+
+# ---------- serving ----------
+def recommendations_for(user, now=None):
+    """The user's favorites and combos plus what's popular at this hour, as menu item dicts."""
+    hour = timezone.localtime(now or timezone.now()).hour
+    stored = UserRecommendation.objects.filter(user_id=user.pk).values_list("favorites", "combos").first()
+    favorites, combos = stored or ([], [])
+    popular = PopularItems.objects.filter(hour=hour).values_list("items", flat=True).first() or []
+    menu = get_menu_items()
+    return {
+        "favorites": [{**menu[i], "orders": n} for i, n in favorites if i in menu],
+        "combos": [{"items": [menu[i] for i in ids], "orders": n}
+                   for ids, n in combos if all(i in menu for i in ids)],
+        "popular": [menu[i] for i, _ in popular if i in menu],
+        "hour": hour,
+    }
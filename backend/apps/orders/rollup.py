@@ -0,0 +1,71 @@
+# apps/orders/rollup.py
+"""
+Incremental maintenance of DailySalesRollup.
+
+Call these inside the same transaction as the Order write they describe, so
+the rollup can't drift from the orders on rollback. Each call is a single
+conditional UPDATE (plus an INSERT the first time a day is seen).
+"""
+from collections import defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+
+from .models import ArchivedOrder, DailySalesRollup, Order
+
+STATUS_FIELDS = {status: f"{status}_count" for status, _ in Order.STATUSES}
+
+
+def _apply(service_day, deltas):
+    deltas = {field: d for field, d in deltas.items() if d}
+    if not deltas:
+        return
+    updates = {field: F(field) + d for field, d in deltas.items()}
+    if DailySalesRollup.objects.filter(service_day=service_day).update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            DailySalesRollup.objects.create(service_day=service_day, **deltas)
+    except IntegrityError:
+        # created concurrently by another writer
+        DailySalesRollup.objects.filter(service_day=service_day).update(**updates)
+
+
+def record_order_created(order):
+    _apply(order.service_day, {
+        "order_count": 1,
+        "revenue_minor": order.total_minor,
+        STATUS_FIELDS[order.status]: 1,
+    })
+
+
+def record_status_change(service_day, old_status, new_status, count=1):
+    if old_status == new_status:
+        return
+    _apply(service_day, {STATUS_FIELDS[old_status]: -count, STATUS_FIELDS[new_status]: count})
+
+
+def rebuild_rollup(since=None):
+    """Recompute rollup rows from Order and ArchivedOrder (all days, or service_day >= since)."""
+    rows = defaultdict(lambda: {"order_count": 0, "revenue_minor": 0})
+    for model in (Order, ArchivedOrder):
+        orders = model.objects.all()
+        if since is not None:
+            orders = orders.filter(service_day__gte=since)
+        grouped = orders.values("service_day", "status").annotate(n=Count("id"), revenue=Sum("total_minor"))
+        for g in grouped.order_by():
+            row = rows[g["service_day"]]
+            row["order_count"] += g["n"]
+            row["revenue_minor"] += g["revenue"] or 0
+            field = STATUS_FIELDS[g["status"]]
+            row[field] = row.get(field, 0) + g["n"]
+
+    with transaction.atomic():
+        stale = DailySalesRollup.objects.all()
+        if since is not None:
+            stale = stale.filter(service_day__gte=since)
+        stale.delete()
+        DailySalesRollup.objects.bulk_create(
+            [DailySalesRollup(service_day=day, **row) for day, row in rows.items()], batch_size=500
+        )
+    return len(rows)
@@ -1,8 +1,10 @@
+from collections import defaultdict
+
 from rest_framework import serializers
 from apps.catalog.models import Item
-from apps.catalog.serializers import ItemSerializer
+from apps.catalog.serializers import ITEM_FIELDS, ItemSerializer
 from .models import Cart, CartItem
-from .models import Order, OrderItem
+from .models import ArchivedOrder, Order, OrderItem, PickupSlot
 
 
 class CartItemWriteSerializer(serializers.ModelSerializer):
@@ -20,6 +22,28 @@ class CartItemWriteSerializer(serializers.ModelSerializer):
         return v
 
 
+class CartOpSerializer(serializers.Serializer):
+    """One step of a cart batch: add qty, set qty (0 removes) or remove."""
+    ADD, SET, REMOVE = "add", "set", "remove"
+
+    op = serializers.ChoiceField(choices=[ADD, SET, REMOVE])
+    item_id = serializers.IntegerField()
+    qty = serializers.IntegerField(min_value=0, required=False)
+
+    def validate(self, data):
+        if data["op"] == self.ADD and data.setdefault("qty", 1) < 1:
+            raise serializers.ValidationError({"qty": ["Quantity must be at least 1."]})
+        if data["op"] == self.SET and "qty" not in data:
+            raise serializers.ValidationError({"qty": ["This field is required."]})
+        return data
+
+
+class CartBatchSerializer(serializers.Serializer):
+    MAX_OPS = 100
+
+    ops = serializers.ListField(child=CartOpSerializer(), allow_empty=False, max_length=MAX_OPS)
+
+
 class CartItemReadSerializer(serializers.ModelSerializer):
     item = ItemSerializer(read_only=True)
     line_total_minor = serializers.IntegerField(read_only=True)
@@ -37,14 +61,82 @@ class CartSerializer(serializers.ModelSerializer):
         model = Cart
         fields = ["id", "items", "total_minor", "updated_at"]
 
+ORDER_FIELDS = ("id", "status", "total_minor", "paid_minor", "pickup_time", "service_day", "created_at")
+ORDER_ITEM_FIELDS = ("item_name", "unit_price_minor", "qty", "line_total_minor")
+
+
 class OrderItemSerializer(serializers.ModelSerializer):
     class Meta:
         model = OrderItem
-        fields = ["item_name", "unit_price_minor", "qty", "line_total_minor"]
+        fields = list(ORDER_ITEM_FIELDS)
 
 class OrderSerializer(serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
 
     class Meta:
         model = Order
-        fields = ["id", "status", "total_minor", "paid_minor", "pickup_time", "service_day", "created_at", "items"]
\ No newline at end of file
+        fields = [*ORDER_FIELDS, "items"]
+
+
+class ArchivedOrderSerializer(serializers.ModelSerializer):
+    """Same shape as OrderSerializer; the lines are already stored that way."""
+    items = serializers.JSONField(read_only=True)
+
+    class Meta:
+        model = ArchivedOrder
+        fields = OrderSerializer.Meta.fields
+
+
+class PickupSlotSerializer(serializers.ModelSerializer):
+    available = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = PickupSlot
+        fields = ["id", "starts_at", "ends_at", "capacity", "reserved", "available"]
+
+
+# ---------- values() fast paths ----------
+# The read endpoints that return whole carts and order pages build their
+# output from values_list() rows with these instead of going through model
+# instances and serializer fields. The result is the same as the matching
+# serializer's .data, key for key; dates and datetimes go through the same
+# DRF fields so their format and timezone follow the settings as before.
+_datetime = serializers.DateTimeField().to_representation
+_date = serializers.DateField().to_representation
+
+
+def cart_data(cart):
+    """CartSerializer(cart).data, lines in id order; one query."""
+    lines = (CartItem.objects.filter(cart=cart).order_by("id")
+             .values_list("id", "qty", *(f"item__{f}" for f in ITEM_FIELDS)))
+    items, total = [], 0
+    for line_id, qty, *item in lines:
+        item = dict(zip(ITEM_FIELDS, item))
+        line_total = qty * item["price_minor"]
+        total += line_total
+        items.append({"id": line_id, "item": item, "qty": qty, "line_total_minor": line_total})
+    return {"id": cart.id, "items": items, "total_minor": total, "updated_at": _datetime(cart.updated_at)}
+
+
+def orders_data(rows):
+    """
+    OrderSerializer / ArchivedOrderSerializer data for values() rows of
+    ORDER_FIELDS. Rows with an "items" key are ArchivedOrders and already
+    carry their lines; the lines of the others are read in one query.
+    """
+    lines = defaultdict(list)
+    live = [row["id"] for row in rows if "items" not in row]
+    if live:
+        for order_id, *values in (OrderItem.objects.filter(order_id__in=live).order_by("id")
+                                  .values_list("order_id", *ORDER_ITEM_FIELDS)):
+            lines[order_id].append(dict(zip(ORDER_ITEM_FIELDS, values)))
+    return [{
+        "id": row["id"],
+        "status": row["status"],
+        "total_minor": row["total_minor"],
+        "paid_minor": row["paid_minor"],
+        "pickup_time": _datetime(row["pickup_time"]),
+        "service_day": _date(row["service_day"]),
+        "created_at": _datetime(row["created_at"]),
+        "items": row["items"] if "items" in row else lines[row["id"]],
+    } for row in rows]
@@ -0,0 +1,134 @@
+# apps/orders/slots.py
+"""
+Pickup-slot capacity.
+
+A service day is cut into PICKUP_SLOT_MINUTES windows between
+PICKUP_OPEN_TIME and PICKUP_CLOSE_TIME. Slot rows are created by the first
+reservation of a day (one bulk insert) with PICKUP_SLOT_CAPACITY; listing a
+day never writes, days without rows are listed as empty slots. Staff can
+adjust a single slot's capacity in the admin.
+
+Reserving is one conditional UPDATE:
+    UPDATE ... SET reserved = reserved + units WHERE reserved <= capacity - units
+so concurrent checkouts can't overbook a slot and availability stays O(slots).
+"""
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from .models import Order, OrderItem, PickupSlot
+
+ORDERS = "orders"
+ITEMS = "items"
+
+
+def _config():
+    return {
+        "minutes": getattr(settings, "PICKUP_SLOT_MINUTES", 15),
+        "capacity": getattr(settings, "PICKUP_SLOT_CAPACITY", 30),
+        "unit": getattr(settings, "PICKUP_SLOT_UNIT", ORDERS),
+        "open": time.fromisoformat(getattr(settings, "PICKUP_OPEN_TIME", "08:00")),
+        "close": time.fromisoformat(getattr(settings, "PICKUP_CLOSE_TIME", "20:00")),
+    }
+
+
+def units_for(lines) -> int:
+    """Capacity a cart (or order) consumes: 1 per order, or its item count."""
+    if _config()["unit"] == ITEMS:
+        return sum(line.qty for line in lines)
+    return 1
+
+
+def slot_start_for(dt):
+    """Start of the slot containing dt, or None if outside opening hours."""
+    cfg = _config()
+    local = timezone.localtime(dt)
+    if not (cfg["open"] <= local.time() < cfg["close"]):
+        return None
+    opened = local.replace(hour=cfg["open"].hour, minute=cfg["open"].minute, second=0, microsecond=0)
+    step = timedelta(minutes=cfg["minutes"])
+    return opened + ((local - opened) // step) * step
+
+
+def _day_slots(day):
+    """Unsaved rows for every window of `day` at the default capacity."""
+    cfg = _config()
+    tz = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime.combine(day, cfg["open"]), tz)
+    close = timezone.make_aware(datetime.combine(day, cfg["close"]), tz)
+    step = timedelta(minutes=cfg["minutes"])
+    slots = []
+    while start < close:
+        slots.append(PickupSlot(service_day=day, starts_at=start, ends_at=min(start + step, close),
+                                capacity=cfg["capacity"]))
+        start += step
+    return slots
+
+
+def ensure_day_slots(day):
+    """Create any missing slot rows for `day` in one bulk insert."""
+    PickupSlot.objects.bulk_create(_day_slots(day), ignore_conflicts=True)
+
+
+def slots_for_day(day):
+    """Every slot of `day`, in order: the stored rows, and unsaved empty ones
+    (id None) where no checkout has created the day's rows yet. Read-only."""
+    stored = {slot.starts_at: slot for slot in PickupSlot.objects.filter(service_day=day)}
+    for slot in _day_slots(day):
+        stored.setdefault(slot.starts_at, slot)
+    return sorted(stored.values(), key=lambda slot: slot.starts_at)
+
+
+def booking_window():
+    """(first, last) service day a pickup can be booked or listed for."""
+    today = timezone.localdate()
+    return today, today + timedelta(days=getattr(settings, "PICKUP_BOOKING_DAYS", 7))
+
+
+def reserve(starts_at, units):
+    """Reserve `units` in the slot starting at `starts_at`.
+    Returns the slot id, or None if the slot is full."""
+    def _try():
+        return PickupSlot.objects.filter(starts_at=starts_at, reserved__lte=F("capacity") - units).update(
+            reserved=F("reserved") + units)
+
+    if not _try():
+        if PickupSlot.objects.filter(starts_at=starts_at).exists():
+            return None
+        ensure_day_slots(timezone.localtime(starts_at).date())
+        if not _try():
+            return None
+    return PickupSlot.objects.values_list("pk", flat=True).get(starts_at=starts_at)
+
+
+def release(order):
+    """Give a cancelled order's capacity back to its slot."""
+    if order.pickup_slot_id is None:
+        return
+    if _config()["unit"] == ITEMS:
+        units = order.items.aggregate(n=Sum("qty"))["n"] or 0
+    else:
+        units = 1
+    PickupSlot.objects.filter(pk=order.pickup_slot_id, reserved__gte=units).update(reserved=F("reserved") - units)
+
+
+def release_many(order_ids):
+    """release() for a batch of cancelled orders: one grouped read, one UPDATE per slot."""
+    if _config()["unit"] == ITEMS:
+        grouped = (OrderItem.objects.filter(order_id__in=order_ids, order__pickup_slot__isnull=False)
+                   .values_list("order__pickup_slot").annotate(units=Sum("qty")))
+    else:
+        grouped = (Order.objects.filter(pk__in=order_ids, pickup_slot__isnull=False)
+                   .values_list("pickup_slot").annotate(units=Count("id")))
+    for slot_id, units in grouped.order_by():
+        PickupSlot.objects.filter(pk=slot_id, reserved__gte=units).update(reserved=F("reserved") - units)
+
+
+def has_room(starts_at, units) -> bool:
+    """Read-only pre-check; a missing slot row means nothing is reserved yet."""
+    slot = PickupSlot.objects.filter(starts_at=starts_at).values("capacity", "reserved").first()
+    if slot is None:
+        return units <= _config()["capacity"]
+    return slot["reserved"] + units <= slot["capacity"]
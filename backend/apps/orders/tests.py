@@ -1,3 +1,1002 @@
-from django.test import TestCase
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from datetime import date, datetime, timedelta
+from io import StringIO
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, connections
+from django.db.models import Prefetch
+from django.test import AsyncClient, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from apps.catalog.cache import get_menu_items
+from apps.catalog.models import Category, Item
+from apps.wallet.models import Wallet, WalletTx
+from .events import InProcessBackend, Subscription, get_backend
+from .views import SSE_TICKET_TTL
+from . import quota, recommendations
+from .checkout import CheckoutError, checkout, service_day_for
+from .kitchen import bulk_set_status
+from .models import (ArchivedOrder, Cart, CartItem, DailySalesRollup, Order, OrderItem, OrderQuota, PickupSlot,
+                     UserRecommendation)
+from .rollup import record_order_created, record_status_change
+from .serializers import (ORDER_FIELDS, ArchivedOrderSerializer, CartSerializer, OrderSerializer, cart_data,
+                          orders_data)
+
+User = get_user_model()
+DAILY_ORDER_LIMIT = settings.DAILY_ORDER_LIMIT
+
+
+class CartQueryCountTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("student", password="pw123456")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(name="Food")
+        self.items = Item.objects.bulk_create([
+            Item(category=category, name=f"Item {i:02d}", price_minor=100 + i) for i in range(50)
+        ])
+        self.cart = Cart.objects.create(user=self.user)
+
+    def _fill(self, n):
+        CartItem.objects.filter(cart=self.cart).delete()
+        CartItem.objects.bulk_create([CartItem(cart=self.cart, item=item, qty=2) for item in self.items[:n]])
+
+    def _count_queries(self, method, url):
+        with CaptureQueriesContext(connection) as ctx:
+            res = getattr(self.client, method)(url)
+        self.assertEqual(res.status_code, 200)
+        return len(ctx.captured_queries), res.json()
+
+    def test_cart_read_query_count_is_flat(self):
+        counts = []
+        for n in (1, 10, 50):
+            self._fill(n)
+            count, data = self._count_queries("get", "/api/orders/cart/")
+            self.assertEqual(len(data["items"]), n)
+            self.assertEqual(data["total_minor"], sum(2 * it.price_minor for it in self.items[:n]))
+            counts.append(count)
+        self.assertEqual(len(set(counts)), 1, counts)
+
+    def test_line_delete_query_count_is_flat(self):
+        counts = []
+        for n in (2, 50):
+            self._fill(n)
+            line = CartItem.objects.filter(cart=self.cart).first()
+            count, data = self._count_queries("delete", f"/api/orders/cart/items/{line.id}/")
+            self.assertEqual(len(data["items"]), n - 1)
+            counts.append(count)
+        self.assertEqual(counts[0], counts[1])
+
+    def test_total_without_prefetch_uses_aggregate(self):
+        self._fill(5)
+        cart = Cart.objects.get(pk=self.cart.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(cart.total_minor, sum(2 * it.price_minor for it in self.items[:5]))
+
+    def test_delete_unknown_line_is_404(self):
+        res = self.client.delete("/api/orders/cart/items/999999/")
+        self.assertEqual(res.status_code, 404)
+
+
+
+class ValuesSerializerTests(TestCase):
+    """cart_data / orders_data render to the same bytes as the DRF serializers."""
+
+    def setUp(self):
+        self.user = User.objects.create_user("student", password="pw123456")
+        category = Category.objects.create(name="Food")
+        self.items = Item.objects.bulk_create([
+            Item(category=category, name=f"Shawarma ‘{i}’", description="Ünïcode", price_minor=100 + i,
+                 image_url=f"https://example.com/{i}.png" if i % 2 else "") for i in range(6)
+        ])
+        self.now = timezone.now().replace(microsecond=123456)
+
+    def render(self, data):
+        return JSONRenderer().render(data)
+
+    def test_cart_data(self):
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.bulk_create([CartItem(cart=cart, item=item, qty=i + 1) for i, item in enumerate(self.items)])
+        Cart.objects.filter(pk=cart.pk).update(updated_at=self.now)
+        cart.refresh_from_db()
+        with self.assertNumQueries(1):
+            data = cart_data(cart)
+        cart = Cart.objects.prefetch_related(
+            Prefetch("items", queryset=CartItem.objects.select_related("item").order_by("id"))).get(pk=cart.pk)
+        self.assertEqual(self.render(data), self.render(CartSerializer(cart).data))
+
+    def test_empty_cart_data(self):
+        cart = Cart.objects.create(user=self.user)
+        self.assertEqual(self.render(cart_data(cart)), self.render(CartSerializer(cart).data))
+
+    def test_orders_data_live_and_archived(self):
+        orders = []
+        for n in range(3):
+            order = Order.objects.create(user=self.user, status=Order.PAID, total_minor=300, paid_minor=300,
+                                         pickup_time=self.now + timedelta(minutes=n), service_day=self.now.date())
+            OrderItem.objects.bulk_create([
+                OrderItem(order=order, item=item, item_name=item.name, unit_price_minor=item.price_minor, qty=2,
+                          line_total_minor=2 * item.price_minor) for item in self.items[n:n + 2]
+            ])
+            orders.append(order)
+        archived = ArchivedOrder.objects.create(
+            id=10_000, user=self.user, status=Order.COMPLETED, total_minor=100, paid_minor=100,
+            pickup_time=self.now, service_day=date(2025, 1, 5), created_at=self.now - timedelta(days=90),
+            items=[{"item_name": "Wrap", "unit_price_minor": 100, "qty": 1, "line_total_minor": 100}])
+
+        rows = list(Order.objects.filter(user=self.user).order_by("id").values(*ORDER_FIELDS))
+        rows += ArchivedOrder.objects.values(*ORDER_FIELDS, "items")
+        with self.assertNumQueries(1):
+            data = orders_data(rows)
+        expected = [OrderSerializer(o).data for o in Order.objects.filter(user=self.user).order_by("id")
+                    .prefetch_related("items")]
+        expected.append(ArchivedOrderSerializer(archived).data)
+        self.assertEqual(self.render(data), self.render(expected))
+        self.assertEqual(len(data[0]["items"]), 2)
+
+    def test_my_orders_response_unchanged(self):
+        for n in range(3):
+            order = Order.objects.create(user=self.user, status=Order.PAID, total_minor=100,
+                                         pickup_time=self.now, service_day=self.now.date())
+            OrderItem.objects.create(order=order, item_name="Wrap", unit_price_minor=100, line_total_minor=100)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        res = client.get("/api/orders/orders/")
+        orders = Order.objects.filter(user=self.user).order_by("-created_at", "-id").prefetch_related("items")
+        expected = {"next": None, "results": [OrderSerializer(o).data for o in orders]}
+        self.assertEqual(res.content, self.render(expected))
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("student", password="pw123456")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(name="Food")
+        self.item = Item.objects.create(category=category, name="Wrap", price_minor=1500)
+        self.client.post("/api/orders/cart/items/", {"item_id": self.item.id, "qty": 1}, format="json")
+
+    def test_cart_304_until_lines_or_prices_change(self):
+        etag = self.client.get("/api/orders/cart/")["ETag"]
+        with self.assertNumQueries(1):
+            res = self.client.get("/api/orders/cart/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 304)
+
+        self.client.post("/api/orders/cart/items/", {"item_id": self.item.id, "qty": 1}, format="json")
+        res = self.client.get("/api/orders/cart/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()["items"][0]["qty"], 2)
+
+        etag = res["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.price_minor = 1600
+            self.item.save()
+        res = self.client.get("/api/orders/cart/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()["total_minor"], 3200)
+
+    def test_cart_write_paths_touch_the_cart(self):
+        cart = Cart.objects.get(user=self.user)
+        before = cart.updated_at
+        line = CartItem.objects.get(cart=cart)
+        self.client.patch(f"/api/orders/cart/items/{line.id}/", {"qty": 3}, format="json")
+        cart.refresh_from_db()
+        self.assertGreater(cart.updated_at, before)
+
+    def test_my_orders_304_until_an_order_changes(self):
+        now = timezone.now()
+        order = Order.objects.create(user=self.user, status=Order.PAID, total_minor=100,
+                                     pickup_time=now, service_day=now.date())
+        res = self.client.get("/api/orders/orders/")
+        self.assertIn("Last-Modified", res)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get("/api/orders/orders/", HTTP_IF_NONE_MATCH=res["ETag"]).status_code, 304)
+        # other pages carry the same stamp
+        res2 = self.client.get("/api/orders/orders/?page_size=5", HTTP_IF_MODIFIED_SINCE=res["Last-Modified"])
+        self.assertEqual(res2.status_code, 304)
+
+        bulk_set_status([order.id], Order.PREPARING)
+        res = self.client.get("/api/orders/orders/", HTTP_IF_NONE_MATCH=res["ETag"])
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()["results"][0]["status"], Order.PREPARING)
+
+    def test_etag_is_per_user(self):
+        etag = self.client.get("/api/orders/cart/")["ETag"]
+        other = User.objects.create_user("other", password="pw123456")
+        self.client.force_authenticate(other)
+        self.client.get("/api/orders/cart/")
+        self.assertEqual(self.client.get("/api/orders/cart/", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class CartBatchTests(TestCase):
+    url = "/api/orders/cart/batch/"
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("student", password="pw123456")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        category = Category.objects.create(name="Food")
+        self.items = Item.objects.bulk_create([
+            Item(category=category, name=f"Item {i:02d}", price_minor=100 + i) for i in range(30)
+        ])
+        self.cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=self.cart, item=self.items[0], qty=1)
+        CartItem.objects.create(cart=self.cart, item=self.items[1], qty=4)
+        get_menu_items()   # items are checked against the menu snapshot
+
+    def _lines(self):
+        return dict(CartItem.objects.filter(cart=self.cart).values_list("item__name", "qty"))
+
+    def test_ops_fold_in_order(self):
+        a, b, c, d = (item.id for item in self.items[:4])
+        res = self.client.post(self.url, {"ops": [
+            {"op": "add", "item_id": a, "qty": 2},
+            {"op": "remove", "item_id": b},
+            {"op": "set", "item_id": c, "qty": 3},
+            {"op": "add", "item_id": d},
+            {"op": "set", "item_id": d, "qty": 0},
+            {"op": "add", "item_id": c},
+        ]}, format="json")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual({(line["item"]["id"], line["qty"]) for line in res.json()["items"]}, {(a, 3), (c, 4)})
+        self.assertEqual(res.json()["total_minor"], 3 * 100 + 4 * 102)
+        self.assertEqual(self._lines(), {"Item 00": 3, "Item 02": 4})
+
+    def test_query_count_does_not_grow_with_ops(self):
+        counts = []
+        for n in (2, 25):
+            ops = [{"op": "add", "item_id": item.id, "qty": 1} for item in self.items[:n]]
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(self.client.post(self.url, {"ops": ops}, format="json").status_code, 200)
+            counts.append(len(ctx.captured_queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_invalid_batches_write_nothing(self):
+        bad = [
+            {"ops": []},
+            {"ops": [{"op": "set", "item_id": self.items[2].id}]},
+            {"ops": [{"op": "add", "item_id": self.items[2].id, "qty": 0}]},
+            {"ops": [{"op": "add", "item_id": self.items[2].id}, {"op": "add", "item_id": 999999}]},
+        ]
+        for body in bad:
+            self.assertEqual(self.client.post(self.url, body, format="json").status_code, 400, body)
+        self.assertEqual(self._lines(), {"Item 00": 1, "Item 01": 4})
+        res = self.client.post(self.url, {"ops": [{"op": "remove", "item_id": 999999}]}, format="json")
+        self.assertEqual(res.status_code, 200)   # removing something that isn't there is fine
+
+
+class CheckoutTests(TestCase):
+    url = "/api/orders/checkout/"
+
+    def setUp(self):
+        quota.reset()
+        self.addCleanup(quota.reset)
+        self.user = User.objects.create_user("student", password="pw123456")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.item = Item.objects.create(category=Category.objects.create(name="Food"), name="Wrap", price_minor=1500)
+        Wallet.objects.create(user=self.user, balance_minor=5000)
+
+    def _checkout(self, qty=1):
+        cart, _ = Cart.objects.get_or_create(user=self.user)
+        CartItem.objects.update_or_create(cart=cart, item=self.item, defaults={"qty": qty})
+        return self.client.post(self.url, {"pickup_time": "2025-10-25T12:30:00"}, format="json")
+
+    def test_checkout_debits_wallet_and_clears_cart(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            res = self._checkout(qty=2)
+        self.assertEqual(res.status_code, 201)
+        self.assertEqual(res.json()["data"]["total_minor"], 3000)
+        self.assertEqual(Wallet.objects.get(user=self.user).balance_minor, 2000)
+        self.assertEqual(WalletTx.objects.get(user=self.user).amount_minor, 3000)
+        self.assertFalse(CartItem.objects.exists())
+        quota.flush()   # normally the background thread's job
+        self.assertEqual(OrderQuota.objects.get(user=self.user).paid_count, 1)
+
+    def test_failing_quota_flush_never_reaches_checkout(self):
+        with mock.patch.object(quota, "flush", side_effect=OperationalError("database is locked")) as flush:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(self._checkout().status_code, 201)
+            self.assertEqual(self._checkout(qty=4).status_code, 402)   # claim released, still no flush
+        flush.assert_not_called()
+        self.assertEqual(Order.objects.count(), 1)
+        with mock.patch.object(quota, "run_write", side_effect=OperationalError("database is locked")):
+            with self.assertRaises(OperationalError):
+                quota.flush()
+        self.assertEqual(quota.flush(), 1)   # still queued after the failure
+        self.assertEqual(OrderQuota.objects.get(user=self.user).paid_count, 1)
+
+    def test_insufficient_funds_writes_nothing(self):
+        res = self._checkout(qty=4)
+        self.assertEqual(res.status_code, 402)
+        self.assertEqual(res.json()["code"], "INSUFFICIENT_WALLET_FUNDS")
+        self.assertEqual(Wallet.objects.get(user=self.user).balance_minor, 5000)
+        self.assertFalse(WalletTx.objects.exists())
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(OrderQuota.objects.filter(paid_count__gt=0).exists())
+        self.assertEqual(quota.used(self.user, service_day_for(timezone.now())), 0)   # claim given back
+        self.assertEqual(CartItem.objects.get().qty, 4)
+
+    def test_daily_limit(self):
+        Wallet.objects.filter(user=self.user).update(balance_minor=100_000)
+        for _ in range(DAILY_ORDER_LIMIT):
+            self.assertEqual(self._checkout().status_code, 201)
+        res = self._checkout()
+        self.assertEqual(res.status_code, 429)
+        self.assertEqual(res.json()["code"], "ORDER_LIMIT_REACHED")
+        self.assertEqual(Order.objects.count(), DAILY_ORDER_LIMIT)
+
+    def test_staff_skip_quota(self):
+        self.user.is_staff = True
+        self.user.save()
+        Wallet.objects.filter(user=self.user).update(balance_minor=100_000)
+        for _ in range(DAILY_ORDER_LIMIT + 1):
+            self.assertEqual(self._checkout().status_code, 201)
+        self.assertFalse(OrderQuota.objects.exists())
+
+    def test_empty_cart(self):
+        res = self.client.post(self.url, {"pickup_time": "2025-10-25T12:30:00"}, format="json")
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(res.json()["code"], "CART_EMPTY")
+
+
+
+class OrderQuotaTests(TestCase):
+    def setUp(self):
+        quota.reset()
+        self.addCleanup(quota.reset)
+        self.today = service_day_for(timezone.now())
+        self.user = User.objects.create_user("student", password="pw123456")
+
+    def _orders(self, user, n):
+        for _ in range(n):
+            Order.objects.create(user=user, status=Order.PAID, total_minor=100, pickup_time=timezone.now(),
+                                 service_day=self.today)
+
+    def test_cold_start_rebuilds_from_orders(self):
+        self._orders(self.user, 3)
+        other = User.objects.create_user("other")
+        self._orders(other, 1)
+        with self.assertNumQueries(1):
+            self.assertTrue(quota.claim(self.user, self.today, 4))
+        with self.assertNumQueries(0):
+            self.assertFalse(quota.claim(self.user, self.today, 4))
+            self.assertTrue(quota.claim(other, self.today, 4))
+            self.assertTrue(quota.claim(User(pk=other.pk + 1), self.today, 4))   # no orders yet
+        quota.release(self.user, self.today)
+        self.assertEqual(quota.used(self.user, self.today), 3)
+        self.assertEqual(quota.used(other, self.today), 2)
+
+    @override_settings(DAILY_ORDER_LIMIT_BY_GROUP={"night-shift": 8, "events-team": None})
+    def test_limit_per_group(self):
+        self.assertEqual(quota.limit_for(self.user), DAILY_ORDER_LIMIT)
+        night_shift = User.objects.create_user("night")
+        night_shift.groups.add(Group.objects.create(name="night-shift"))
+        events = User.objects.create_user("events")
+        events.groups.add(Group.objects.get(name="night-shift"), Group.objects.create(name="events-team"))
+        self.assertEqual(quota.limit_for(night_shift), 8)
+        self.assertIsNone(quota.limit_for(events))
+        with self.assertNumQueries(0):   # remembered for ORDER_QUOTA_GROUP_TTL
+            self.assertEqual(quota.limit_for(night_shift), 8)
+        self.assertIsNone(quota.limit_for(User(is_staff=True)))
+
+    @override_settings(ORDER_QUOTA_STORE="apps.orders.quota.LocalCounterStore", ORDER_QUOTA_FLUSH_INTERVAL=3600)
+    def test_write_behind_batches_committed_claims(self):
+        quota.flush()   # restart the flush interval
+        users = [self.user, User.objects.create_user("other")]
+        with self.captureOnCommitCallbacks(execute=True):
+            for user in (*users, users[0]):
+                quota.claim(user, self.today, DAILY_ORDER_LIMIT)
+                quota.record(user, self.today)
+        self.assertFalse(OrderQuota.objects.exists())
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(quota.flush(), 2)
+        self.assertEqual(sum("orderquota" in q["sql"] for q in ctx.captured_queries), 1)   # one upsert
+        self.assertEqual(dict(OrderQuota.objects.values_list("user__username", "paid_count")),
+                         {"student": 2, "other": 1})
+        quota.claim(self.user, self.today, DAILY_ORDER_LIMIT)
+        with self.captureOnCommitCallbacks(execute=True):
+            quota.record(self.user, self.today)
+        quota.flush()
+        self.assertEqual(OrderQuota.objects.get(user=self.user).paid_count, 3)
+
+    @override_settings(ORDER_QUOTA_STORE="apps.orders.quota.LocalCounterStore", ORDER_QUOTA_FLUSH_INTERVAL=3600)
+    def test_flush_drops_claims_from_another_database(self):
+        quota.claim(self.user, self.today, DAILY_ORDER_LIMIT)
+        with mock.patch.object(quota, "_database", return_value="torn-down-test-db"), \
+                self.captureOnCommitCallbacks(execute=True):
+            quota.record(self.user, self.today)
+        with self.assertLogs("apps.orders.quota", level="WARNING"):
+            self.assertEqual(quota.flush(), 0)
+        self.assertFalse(OrderQuota.objects.exists())
+
+
+@override_settings(PICKUP_SLOT_CAPACITY=1000)
+class CheckoutConcurrencyTests(TransactionTestCase):
+    """Hundreds of checkouts from parallel threads; money and quota must add up."""
+    user_count = 40
+    attempts_per_user = 8   # more than the daily limit
+    workers = 16
+
+    def setUp(self):
+        quota.reset()
+        self.addCleanup(quota.reset)
+        self.item = Item.objects.create(category=Category.objects.create(name="Food"), name="Wrap", price_minor=700)
+        self.users = User.objects.bulk_create([User(username=f"student{i}") for i in range(self.user_count)])
+        self.carts = {u.pk: Cart.objects.create(user=u) for u in self.users}
+        self.pickup_time = timezone.make_aware(datetime(2025, 10, 25, 12, 30))
+        # enough for 4 orders, so some users hit the wallet and others the quota
+        Wallet.objects.bulk_create([
+            Wallet(user=u, balance_minor=700 * (4 if i % 2 else 10)) for i, u in enumerate(self.users)
+        ])
+        self.initial_money = sum(Wallet.objects.values_list("balance_minor", flat=True))
+
+    def _attempt(self, user):
+        try:
+            CartItem.objects.bulk_create([CartItem(cart=self.carts[user.pk], item=self.item)],
+                                         ignore_conflicts=True)
+            try:
+                checkout(user, self.pickup_time)
+                return "ok"
+            except CheckoutError as e:
+                return e.code
+        finally:
+            connection.close()
+
+    def test_parallel_checkouts_lose_no_money(self):
+        jobs = [u for u in self.users for _ in range(self.attempts_per_user)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            outcomes = list(pool.map(self._attempt, jobs))
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(len(outcomes), len(jobs))
+        self.assertLessEqual(set(outcomes), {"ok", "ORDER_LIMIT_REACHED", "INSUFFICIENT_WALLET_FUNDS", "CART_EMPTY"})
+        debited = sum(WalletTx.objects.filter(type=WalletTx.DEBIT).values_list("amount_minor", flat=True))
+        remaining = sum(Wallet.objects.values_list("balance_minor", flat=True))
+        self.assertEqual(remaining + debited, self.initial_money)
+        self.assertEqual(debited, sum(Order.objects.values_list("paid_minor", flat=True)))
+        self.assertEqual(Order.objects.count(), outcomes.count("ok"))
+        quota.flush()
+        for row in OrderQuota.objects.all():
+            self.assertLessEqual(row.paid_count, DAILY_ORDER_LIMIT)
+            self.assertEqual(row.paid_count, Order.objects.filter(user_id=row.user_id).count())
+        self.assertGreater(outcomes.count("ok") / elapsed, 1)
+
+
+class AdminDashboardTests(TestCase):
+    url = "/api/orders/admin/dashboard/"
+
+    def setUp(self):
+        self.admin = User.objects.create_user("admin", password="pw123456", is_staff=True)
+        self.student = User.objects.create_user("student", password="pw123456")
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.today = service_day_for(timezone.now())
+
+    def _order(self, days_ago, total, status=Order.PAID):
+        order = Order.objects.create(user=self.student, status=status, total_minor=total, paid_minor=total,
+                                     pickup_time=timezone.now(), service_day=self.today - timedelta(days=days_ago))
+        OrderItem.objects.create(order=order, item_name="Wrap", unit_price_minor=total, qty=1, line_total_minor=total)
+        record_order_created(order)
+        return order
+
+    def test_dashboard_totals(self):
+        self._order(0, 1000)
+        self._order(0, 500, status=Order.COMPLETED)
+        self._order(2, 2000)
+        self._order(30, 3000, status=Order.CANCELLED)
+        data = self.client.get(self.url).json()
+        self.assertEqual(data["total_orders"], 4)
+        self.assertEqual(data["orders_today"], 2)
+        self.assertEqual(data["total_revenue_minor"], 6500)
+        self.assertEqual(data["revenue_today_minor"], 1500)
+        self.assertEqual(data["active_orders"], 2)
+        self.assertEqual(data["avg_order_minor"], 1625)
+        self.assertEqual([d["revenue_minor"] for d in data["daily_revenue"]], [0, 0, 0, 0, 2000, 0, 1500])
+        self.assertEqual(data["recent_orders"][0]["items"], "1x Wrap")
+
+    def test_query_count_independent_of_history(self):
+        for days_ago in range(3):
+            self._order(days_ago, 1000)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(self.url)
+        for days_ago in range(3, 120):
+            self._order(days_ago, 1000)
+        with CaptureQueriesContext(connection) as large:
+            self.client.get(self.url)
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
+
+    def test_status_update_moves_rollup_counts(self):
+        order = self._order(1, 1000)
+        res = self.client.patch(f"/api/orders/admin/orders/{order.id}/", {"status": Order.READY}, format="json")
+        self.assertEqual(res.status_code, 200)
+        rollup = DailySalesRollup.objects.get(service_day=order.service_day)
+        self.assertEqual((rollup.paid_count, rollup.ready_count), (0, 1))
+        self.assertEqual(self.client.get(self.url).json()["active_orders"], 0)
+
+    def test_status_update_unknown_order_is_404(self):
+        res = self.client.patch("/api/orders/admin/orders/999999/", {"status": Order.READY}, format="json")
+        self.assertEqual(res.status_code, 404)
+
+    def test_rebuild_command_matches_incremental_rollup(self):
+        order = self._order(1, 1000)
+        self._order(1, 700, status=Order.CANCELLED)
+        self._order(5, 300)
+        Order.objects.filter(pk=order.pk).update(status=Order.COMPLETED)
+        record_status_change(order.service_day, Order.PAID, Order.COMPLETED)
+        expected = list(DailySalesRollup.objects.order_by("service_day").values(
+            "service_day", "order_count", "revenue_minor", "paid_count", "completed_count", "cancelled_count"))
+        DailySalesRollup.objects.all().delete()
+        call_command("rebuild_sales_rollup", stdout=StringIO())
+        rebuilt = list(DailySalesRollup.objects.order_by("service_day").values(
+            "service_day", "order_count", "revenue_minor", "paid_count", "completed_count", "cancelled_count"))
+        self.assertEqual(rebuilt, expected)
+
+
+class OrderEventTests(TestCase):
+    def setUp(self):
+        self.backend = InProcessBackend(history_size=5)
+
+    def test_backlog_replay_and_gap_detection(self):
+        for i in range(8):
+            self.backend.publish(user_id=1, type="order.updated", data={"n": i})
+        self.assertEqual([e.data["n"] for e in self.backend.since(6)], [6, 7])
+        self.assertIsNone(self.backend.since(1))   # fell out of the buffer
+        self.assertIsNone(self.backend.since(99))  # ids from another process lifetime
+
+    def test_subscribers_are_scoped_per_user(self):
+        async def scenario():
+            with Subscription(self.backend, user_id=1) as mine, Subscription(self.backend) as staff:
+                await asyncio.to_thread(self.backend.publish, 2, "order.updated", {"order_id": 20})
+                await asyncio.to_thread(self.backend.publish, 1, "order.updated", {"order_id": 10})
+                got = await asyncio.wait_for(mine.queue.get(), 1)
+                self.assertEqual(got.data["order_id"], 10)
+                self.assertTrue(mine.queue.empty())
+                self.assertEqual(staff.queue.qsize(), 2)
+            self.assertEqual(self.backend.subscriber_count(), 0)
+        asyncio.run(scenario())
+
+    def test_slow_subscriber_overflows_instead_of_blocking(self):
+        async def scenario():
+            with Subscription(self.backend, max_pending=2) as sub:
+                for i in range(4):
+                    self.backend.publish(1, "order.updated", {"n": i})
+                await asyncio.sleep(0)
+                self.assertTrue(sub.overflowed)
+        asyncio.run(scenario())
+
+    def test_status_update_publishes_after_commit(self):
+        admin = User.objects.create_user("admin", password="pw123456", is_staff=True)
+        order = Order.objects.create(user=admin, status=Order.PAID, total_minor=100,
+                                     pickup_time=timezone.now(), service_day=timezone.now().date())
+        client = APIClient()
+        client.force_authenticate(admin)
+        backend = get_backend()
+        before = backend.since(0) or []
+        with self.captureOnCommitCallbacks(execute=True):
+            client.patch(f"/api/orders/admin/orders/{order.id}/", {"status": Order.READY}, format="json")
+        last = (backend.since(before[-1].id if before else 0) or [])[-1]
+        self.assertEqual((last.user_id, last.data["order_id"], last.data["status"]),
+                         (admin.id, order.id, Order.READY))
+
+
+class OrderEventStreamTests(TransactionTestCase):
+    async def _read_until(self, response, needle):
+        seen = ""
+        async for chunk in response.streaming_content:
+            seen += chunk.decode() if isinstance(chunk, bytes) else chunk
+            if needle in seen:
+                break
+        return seen
+
+    def _get(self, params=None):
+        async def scenario():
+            res = await AsyncClient().get("/api/orders/events/", params or {})
+            await sync_to_async(connections.close_all)()
+            return res
+        return asyncio.run(scenario())
+
+    def _ticket(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.post("/api/orders/events/ticket/").json()
+
+    def test_stream_requires_a_ticket(self):
+        user = User.objects.create_user("student", password="pw123456")
+        self.assertEqual(self._get().status_code, 401)
+        # the API token itself is not accepted in the URL
+        self.assertEqual(self._get({"token": Token.objects.create(user=user).key}).status_code, 401)
+        ticket = self._ticket(user)
+        self.assertEqual((ticket["expires_in"], ticket["stream"]), (SSE_TICKET_TTL, False))   # WSGI test client
+        with mock.patch("django.core.signing.time.time", return_value=time.time() + SSE_TICKET_TTL + 1):
+            self.assertEqual(self._get({"ticket": ticket["ticket"]}).status_code, 401)
+
+    def test_wsgi_refuses_to_stream(self):
+        # runserver would drain the endless generator into a list and never answer
+        res = self.client.get("/api/orders/events/")
+        self.assertEqual(res.status_code, 503)
+
+    def test_stream_replays_from_last_event_id(self):
+        user = User.objects.create_user("student", password="pw123456")
+        ticket = self._ticket(user)["ticket"]
+        backend = get_backend()
+        start = backend.publish(999, "order.updated", {"order_id": 0}).id
+        backend.publish(999, "order.updated", {"order_id": 1})   # someone else's order
+        backend.publish(user.id, "order.updated", {"order_id": 2, "status": "ready"})
+
+        async def scenario():
+            res = await AsyncClient().get("/api/orders/events/", {"ticket": ticket},
+                                          headers={"Last-Event-ID": str(start)})
+            self.assertEqual(res["Content-Type"], "text/event-stream")
+            body = await asyncio.wait_for(self._read_until(res, '"order_id": 2'), 5)
+            await res.streaming_content.aclose()
+            # the request authenticated on sync_to_async's worker thread: close its
+            # connection, or the test database keeps its -wal/-shm files
+            await sync_to_async(connections.close_all)()
+            return body
+        body = asyncio.run(scenario())
+        self.assertIn('"order_id": 2', body)
+        self.assertNotIn('"order_id": 1', body)
+
+
+class OrderPaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("student", password="pw123456")
+        self.admin = User.objects.create_user("admin", password="pw123456", is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        now = timezone.now()
+        orders = Order.objects.bulk_create([
+            Order(user=self.user, status=Order.READY if i % 3 == 0 else Order.PAID, total_minor=100 + i,
+                  pickup_time=now, service_day=now.date()) for i in range(45)
+        ])
+        # several orders share a created_at, so ties must be broken by id
+        for i, order in enumerate(orders):
+            Order.objects.filter(pk=order.pk).update(created_at=now - timedelta(minutes=i // 4))
+        OrderItem.objects.bulk_create([
+            OrderItem(order=o, item_name="Wrap", unit_price_minor=o.total_minor, qty=1, line_total_minor=o.total_minor)
+            for o in orders for _ in range(2)
+        ])
+
+    def _walk(self, url):
+        ids, counts = [], []
+        while url:
+            with CaptureQueriesContext(connection) as ctx:
+                page = self.client.get(url).json()
+            counts.append(len(ctx.captured_queries))
+            ids += [o["id"] for o in page["results"]]
+            url = page["next"]
+        return ids, counts
+
+    def test_pages_cover_every_order_once_in_order(self):
+        ids, _ = self._walk("/api/orders/orders/?page_size=10")
+        expected = list(Order.objects.order_by("-created_at", "-id").values_list("id", flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_query_count_is_fixed_per_page(self):
+        _, counts = self._walk("/api/orders/orders/?page_size=10")
+        self.assertEqual(len(counts), 5)
+        self.assertEqual(set(counts), {3})   # version stamp, orders page, their lines
+
+    def test_admin_status_filter(self):
+        self.client.force_authenticate(self.admin)
+        ids, counts = self._walk(f"/api/orders/admin/orders/?status={Order.READY}&page_size=4")
+        self.assertEqual(len(ids), 15)
+        self.assertEqual(set(Order.objects.filter(pk__in=ids).values_list("status", flat=True)), {Order.READY})
+        self.assertEqual(set(counts), {2})
+
+    def test_bad_cursor_is_404(self):
+        self.assertEqual(self.client.get("/api/orders/orders/?cursor=nonsense").status_code, 404)
+
+
+@override_settings(PICKUP_SLOT_MINUTES=15, PICKUP_SLOT_CAPACITY=2, PICKUP_SLOT_UNIT="orders",
+                   PICKUP_OPEN_TIME="11:00", PICKUP_CLOSE_TIME="14:00")
+class PickupSlotTests(TestCase):
+    def setUp(self):
+        quota.reset()
+        self.addCleanup(quota.reset)
+        self.item = Item.objects.create(category=Category.objects.create(name="Food"), name="Wrap", price_minor=100)
+        self.client = APIClient()
+
+    def _student(self, name):
+        user = User.objects.create_user(name, password="pw123456")
+        Wallet.objects.create(user=user, balance_minor=10_000)
+        return user
+
+    def _checkout(self, user, pickup="2025-10-25T12:37:00", qty=1):
+        CartItem.objects.create(cart=Cart.objects.get_or_create(user=user)[0], item=self.item, qty=qty)
+        self.client.force_authenticate(user)
+        return self.client.post("/api/orders/checkout/", {"pickup_time": pickup}, format="json")
+
+    def test_list_slots_for_day(self):
+        self.client.force_authenticate(self._student("a"))
+        day = timezone.localdate() + timedelta(days=1)
+        with self.assertNumQueries(1):   # nothing is inserted for a day without rows
+            res = self.client.get(f"/api/orders/slots/?day={day}")
+        self.assertEqual(len(res.json()), 12)
+        self.assertEqual((res.json()[0]["id"], res.json()[0]["available"]), (None, 2))
+        self.assertFalse(PickupSlot.objects.exists())
+
+        pickup = f"{day}T12:37:00"
+        self.assertEqual(self._checkout(self._student("b"), pickup=pickup).status_code, 201)
+        self.client.force_authenticate(self._student("c"))
+        slots = self.client.get(f"/api/orders/slots/?day={day}").json()
+        self.assertEqual(len(slots), 12)
+        self.assertEqual([s["available"] for s in slots].count(1), 1)
+
+    def test_list_slots_clamps_to_booking_window(self):
+        self.client.force_authenticate(self._student("a"))
+        far = self.client.get("/api/orders/slots/?day=2031-01-01").json()
+        last = timezone.localdate() + timedelta(days=settings.PICKUP_BOOKING_DAYS)
+        self.assertEqual(timezone.localtime(parse_datetime(far[0]["starts_at"])).date(), last)
+        past = self.client.get("/api/orders/slots/?day=2020-01-01").json()
+        self.assertEqual(timezone.localtime(parse_datetime(past[0]["starts_at"])).date(), timezone.localdate())
+        self.assertFalse(PickupSlot.objects.exists())
+
+    def test_checkout_reserves_until_slot_is_full(self):
+        self.assertEqual(self._checkout(self._student("a")).status_code, 201)
+        self.assertEqual(self._checkout(self._student("b"), pickup="2025-10-25T12:44:59").status_code, 201)
+        res = self._checkout(self._student("c"), pickup="2025-10-25T12:30:00")
+        self.assertEqual(res.status_code, 409)
+        self.assertEqual(res.json()["code"], "PICKUP_SLOT_FULL")
+        # the next slot still has room
+        self.assertEqual(self._checkout(self._student("d"), pickup="2025-10-25T12:45:00").status_code, 201)
+        slot = PickupSlot.objects.get(starts_at=timezone.make_aware(datetime(2025, 10, 25, 12, 30)))
+        self.assertEqual((slot.reserved, slot.orders.count()), (2, 2))
+
+    def test_outside_opening_hours(self):
+        res = self._checkout(self._student("a"), pickup="2025-10-25T15:00:00")
+        self.assertEqual(res.json()["code"], "INVALID_PICKUP_TIME")
+
+    def test_cancel_releases_capacity(self):
+        order_id = self._checkout(self._student("a")).json()["data"]["id"]
+        self.client.force_authenticate(User.objects.create_user("admin", password="pw123456", is_staff=True))
+        for _ in range(2):
+            self.client.patch(f"/api/orders/admin/orders/{order_id}/", {"status": Order.CANCELLED}, format="json")
+        self.assertEqual(Order.objects.get(pk=order_id).pickup_slot.reserved, 0)
+
+    @override_settings(PICKUP_SLOT_UNIT="items", PICKUP_SLOT_CAPACITY=5)
+    def test_item_unit_capacity(self):
+        self.assertEqual(self._checkout(self._student("a"), qty=4).status_code, 201)
+        self.assertEqual(self._checkout(self._student("b"), qty=2).status_code, 409)
+        self.assertEqual(self._checkout(self._student("c"), qty=1).status_code, 201)
+
+
+class KitchenTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user("admin", password="pw123456", is_staff=True)
+        self.student = User.objects.create_user("student", password="pw123456")
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.now = timezone.now()
+        self.today = service_day_for(self.now)
+        self.slot = PickupSlot.objects.create(service_day=self.today, starts_at=self.now,
+                                              ends_at=self.now + timedelta(minutes=15), capacity=30, reserved=3)
+
+    def _order(self, minutes, lines, status=Order.PAID, slot=True):
+        order = Order.objects.create(user=self.student, status=status, total_minor=100, paid_minor=100,
+                                     pickup_time=self.now + timedelta(minutes=minutes), service_day=self.today,
+                                     pickup_slot=self.slot if slot else None)
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, item_name=name, unit_price_minor=100, qty=qty, line_total_minor=100 * qty)
+            for name, qty in lines
+        ])
+        record_order_created(order)
+        return order
+
+    def test_queue_aggregates_items_per_slot(self):
+        self._order(5, [("Wrap", 2), ("Tea", 1)])
+        self._order(10, [("Wrap", 3)], status=Order.PREPARING)
+        self._order(10, [("Wrap", 9)], status=Order.READY)   # already done
+        self._order(90, [("Wrap", 9)])                       # not due yet
+        with self.assertNumQueries(1):
+            data = self.client.get("/api/orders/admin/kitchen/?minutes=30").json()
+        self.assertEqual(len(data["slots"]), 1)
+        self.assertEqual(data["slots"][0]["items"], [
+            {"item_name": "Wrap", "qty": 5, "orders": 2},
+            {"item_name": "Tea", "qty": 1, "orders": 1},
+        ])
+
+    def test_bulk_status_is_one_update(self):
+        orders = [self._order(5, [("Wrap", 1)]) for _ in range(3)]
+        orders.append(self._order(5, [("Wrap", 1)], status=Order.PREPARING))
+        ids = [o.id for o in orders]
+        with CaptureQueriesContext(connection) as ctx:
+            res = self.client.post("/api/orders/admin/orders/bulk-status/",
+                                   {"ids": ids, "status": Order.READY}, format="json")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json()["updated"], 4)
+        updates = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith('UPDATE "orders_order"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(Order.objects.filter(status=Order.READY).count(), 4)
+        rollup = DailySalesRollup.objects.get(service_day=self.today)
+        self.assertEqual((rollup.paid_count, rollup.preparing_count, rollup.ready_count), (0, 0, 4))
+
+        # repeating it changes nothing
+        res = self.client.post("/api/orders/admin/orders/bulk-status/",
+                               {"ids": ids, "status": Order.READY}, format="json")
+        self.assertEqual(res.json()["updated"], 0)
+
+    def test_bulk_cancel_releases_slot_and_publishes(self):
+        orders = [self._order(5, [("Wrap", 1)]) for _ in range(3)]
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.client.post("/api/orders/admin/orders/bulk-status/",
+                             {"ids": [o.id for o in orders], "status": Order.CANCELLED}, format="json")
+        self.assertEqual(len(callbacks), 3)
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.reserved, 0)
+
+    def test_bulk_status_validation(self):
+        url = "/api/orders/admin/orders/bulk-status/"
+        self.assertEqual(self.client.post(url, {"ids": [1], "status": "eaten"}, format="json").status_code, 400)
+        self.assertEqual(self.client.post(url, {"ids": [], "status": Order.READY}, format="json").status_code, 400)
+        self.assertEqual(self.client.post(url, {"ids": ["x"], "status": Order.READY}, format="json").status_code, 400)
+        self.client.force_authenticate(self.student)
+        self.assertEqual(self.client.post(url, {"ids": [1], "status": Order.READY}, format="json").status_code, 403)
+
+
+@override_settings(ORDER_ARCHIVE_AFTER_DAYS=30)
+class OrderArchiveTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("student", password="pw123456",
+                                             date_joined=timezone.now() - timedelta(days=365))
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.today = service_day_for(timezone.now())
+        # one order a day for 60 days; every 7th is still open
+        for days_ago in range(60):
+            status = Order.PAID if days_ago % 7 == 0 else Order.COMPLETED
+            day = self.today - timedelta(days=days_ago)
+            created = timezone.make_aware(datetime.combine(day, datetime.min.time())) + timedelta(hours=12)
+            order = Order.objects.create(user=self.user, status=status, total_minor=100 + days_ago,
+                                         paid_minor=100 + days_ago, pickup_time=created, service_day=day)
+            Order.objects.filter(pk=order.pk).update(created_at=created)
+            OrderItem.objects.create(order=order, item_name="Wrap", unit_price_minor=100 + days_ago, qty=1,
+                                     line_total_minor=100 + days_ago)
+            record_order_created(order)
+
+    def _archive(self, *args):
+        call_command("archive_orders", "--batch-size", "7", *args, stdout=StringIO())
+
+    def _walk(self, url):
+        ids, counts = [], []
+        while url:
+            with CaptureQueriesContext(connection) as ctx:
+                page = self.client.get(url).json()
+            counts.append(len(ctx.captured_queries))
+            ids += [o["id"] for o in page["results"]]
+            url = page["next"]
+        return ids, counts
+
+    def test_moves_only_old_closed_orders(self):
+        expected_history = self._walk("/api/orders/orders/?page_size=9")[0]
+        first = Order.objects.order_by("id").last()
+        self._archive()
+        # days 31..59, minus the open ones (35, 42, 49, 56)
+        self.assertEqual(ArchivedOrder.objects.count(), 25)
+        self.assertEqual(Order.objects.count(), 35)
+        self.assertFalse(OrderItem.objects.filter(order__service_day__lt=self.today - timedelta(days=30)).exclude(
+            order__status=Order.PAID).exists())
+        archived = ArchivedOrder.objects.get(pk=first.pk)
+        self.assertEqual(archived.items, [{"item_name": "Wrap", "unit_price_minor": 159, "qty": 1,
+                                           "line_total_minor": 159}])
+        # the student's history reads the same, page for page
+        ids, counts = self._walk("/api/orders/orders/?page_size=9")
+        self.assertEqual(ids, expected_history)
+        self.assertEqual(counts[:3], [3, 3, 3])   # recent pages never touch the archive
+
+    def test_archived_orders_serialize_like_hot_ones(self):
+        hot = self.client.get("/api/orders/orders/?page_size=60").json()["results"]
+        self._archive()
+        mixed = self.client.get("/api/orders/orders/?page_size=60").json()["results"]
+        self.assertEqual(mixed, hot)
+
+    def test_rollup_rebuild_counts_archive(self):
+        before = list(DailySalesRollup.objects.order_by("service_day").values())
+        self._archive()
+        call_command("rebuild_sales_rollup", stdout=StringIO())
+        after = list(DailySalesRollup.objects.order_by("service_day").values())
+        strip = lambda rows: [{k: v for k, v in r.items() if k not in ("id", "updated_at")} for r in rows]
+        self.assertEqual(strip(after), strip(before))
+
+    def test_new_accounts_skip_the_archive(self):
+        self.user.date_joined = timezone.now()
+        self.user.save()
+        _, counts = self._walk("/api/orders/orders/?page_size=100")
+        self.assertEqual(counts, [3])
+
+    def test_days_below_setting_refused(self):
+        with self.assertRaises(CommandError):
+            self._archive("--days", "10")
+
+
+class RecommendationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("student", password="pw123456")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        food = Category.objects.create(name="Food")
+        self.wrap, self.juice, self.cookie, self.soup = [
+            Item.objects.create(category=food, name=name, price_minor=price)
+            for name, price in [("Wrap", 1500), ("Juice", 700), ("Cookie", 300), ("Soup", 900)]
+        ]
+        self.pickup = timezone.make_aware(datetime(2025, 10, 20, 12, 30))
+        self.orders = [self._order(self.user, [self.wrap, self.juice]) for _ in range(2)]
+        self._order(self.user, [self.wrap, self.juice, self.cookie])
+        self._order(self.user, [self.soup], status=Order.CANCELLED)
+
+    def _order(self, user, items, status=Order.COMPLETED):
+        order = Order.objects.create(user=user, status=status, pickup_time=self.pickup,
+                                     service_day=service_day_for(timezone.now()))
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, item=item, item_name=item.name, unit_price_minor=item.price_minor, qty=2,
+                      line_total_minor=2 * item.price_minor)
+            for item in items
+        ])
+        return order
+
+    def test_favorites_and_closed_combos(self):
+        favorites, combos = recommendations.summarize([{1, 2}, {1, 2}, {1, 2, 3}, {4}, {3, 4}, {3, 4}])
+        self.assertEqual(favorites, [[1, 3], [2, 3], [3, 3], [4, 3]])
+        self.assertEqual(combos, [[[1, 2], 3], [[3, 4], 2]])
+        # {1, 2} is left out when it never comes without 3
+        self.assertEqual(recommendations.summarize([{1, 2, 3}, {1, 2, 3}])[1], [[[1, 2, 3], 2]])
+
+    def test_build_and_serve(self):
+        call_command("build_recommendations", "--full", stdout=StringIO())
+        get_menu_items()
+        with self.assertNumQueries(2):
+            data = recommendations.recommendations_for(self.user, now=self.pickup)
+        self.assertEqual([(i["name"], i["orders"]) for i in data["favorites"]],
+                         [("Wrap", 3), ("Juice", 3), ("Cookie", 1)])   # cancelled soup doesn't count
+        self.assertEqual([[i["name"] for i in c["items"]] for c in data["combos"]], [["Wrap", "Juice"]])
+        self.assertEqual([i["name"] for i in data["popular"]], ["Wrap", "Juice", "Cookie"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cookie.is_active = False
+            self.cookie.save()
+        res = self.client.get("/api/catalog/recommendations/")
+        self.assertEqual([i["name"] for i in res.json()["favorites"]], ["Wrap", "Juice"])
+
+    def test_incremental_build_only_touches_users_with_new_orders(self):
+        other = User.objects.create_user("other")
+        self._order(other, [self.soup])
+        self.assertEqual(recommendations.build()[0], 2)
+        self.assertEqual(recommendations.build()[0], 0)
+        self._order(other, [self.soup, self.cookie])
+        self.assertEqual(recommendations.build()[0], 1)
+        self.assertEqual(UserRecommendation.objects.get(user=other).favorites,
+                         [[self.soup.id, 2], [self.cookie.id, 1]])
+
+    def test_reorder_into_cart(self):
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, item=self.wrap, qty=5)
+        CartItem.objects.create(cart=cart, item=self.soup, qty=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.juice.is_active = False
+            self.juice.save()
+        res = self.client.post(f"/api/orders/orders/{self.orders[0].id}/reorder/")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual({(line["item"]["name"], line["qty"]) for line in res.json()["items"]},
+                         {("Wrap", 2), ("Soup", 1)})
+        self.assertEqual(res.json()["skipped"], ["Juice"])
+        stranger = User.objects.create_user("stranger")
+        self.client.force_authenticate(stranger)
+        self.assertEqual(self.client.post(f"/api/orders/orders/{self.orders[0].id}/reorder/").status_code, 404)
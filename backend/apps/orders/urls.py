@@ -1,8 +1,10 @@
 from django.urls import path
 from .views import (
-    CartView, CartItemsView, CartItemDetailView,
-    CheckoutView, MyOrdersView,
+    CartView, CartItemsView, CartItemDetailView, CartBatchView,
+    CheckoutView, MyOrdersView, PickupSlotsView, ReorderView,
     AdminDashboardView, AdminOrdersView, AdminOrderUpdateView,
+    AdminOrderBulkStatusView, KitchenQueueView,
+    OrderEventsTicketView, order_events,
 )
 
 urlpatterns = [
@@ -10,11 +12,18 @@ urlpatterns = [
     path("cart/", CartView.as_view(), name="cart"),
     path("cart/items/", CartItemsView.as_view(), name="cart-items"),
     path("cart/items/<int:pk>/", CartItemDetailView.as_view(), name="cart-item-detail"),
+    path("cart/batch/", CartBatchView.as_view(), name="cart-batch"),
     path("checkout/", CheckoutView.as_view(), name="checkout"),
+    path("slots/", PickupSlotsView.as_view(), name="pickup-slots"),
     path("orders/", MyOrdersView.as_view(), name="my-orders"),
+    path("orders/<int:pk>/reorder/", ReorderView.as_view(), name="order-reorder"),
+    path("events/", order_events, name="order-events"),
+    path("events/ticket/", OrderEventsTicketView.as_view(), name="order-events-ticket"),
     
     # Admin endpoints
     path("admin/dashboard/", AdminDashboardView.as_view(), name="admin-dashboard"),
     path("admin/orders/", AdminOrdersView.as_view(), name="admin-orders"),
     path("admin/orders/<int:pk>/", AdminOrderUpdateView.as_view(), name="admin-order-update"),
+    path("admin/orders/bulk-status/", AdminOrderBulkStatusView.as_view(), name="admin-order-bulk-status"),
+    path("admin/kitchen/", KitchenQueueView.as_view(), name="admin-kitchen-queue"),
 ]
@@ -1,44 +1,83 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.handlers.asgi import ASGIRequest
 from django.db import transaction
-from django.db.models import Sum, Count, Avg, Q
+from django.http import JsonResponse, StreamingHttpResponse
+from django.db.models import Sum, Count, Max, Q
 from django.utils import timezone
-from datetime import timedelta, datetime
+from datetime import date, timedelta, datetime
 
 from rest_framework import generics, permissions, status
+from rest_framework.exceptions import AuthenticationFailed, NotFound
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from apps.wallet.models import Wallet, WalletTx
-from .models import Cart, CartItem, Order, OrderItem, OrderQuota
+from apps.accounts.authentication import CachedTokenAuthentication
+from apps.catalog.cache import get_catalog_version, get_menu_items
+from apps.core.conditional import conditional
+from apps.core.idempotency import idempotent
+from apps.core.pagination import KeysetPagination
+from apps.core.routers import ReplicaReadMixin
+from .archive import archive_horizon
+from .checkout import CheckoutError, checkout, service_day_for
+from .events import Subscription, get_backend, publish_order_event
+from .kitchen import MAX_BULK_ORDERS, bulk_set_status, kitchen_queue
+from .metrics import CHECKOUT_OUTCOMES
+from .models import ArchivedOrder, Cart, CartItem, DailySalesRollup, Order, OrderItem
+from .rollup import record_status_change
+from . import slots
 from .serializers import (
+    CartBatchSerializer,
+    CartOpSerializer,
     OrderSerializer,
-    CartSerializer,
     CartItemWriteSerializer,
     CartItemReadSerializer,
+    PickupSlotSerializer,
+    ORDER_FIELDS,
+    cart_data,
+    orders_data,
 )
 
 def _get_or_create_cart(user):
     cart, _ = Cart.objects.get_or_create(user=user)
     return cart
 
+
+def _get_cart_snapshot(user, cart=None):
+    """The cart as CartSerializer would render it, read in one extra query
+    (see serializers.cart_data)."""
+    return cart_data(cart or _get_or_create_cart(user))
+
+def _cart_stamp(request):
+    # lines show the menu's current names and prices, so the catalog version
+    # is part of it; that has no timestamp, hence no Last-Modified
+    cart = Cart.objects.filter(user=request.user).values_list("id", "updated_at").first()
+    return cart and ((*cart, get_catalog_version()), None)
+
+
 class CartView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    @conditional("cart", _cart_stamp)
     def get(self, request):
-        cart = _get_or_create_cart(request.user)
-        data = CartSerializer(cart).data
-        return Response(data)
+        return Response(_get_cart_snapshot(request.user))
 
     def delete(self, request):
         """Clear the cart."""
         cart = _get_or_create_cart(request.user)
         cart.items.all().delete()
-        cart.refresh_from_db()
-        return Response(CartSerializer(cart).data, status=status.HTTP_200_OK)
+        cart.touch()
+        return Response(_get_cart_snapshot(request.user, cart), status=status.HTTP_200_OK)
 
 
 class CartItemsView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    @idempotent("orders.cart-items")
     @transaction.atomic
     def post(self, request):
         """
@@ -55,10 +94,63 @@ class CartItemsView(APIView):
         if not created:
             ci.qty += qty
             ci.save(update_fields=["qty"])
+        cart.touch()
 
         return Response(CartItemReadSerializer(ci).data, status=status.HTTP_201_CREATED)
 
 
+class CartBatchView(APIView):
+    """
+    POST /api/orders/cart/batch/
+    Body: { "ops": [ {"op": "add", "item_id": 3, "qty": 1},
+                     {"op": "set", "item_id": 5, "qty": 2},     # qty 0 removes
+                     {"op": "remove", "item_id": 7} ] }
+    The ops are folded per item in order, then written in one transaction:
+    one upsert on (cart, item) for the lines that changed and one DELETE for
+    the removed ones. Returns the cart snapshot.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    @idempotent("orders.cart-batch")
+    @transaction.atomic
+    def post(self, request):
+        serializer = CartBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ops = serializer.validated_data["ops"]
+
+        menu = get_menu_items()
+        unknown = sorted({op["item_id"] for op in ops
+                          if op["op"] != CartOpSerializer.REMOVE and op["qty"] and op["item_id"] not in menu})
+        if unknown:
+            return Response({"detail": "Unknown or unavailable items.", "item_ids": unknown},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        cart = _get_or_create_cart(request.user)
+        current = dict(CartItem.objects.select_for_update().filter(
+            cart=cart, item_id__in={op["item_id"] for op in ops}).values_list("item_id", "qty"))
+        qty = dict(current)
+        for op in ops:
+            if op["op"] == CartOpSerializer.ADD:
+                qty[op["item_id"]] = qty.get(op["item_id"], 0) + op["qty"]
+            elif op["op"] == CartOpSerializer.SET:
+                qty[op["item_id"]] = op["qty"]
+            else:
+                qty[op["item_id"]] = 0
+
+        changed = [CartItem(cart=cart, item_id=item_id, qty=n) for item_id, n in sorted(qty.items())
+                   if n and n != current.get(item_id)]
+        if changed:
+            CartItem.objects.bulk_create(changed, update_conflicts=True, unique_fields=["cart", "item"],
+                                         update_fields=["qty"])
+        removed = [item_id for item_id, n in qty.items() if not n and item_id in current]
+        if removed:
+            CartItem.objects.filter(cart=cart, item_id__in=removed).delete()
+        if changed or removed:
+            cart.touch()
+
+        return Response(_get_cart_snapshot(request.user, cart))
+
+
 class CartItemDetailView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
@@ -75,33 +167,61 @@ class CartItemDetailView(APIView):
             return Response({"detail": "Quantity must be at least 1."}, status=status.HTTP_400_BAD_REQUEST)
         ci.qty = qty
         ci.save(update_fields=["qty"])
+        ci.cart.touch()
         return Response(CartItemReadSerializer(ci).data)
 
     @transaction.atomic
     def delete(self, request, pk: int):
-        ci = self._get_obj(request, pk)
-        ci.delete()
-        # return the new cart snapshot
         cart = _get_or_create_cart(request.user)
-        return Response(CartSerializer(cart).data, status=status.HTTP_200_OK)
+        deleted, _ = cart.items.filter(pk=pk).delete()
+        if not deleted:
+            raise NotFound("Cart item not found.")
+        cart.touch()
+        # return the new cart snapshot
+        return Response(_get_cart_snapshot(request.user, cart), status=status.HTTP_200_OK)
 
-def _dubai_service_day(dt):
-    # if TIME_ZONE is Asia/Dubai and USE_TZ True, dt.astimezone picks it up
-    return dt.astimezone(timezone.get_current_timezone()).date()
+class ReorderView(APIView):
+    """
+    POST /api/orders/orders/<id>/reorder/
+    Puts the lines of one of the user's orders into the cart in one
+    bulk_create (an existing line for the same item takes the order's qty).
+    Items no longer on the menu are skipped and listed by name.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    @transaction.atomic
+    def post(self, request, pk: int):
+        lines = list(OrderItem.objects.filter(order_id=pk, order__user=request.user)
+                     .values_list("item_id", "item_name", "qty"))
+        if not lines:
+            raise NotFound("Order not found.")
+        menu = get_menu_items()
+        qty = {}
+        for item_id, _, n in lines:
+            if item_id in menu:
+                qty[item_id] = qty.get(item_id, 0) + n
+        cart = _get_or_create_cart(request.user)
+        CartItem.objects.bulk_create(
+            [CartItem(cart=cart, item_id=item_id, qty=n) for item_id, n in qty.items()],
+            update_conflicts=True, unique_fields=["cart", "item"], update_fields=["qty"])
+        cart.touch()
+        return Response({**_get_cart_snapshot(request.user, cart),
+                         "skipped": [name for item_id, name, _ in lines if item_id not in menu]})
 
 
 class CheckoutView(APIView):
     """
     POST /api/orders/checkout/
     Body: { "pickup_time": "2025-10-25T12:30:00" }
-    Steps:
+    Steps (see checkout.py):
       - snapshot cart into an Order + OrderItems
       - enforce 5 paid orders/day
-      - debit wallet (wallet-first MVP)
+      - debit wallet (wallet-first MVP, full cover required)
     """
     permission_classes = [permissions.IsAuthenticated]
 
-    @transaction.atomic
+    # checkout keeps its own write window short (see checkout.py)
+    @idempotent("orders.checkout", atomic=False)
     def post(self, request):
         pickup_time_str = request.data.get("pickup_time")
         if not pickup_time_str:
@@ -117,77 +237,66 @@ class CheckoutView(APIView):
             return Response({"detail": f"Invalid pickup_time format: {str(e)}. Expected ISO8601 format like '2025-10-25T12:30:00'."}, 
                           status=status.HTTP_400_BAD_REQUEST)
 
-        # get cart and compute totals
-        cart, _ = Cart.objects.get_or_create(user=request.user)
-        items = list(cart.items.select_related("item"))
-        if not items:
-            return Response({"detail": "Cart is empty."}, status=status.HTTP_400_BAD_REQUEST)
-
-        total_minor = sum(ci.line_total_minor for ci in items)
-
-        # quota check (5/day) - skip for admin users
-        now = timezone.now()
-        service_day = _dubai_service_day(now)
-        is_admin = request.user.is_staff or request.user.is_superuser
-        
-        if not is_admin:
-            quota, _ = OrderQuota.objects.select_for_update().get_or_create(user=request.user, service_day=service_day)
-            if quota.paid_count >= 5:
-                return Response({"ok": False, "code": "ORDER_LIMIT_REACHED",
-                                 "message": "You reached today's limit (5)."}, status=429)
-
-        # wallet-first debit
-        wallet, _ = Wallet.objects.select_for_update().get_or_create(user=request.user)
-        to_debit = min(wallet.balance_minor, total_minor)
-        wallet.balance_minor -= to_debit
-        wallet.save(update_fields=["balance_minor"])
-        if to_debit > 0:
-            WalletTx.objects.create(user=request.user, type=WalletTx.DEBIT, amount_minor=to_debit, ref="checkout")
-
-        paid_minor = to_debit
-        if paid_minor < total_minor:
-            # For MVP we require full wallet cover; later we’ll add card for the remainder.
-            return Response({"ok": False, "code": "INSUFFICIENT_WALLET_FUNDS",
-                             "message": "Not enough wallet balance for this order."},
-                            status=status.HTTP_402_PAYMENT_REQUIRED)
-
-        # create order + items snapshot
-        order = Order.objects.create(
-            user=request.user,
-            status=Order.PAID,
-            total_minor=total_minor,
-            paid_minor=paid_minor,
-            pickup_time=pickup_time,
-            service_day=service_day,
-        )
-        OrderItem.objects.bulk_create([
-            OrderItem(
-                order=order,
-                item_name=ci.item.name,
-                unit_price_minor=ci.item.price_minor,
-                qty=ci.qty,
-                line_total_minor=ci.line_total_minor,
-            ) for ci in items
-        ])
-
-        # increment paid quota - skip for admin users
-        if not is_admin:
-            quota.paid_count += 1
-            quota.save(update_fields=["paid_count"])
-
-        # clear cart
-        cart.items.all().delete()
+        try:
+            order = checkout(request.user, pickup_time)
+        except CheckoutError as e:
+            CHECKOUT_OUTCOMES.labels(e.code).inc()
+            return Response({"ok": False, "code": e.code, "message": e.message}, status=e.status_code)
+        CHECKOUT_OUTCOMES.labels("OK").inc()
 
         return Response({"ok": True, "message": "Order paid.",
                          "data": OrderSerializer(order).data}, status=status.HTTP_201_CREATED)
         
-class MyOrdersView(generics.ListAPIView):
-    """Return the authenticated user's orders, newest first."""
+class PickupSlotsView(APIView):
+    """
+    GET /api/orders/slots/?day=2025-10-25  (defaults to today)
+    Pickup slots for a service day with their remaining capacity. The day
+    is clamped to the booking window (today + PICKUP_BOOKING_DAYS).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        day = service_day_for(timezone.now())
+        if request.query_params.get("day"):
+            try:
+                day = date.fromisoformat(request.query_params["day"])
+            except ValueError:
+                return Response({"detail": "day must be YYYY-MM-DD."}, status=status.HTTP_400_BAD_REQUEST)
+        first, last = slots.booking_window()
+        day = min(max(day, first), last)
+        return Response(PickupSlotSerializer(slots.slots_for_day(day), many=True).data)
+
+
+def _orders_stamp(request):
+    # every write moves updated_at; the count catches deleted and archived orders
+    stamp = Order.objects.filter(user=request.user).aggregate(n=Count("id"), last=Max("updated_at"))
+    return (stamp["n"], stamp["last"]), stamp["last"]
+
+
+class MyOrdersView(ReplicaReadMixin, generics.ListAPIView):
+    """
+    Return the authenticated user's orders, newest first (keyset-paginated).
+    Pages that reach back past the archive horizon also read ArchivedOrder.
+    Answers 304 from one aggregate while the user's orders are unchanged.
+    """
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = OrderSerializer
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user).order_by("-created_at")
+        return Order.objects.filter(user=self.request.user)
+
+    @conditional("orders", _orders_stamp)
+    def list(self, request, *args, **kwargs):
+        # values() rows and serializers.orders_data: same output as the
+        # serializers without building model instances
+        horizon = archive_horizon(service_day_for(timezone.now()))
+        orders = self.get_queryset().values(*ORDER_FIELDS)
+        # accounts newer than the horizon can't have archived orders
+        archived = (ArchivedOrder.objects.filter(user=request.user).values(*ORDER_FIELDS, "items")
+                    if request.user.date_joined < horizon else None)
+        page = self.paginator.paginate_with_fallback(orders, archived, request, horizon)
+        return self.paginator.get_paginated_response(orders_data(page))
 
 
 class IsAdminUser(permissions.BasePermission):
@@ -196,48 +305,56 @@ class IsAdminUser(permissions.BasePermission):
         return bool(request.user and request.user.is_authenticated and (request.user.is_staff or request.user.is_superuser))
 
 
-class AdminDashboardView(APIView):
-    """Dashboard statistics for admin users."""
+class AdminDashboardView(ReplicaReadMixin, APIView):
+    """
+    Dashboard statistics for admin users.
+
+    Past days come from DailySalesRollup and today from one grouped query on
+    Order, so the cost doesn't grow with order history.
+    """
     permission_classes = [IsAdminUser]
 
     def get(self, request):
-        now = timezone.now()
-        today = now.date()
-        today_start = timezone.make_aware(datetime.combine(today, datetime.min.time()))
-        week_ago = today - timedelta(days=7)
-
-        # Total orders
-        total_orders = Order.objects.count()
-        orders_today = Order.objects.filter(created_at__gte=today_start).count()
-
-        # Total revenue
-        total_revenue_minor = Order.objects.aggregate(
-            total=Sum('total_minor')
-        )['total'] or 0
-        revenue_today_minor = Order.objects.filter(
-            created_at__gte=today_start
-        ).aggregate(total=Sum('total_minor'))['total'] or 0
+        today = service_day_for(timezone.now())
+        week_start = today - timedelta(days=6)
+
+        # closed days: one aggregate over the rollup (one row per day)
+        past = DailySalesRollup.objects.filter(service_day__lt=today).aggregate(
+            orders=Sum('order_count'),
+            revenue=Sum('revenue_minor'),
+            pending=Sum('pending_count'),
+            paid=Sum('paid_count'),
+            preparing=Sum('preparing_count'),
+        )
+        past = {k: v or 0 for k, v in past.items()}
+        past_week = dict(DailySalesRollup.objects.filter(
+            service_day__gte=week_start, service_day__lt=today
+        ).values_list('service_day', 'revenue_minor'))
+
+        # today: live, grouped by status
+        today_rows = Order.objects.filter(service_day=today).values('status').annotate(
+            n=Count('id'), revenue=Sum('total_minor')
+        ).order_by()
+        today_by_status = {r['status']: r for r in today_rows}
+        orders_today = sum(r['n'] for r in today_rows)
+        revenue_today_minor = sum(r['revenue'] or 0 for r in today_rows)
+
+        total_orders = past['orders'] + orders_today
+        total_revenue_minor = past['revenue'] + revenue_today_minor
 
         # Active orders (pending, paid, preparing)
-        active_orders = Order.objects.filter(
-            status__in=[Order.PENDING, Order.PAID, Order.PREPARING]
-        ).count()
+        active_orders = past['pending'] + past['paid'] + past['preparing'] + sum(
+            today_by_status.get(s, {}).get('n', 0) for s in (Order.PENDING, Order.PAID, Order.PREPARING)
+        )
 
         # Average order value
-        avg_order_minor = Order.objects.aggregate(
-            avg=Avg('total_minor')
-        )['avg'] or 0
+        avg_order_minor = total_revenue_minor / total_orders if total_orders else 0
 
         # Last 7 days revenue (for chart)
         daily_revenue = []
         for i in range(6, -1, -1):
             day = today - timedelta(days=i)
-            day_start = timezone.make_aware(datetime.combine(day, datetime.min.time()))
-            day_end = day_start + timedelta(days=1)
-            revenue = Order.objects.filter(
-                created_at__gte=day_start,
-                created_at__lt=day_end
-            ).aggregate(total=Sum('total_minor'))['total'] or 0
+            revenue = revenue_today_minor if day == today else past_week.get(day, 0)
             daily_revenue.append({
                 'date': day.isoformat(),
                 'day_name': day.strftime('%a'),
@@ -245,11 +362,10 @@ class AdminDashboardView(APIView):
             })
 
         # Recent orders (last 10)
-        recent_orders = Order.objects.select_related('user').order_by('-created_at')[:10]
+        recent_orders = Order.objects.select_related('user').prefetch_related('items').order_by('-created_at')[:10]
         recent_orders_data = []
         for order in recent_orders:
-            items_list = list(order.items.values_list('item_name', 'qty'))
-            items_str = ', '.join([f"{qty}x {name}" for name, qty in items_list])
+            items_str = ', '.join([f"{oi.qty}x {oi.item_name}" for oi in order.items.all()])
             recent_orders_data.append({
                 'id': str(order.id)[:8],
                 'full_id': order.id,
@@ -274,12 +390,13 @@ class AdminDashboardView(APIView):
 
 
 class AdminOrdersView(generics.ListAPIView):
-    """List all orders (admin only)."""
+    """List all orders (admin only), newest first (keyset-paginated)."""
     permission_classes = [IsAdminUser]
     serializer_class = OrderSerializer
+    pagination_class = KeysetPagination
 
     def get_queryset(self):
-        queryset = Order.objects.select_related('user').order_by('-created_at')
+        queryset = Order.objects.prefetch_related('items')
         status_filter = self.request.query_params.get('status')
         if status_filter:
             queryset = queryset.filter(status=status_filter)
@@ -291,13 +408,167 @@ class AdminOrderUpdateView(APIView):
     permission_classes = [IsAdminUser]
 
     def patch(self, request, pk):
-        order = Order.objects.get(pk=pk)
         new_status = request.data.get('status')
         if new_status not in dict(Order.STATUSES):
             return Response(
                 {"detail": "Invalid status."},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        order.status = new_status
-        order.save(update_fields=['status'])
+        with transaction.atomic():
+            # read the status under the row lock: two PATCHes racing on one order
+            # must not both count the same transition or release its slot twice
+            order = Order.objects.select_for_update().filter(pk=pk).first()
+            if order is None:
+                raise NotFound("Order not found.")
+            old_status = order.status
+            order.status = new_status
+            order.save(update_fields=['status', 'updated_at'])
+            record_status_change(order.service_day, old_status, new_status)
+            if new_status == Order.CANCELLED and old_status != Order.CANCELLED:
+                slots.release(order)
+            publish_order_event(order)
         return Response(OrderSerializer(order).data)
+
+
+class AdminOrderBulkStatusView(APIView):
+    """
+    POST /api/orders/admin/orders/bulk-status/
+    Body: { "ids": [1, 2, 3], "status": "ready" }
+    One UPDATE for the whole batch instead of a PATCH per order.
+    """
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        ids = request.data.get('ids')
+        new_status = request.data.get('status')
+        if new_status not in dict(Order.STATUSES):
+            return Response({"detail": "Invalid status."}, status=status.HTTP_400_BAD_REQUEST)
+        if (not isinstance(ids, list) or not ids or len(ids) > MAX_BULK_ORDERS
+                or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids)):
+            return Response({"detail": f"ids must be a list of 1-{MAX_BULK_ORDERS} order ids."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        changed = bulk_set_status(ids, new_status)
+        return Response({"status": new_status, "updated": len(changed), "ids": changed})
+
+
+class KitchenQueueView(APIView):
+    """
+    GET /api/orders/admin/kitchen/?minutes=30
+    Paid/preparing orders due in the next N minutes, as item totals per pickup slot.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        try:
+            minutes = int(request.query_params.get('minutes', 30))
+        except ValueError:
+            return Response({"detail": "minutes must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        minutes = max(1, min(minutes, 24 * 60))
+        return Response({"minutes": minutes, "slots": kitchen_queue(minutes=minutes)})
+
+
+# ---------- Server-Sent Events (serve under ASGI) ----------
+SSE_HEARTBEAT_SECONDS = 15
+SSE_TICKET_TTL = 60
+SSE_TICKET_SALT = "orders.events.ticket"
+
+
+def streaming_supported(request):
+    """Only an ASGI server can hold a stream open; WSGI (runserver) would buffer it forever."""
+    return isinstance(getattr(request, "_request", request), ASGIRequest)
+
+
+class OrderEventsTicketView(APIView):
+    """
+    POST /api/orders/events/ticket/
+    A ticket for opening /api/orders/events/?ticket=... : EventSource can't
+    send an Authorization header, and the API token itself would end up in
+    access logs. Tickets are signed, name the user and are only accepted for
+    SSE_TICKET_TTL seconds. `stream` is false when the server can't stream
+    (WSGI); the client polls the order list instead.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        return Response({
+            "ticket": signing.dumps(request.user.pk, salt=SSE_TICKET_SALT),
+            "expires_in": SSE_TICKET_TTL,
+            "stream": streaming_supported(request),
+        })
+
+
+@sync_to_async
+def _authenticate_stream(request):
+    """A ?ticket= from OrderEventsTicketView, or the Authorization header."""
+    ticket = request.GET.get("ticket")
+    if ticket:
+        try:
+            user_id = signing.loads(ticket, salt=SSE_TICKET_SALT, max_age=SSE_TICKET_TTL)
+        except signing.BadSignature:   # includes expired
+            return None
+        return get_user_model().objects.filter(pk=user_id, is_active=True).first()
+    auth = request.headers.get("Authorization", "").split()
+    if len(auth) != 2 or auth[0].lower() != "token":
+        return None
+    try:
+        user, _ = CachedTokenAuthentication().authenticate_credentials(auth[1])
+    except AuthenticationFailed:
+        return None
+    return user
+
+
+def _sse(event):
+    return f"id: {event.id}\nevent: {event.type}\ndata: {json.dumps(event.data)}\n\n"
+
+
+async def _event_stream(subscription, last_event_id):
+    yield "retry: 3000\n\n"
+    with subscription:
+        last_sent = last_event_id or 0
+        if last_event_id is not None:
+            backlog = subscription.backlog(last_event_id)
+            if backlog is None:
+                # gap we can't replay (restart or buffer overrun): client should refetch
+                yield "event: resync\ndata: {}\n\n"
+                backlog = []
+            for event in backlog:
+                last_sent = event.id
+                yield _sse(event)
+
+        while not subscription.overflowed:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), SSE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            if event.id <= last_sent:
+                continue  # already sent from the backlog
+            last_sent = event.id
+            yield _sse(event)
+
+
+async def order_events(request):
+    """
+    GET /api/orders/events/  (text/event-stream)
+    Students receive their own orders, staff receive all orders. Reconnects
+    send Last-Event-ID and get the missed events replayed.
+    """
+    if not streaming_supported(request):
+        return JsonResponse({"detail": "Order events need an ASGI server; poll the order list instead."},
+                            status=503)
+    user = await _authenticate_stream(request)
+    if user is None:
+        return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+
+    try:
+        last_event_id = int(request.headers.get("Last-Event-ID") or request.GET.get("last_event_id"))
+    except (TypeError, ValueError):
+        last_event_id = None
+
+    is_admin = user.is_staff or user.is_superuser
+    subscription = Subscription(get_backend(), user_id=None if is_admin else user.id)
+    response = StreamingHttpResponse(_event_stream(subscription, last_event_id),
+                                     content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # don't let nginx buffer the stream
+    return response
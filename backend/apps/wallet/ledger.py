@@ -0,0 +1,170 @@
+# apps/wallet/ledger.py
+"""
+Wallet ledger.
+
+WalletTx is append-only and every row carries `balance_after`, the wallet
+balance once that row was applied. `credit` and `debit` are the only code
+paths that change Wallet.balance_minor: each one is a single-statement
+UPDATE, a read of the new balance and the ledger INSERT, all in the caller's
+transaction, so balance and ledger commit or roll back together.
+
+Verifying a wallet means replaying its rows in id order and checking each
+balance_after and, at the end, Wallet.balance_minor. WalletCheckpoint stores
+a verified (last_tx_id, balance) pair so the next audit only replays rows
+after it. `reconcile_batch` does this for a batch of wallets with one query
+for checkpoints and one streamed query for transactions, so memory stays
+bounded by the batch size, not by history.
+"""
+from dataclasses import dataclass, field
+
+from django.db import transaction
+from django.db.models import F, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Wallet, WalletCheckpoint, WalletTx
+
+# reads of a wallet whose balance moved while it was being verified
+MAX_RECHECKS = 3
+
+
+def _append(user, type, amount_minor, ref):
+    balance = Wallet.objects.filter(user=user).values_list("balance_minor", flat=True).get()
+    return WalletTx.objects.create(user=user, type=type, amount_minor=amount_minor, balance_after=balance, ref=ref)
+
+
+@transaction.atomic(savepoint=False)
+def credit(user, amount_minor, type=WalletTx.TOPUP, ref=""):
+    """Add to the user's balance (creating the wallet if needed); returns the WalletTx."""
+    if not Wallet.objects.filter(user=user).update(balance_minor=F("balance_minor") + amount_minor):
+        _, created = Wallet.objects.get_or_create(user=user, defaults={"balance_minor": amount_minor})
+        if not created:
+            Wallet.objects.filter(user=user).update(balance_minor=F("balance_minor") + amount_minor)
+    return _append(user, type, amount_minor, ref)
+
+
+@transaction.atomic(savepoint=False)
+def debit(user, amount_minor, ref=""):
+    """Take from the user's balance if it covers the amount; returns the WalletTx or None."""
+    if not Wallet.objects.filter(user=user, balance_minor__gte=amount_minor).update(
+            balance_minor=F("balance_minor") - amount_minor):
+        return None
+    return _append(user, WalletTx.DEBIT, amount_minor, ref)
+
+
+# ---------- reconciliation ----------
+@dataclass
+class Mismatch:
+    user_id: int
+    tx_id: int | None      # None: the replayed total disagrees with Wallet.balance_minor
+    expected_minor: int    # from replaying the ledger
+    actual_minor: int      # balance_after, or the wallet balance
+
+
+@dataclass
+class BatchResult:
+    wallets: int = 0
+    txs: int = 0
+    checkpoints: int = 0
+    adopted: int = 0
+    mismatches: list = field(default_factory=list)
+
+
+class _Replay:
+    __slots__ = ("balance", "count", "last_tx_id", "mismatch")
+
+    def __init__(self, balance=0, count=0, last_tx_id=0):
+        self.balance = balance
+        self.count = count
+        self.last_tx_id = last_tx_id
+        self.mismatch = None
+
+    def apply(self, user_id, tx_id, type, amount_minor, balance_after):
+        self.balance += WalletTx.SIGNS[type] * amount_minor
+        self.count += 1
+        self.last_tx_id = tx_id
+        if self.mismatch is None and balance_after is not None and balance_after != self.balance:
+            self.mismatch = Mismatch(user_id, tx_id, self.balance, balance_after)
+
+
+_TX_FIELDS = ("user_id", "id", "type", "amount_minor", "balance_after")
+
+
+def _latest_checkpoints(user_ids):
+    latest = dict(WalletCheckpoint.objects.filter(user_id__in=user_ids)
+                  .values("user_id").annotate(last=Max("last_tx_id")).order_by().values_list("user_id", "last"))
+    # a tx id belongs to one user, so (user, last_tx_id) pairs come back via a plain IN
+    rows = WalletCheckpoint.objects.filter(user_id__in=list(latest), last_tx_id__in=set(latest.values()))
+    return {c.user_id: c for c in rows if c.last_tx_id == latest[c.user_id]}
+
+
+def reconcile_batch(wallets, write_checkpoints=True, adopt=False, chunk_size=2000):
+    """
+    Verify `wallets`, a list of (user_id, balance_minor). With adopt=True a
+    wallet that has never been checkpointed and doesn't match its ledger
+    (history from before balance_after existed) gets a checkpoint at its
+    current balance instead of being reported.
+    """
+    result = BatchResult(wallets=len(wallets))
+    balances = dict(wallets)
+    checkpoints = _latest_checkpoints(list(balances))
+    replays = {
+        uid: _Replay(c.balance_minor, c.tx_count, c.last_tx_id) if (c := checkpoints.get(uid)) else _Replay()
+        for uid in balances
+    }
+
+    # rows after each user's latest checkpoint: the subquery is one index probe per user
+    since = WalletCheckpoint.objects.filter(user_id=OuterRef("user_id")).order_by("-last_tx_id").values("last_tx_id")[:1]
+    rows = (WalletTx.objects.filter(user_id__in=list(balances), id__gt=Coalesce(Subquery(since), 0))
+            .order_by("user_id", "id").values_list(*_TX_FIELDS))
+    for user_id, tx_id, type, amount_minor, balance_after in rows.iterator(chunk_size=chunk_size):
+        replays[user_id].apply(user_id, tx_id, type, amount_minor, balance_after)
+        result.txs += 1
+
+    new_checkpoints = []
+    for uid, replay in replays.items():
+        start = checkpoints.get(uid)
+        mismatch = replay.mismatch or _recheck_balance(uid, replay, balances[uid])
+        if mismatch and adopt and start is None:
+            replay.balance = Wallet.objects.filter(user_id=uid).values_list("balance_minor", flat=True).get()
+            result.adopted += 1
+        elif mismatch:
+            result.mismatches.append(mismatch)
+            continue
+        if write_checkpoints and (start is None or replay.last_tx_id > start.last_tx_id):
+            new_checkpoints.append(WalletCheckpoint(
+                user_id=uid, last_tx_id=replay.last_tx_id, balance_minor=replay.balance, tx_count=replay.count))
+    WalletCheckpoint.objects.bulk_create(new_checkpoints, ignore_conflicts=True)
+    result.checkpoints = len(new_checkpoints)
+    return result
+
+
+def _recheck_balance(user_id, replay, balance):
+    """
+    None if the replay ends at the wallet balance. The balance was read before
+    the ledger rows, so a payment committed in between shows up as a
+    difference: re-read the wallet and replay any newer rows before deciding.
+    """
+    for _ in range(MAX_RECHECKS):
+        if replay.balance == balance:
+            return None
+        balance = Wallet.objects.filter(user_id=user_id).values_list("balance_minor", flat=True).get()
+        newer = WalletTx.objects.filter(user_id=user_id, id__gt=replay.last_tx_id).order_by("id")
+        for row in newer.values_list(*_TX_FIELDS):
+            replay.apply(*row)
+        if replay.mismatch:
+            return replay.mismatch
+    return None if replay.balance == balance else Mismatch(user_id, None, replay.balance, balance)
+
+
+def iter_wallet_batches(batch_size, user_ids=None):
+    """(user_id, balance_minor) lists in user_id order, keyset-paginated."""
+    wallets = Wallet.objects.order_by("user_id")
+    if user_ids:
+        wallets = wallets.filter(user_id__in=user_ids)
+    after = 0
+    while True:
+        batch = list(wallets.filter(user_id__gt=after).values_list("user_id", "balance_minor")[:batch_size])
+        if not batch:
+            return
+        yield batch
+        after = batch[-1][0]
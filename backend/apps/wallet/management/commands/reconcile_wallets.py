@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.wallet.ledger import iter_wallet_batches, reconcile_batch
+
+
+class Command(BaseCommand):
+    help = ("Check every wallet balance against its WalletTx ledger, replaying only the rows after "
+            "the latest checkpoint, and checkpoint the wallets that match.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500, help="wallets per batch")
+        parser.add_argument("--user", type=int, action="append", dest="users",
+                            help="only these user ids (repeatable)")
+        parser.add_argument("--no-checkpoint", action="store_true", help="verify only, write nothing")
+        parser.add_argument("--adopt", action="store_true",
+                            help="checkpoint never-verified wallets at their current balance when their "
+                                 "history doesn't add up (rows from before the ledger)")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        wallets = txs = checkpoints = adopted = mismatched = 0
+        for batch in iter_wallet_batches(options["batch_size"], options["users"]):
+            result = reconcile_batch(batch, write_checkpoints=not options["no_checkpoint"], adopt=options["adopt"])
+            wallets += result.wallets
+            txs += result.txs
+            checkpoints += result.checkpoints
+            adopted += result.adopted
+            for m in result.mismatches:
+                where = f"tx {m.tx_id} balance_after" if m.tx_id else "wallet balance"
+                self.stderr.write(f"user {m.user_id}: ledger gives {m.expected_minor}, {where} is {m.actual_minor}")
+            mismatched += len(result.mismatches)
+
+        summary = (f"Checked {wallets} wallet(s), replayed {txs} transaction(s) in "
+                   f"{time.monotonic() - started:.1f}s; {checkpoints} checkpoint(s) written")
+        if adopted:
+            summary += f", {adopted} wallet(s) adopted at their current balance"
+        if mismatched:
+            raise CommandError(f"{summary}. {mismatched} wallet(s) don't match their ledger.")
+        self.stdout.write(self.style.SUCCESS(f"{summary}."))
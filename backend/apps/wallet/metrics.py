@@ -0,0 +1,5 @@
+# apps/wallet/metrics.py
+from apps.core.metrics import Counter
+
+TOPUPS = Counter("wallet_topups_total", "Completed wallet top-ups.")
+TOPUP_MINOR = Counter("wallet_topup_minor_total", "Wallet top-up volume in minor units (fils).")
@@ -16,9 +16,14 @@ class WalletTx(models.Model):
     REFUND = "REFUND"
     TYPES = [(TOPUP, "Topup"), (DEBIT, "Debit"), (REFUND, "Refund")]
 
+    # sign applied to amount_minor when replaying the ledger
+    SIGNS = {TOPUP: 1, REFUND: 1, DEBIT: -1}
+
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="wallet_txs")
     type = models.CharField(max_length=10, choices=TYPES)
     amount_minor = models.PositiveIntegerField()
+    # wallet balance right after this row was applied; rows are ordered by id
+    balance_after = models.PositiveIntegerField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     ref = models.CharField(max_length=64, blank=True)  # optional external ref
 
@@ -27,3 +32,32 @@ class WalletTx(models.Model):
 
     def __str__(self):
         return f"{self.type} {self.amount_minor} to user={self.user_id}"
+
+    @property
+    def signed_amount_minor(self):
+        return self.SIGNS[self.type] * self.amount_minor
+
+    def save(self, *args, **kwargs):
+        # append-only: corrections are new rows (e.g. a REFUND), never edits
+        if not self._state.adding:
+            raise ValueError("WalletTx rows are append-only.")
+        super().save(*args, **kwargs)
+
+
+class WalletCheckpoint(models.Model):
+    """
+    A verified balance: replaying the user's WalletTx rows with id <= last_tx_id
+    gives balance_minor. Audits start from the latest checkpoint and only
+    replay the rows after it. Written by `manage.py reconcile_wallets`.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="wallet_checkpoints")
+    last_tx_id = models.BigIntegerField()
+    balance_minor = models.PositiveIntegerField()
+    tx_count = models.PositiveIntegerField()  # rows replayed up to last_tx_id
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["user", "last_tx_id"], name="uniq_wallet_checkpoint")]
+
+    def __str__(self):
+        return f"Checkpoint<{self.user_id}> tx<={self.last_tx_id} balance={self.balance_minor}"
@@ -8,3 +8,8 @@ class WalletSerializer(serializers.ModelSerializer):
 
 class TopupSerializer(serializers.Serializer):
     amount_minor = serializers.IntegerField(min_value=1)
+
+class WalletTxSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WalletTx
+        fields = ["id", "type", "amount_minor", "balance_after", "ref", "created_at"]
@@ -1,3 +1,165 @@
+import csv
+from datetime import datetime, timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from apps.accounts.authentication import token_cache
+
+from . import ledger
+from .models import Wallet, WalletCheckpoint, WalletTx
+
+User = get_user_model()
+
+
+class LedgerTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("student", password="pw")
+
+    def test_credit_and_debit_record_balance_after(self):
+        self.assertEqual(ledger.credit(self.user, 5000).balance_after, 5000)   # creates the wallet
+        self.assertEqual(ledger.debit(self.user, 1200, ref="checkout").balance_after, 3800)
+        self.assertIsNone(ledger.debit(self.user, 10_000))
+        self.assertEqual(ledger.credit(self.user, 200, WalletTx.REFUND).balance_after, 4000)
+        self.assertEqual(Wallet.objects.get(user=self.user).balance_minor, 4000)
+        self.assertEqual(list(WalletTx.objects.order_by("id").values_list("balance_after", flat=True)),
+                         [5000, 3800, 4000])
+
+    def test_rows_are_append_only(self):
+        tx = ledger.credit(self.user, 100)
+        tx.amount_minor = 1
+        with self.assertRaises(ValueError):
+            tx.save()
+
+
+class ReconcileWalletsTests(TestCase):
+    def setUp(self):
+        self.users = [User.objects.create_user(f"s{i}") for i in range(5)]
+        for user in self.users:
+            ledger.credit(user, 10_000)
+            ledger.debit(user, 2500)
+
+    def _reconcile(self, *args):
+        out = StringIO()
+        call_command("reconcile_wallets", "--batch-size", "2", *args, stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def test_checkpoints_then_replays_only_new_rows(self):
+        self.assertIn("Checked 5 wallet(s), replayed 10 transaction(s)", self._reconcile())
+        self.assertEqual(WalletCheckpoint.objects.count(), 5)
+
+        ledger.debit(self.users[0], 500)
+        self.assertIn("replayed 1 transaction(s)", self._reconcile())
+        latest = WalletCheckpoint.objects.filter(user=self.users[0]).latest("last_tx_id")
+        self.assertEqual((latest.balance_minor, latest.tx_count), (7000, 3))
+
+    def test_reports_drift(self):
+        Wallet.objects.filter(user=self.users[3]).update(balance_minor=99)
+        with self.assertRaisesMessage(CommandError, "1 wallet(s) don't match"):
+            self._reconcile()
+        self.assertFalse(WalletCheckpoint.objects.filter(user=self.users[3]).exists())
+        self.assertEqual(WalletCheckpoint.objects.count(), 4)
+
+    def test_reports_broken_chain(self):
+        WalletTx.objects.filter(user=self.users[1], type=WalletTx.DEBIT).update(amount_minor=2000)
+        result = ledger.reconcile_batch([(self.users[1].pk, 7500)], write_checkpoints=False)
+        [mismatch] = result.mismatches
+        self.assertEqual((mismatch.expected_minor, mismatch.actual_minor), (8000, 7500))
+
+    def test_adopt_legacy_history(self):
+        legacy = User.objects.create_user("legacy")
+        Wallet.objects.create(user=legacy, balance_minor=4200)
+        WalletTx.objects.create(user=legacy, type=WalletTx.TOPUP, amount_minor=1000)   # pre-ledger row
+        with self.assertRaises(CommandError):
+            self._reconcile("--user", str(legacy.pk))
+        self.assertIn("1 wallet(s) adopted", self._reconcile("--user", str(legacy.pk), "--adopt"))
+        self.assertEqual(WalletCheckpoint.objects.get(user=legacy).balance_minor, 4200)
+        ledger.debit(legacy, 200)
+        self.assertIn("replayed 1 transaction(s)", self._reconcile("--user", str(legacy.pk)))
+
+
+class WalletTransactionsTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        self.user = User.objects.create_user("student", password="pw")
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {Token.objects.create(user=self.user).key}")
+        for _ in range(5):
+            ledger.credit(self.user, 1000)
+        ledger.debit(self.user, 300)
+        ledger.credit(User.objects.create_user("other"), 50)
+        # spread the rows over the last six days, oldest first
+        today = timezone.make_aware(datetime(2025, 10, 20, 12))
+        for days_ago, tx in zip(range(5, -1, -1), WalletTx.objects.filter(user=self.user).order_by("id")):
+            WalletTx.objects.filter(pk=tx.pk).update(created_at=today - timedelta(days=days_ago))
+
+    def test_pages_newest_first(self):
+        res = self.client.get("/api/wallet/transactions/", {"page_size": 4})
+        page = res.json()
+        self.assertEqual([r["type"] for r in page["results"]], ["DEBIT", "TOPUP", "TOPUP", "TOPUP"])
+        self.assertEqual(page["results"][0]["balance_after"], 4700)
+        rest = self.client.get(page["next"]).json()
+        self.assertEqual(len(rest["results"]), 2)
+        self.assertIsNone(rest["next"])
+
+    def test_filters(self):
+        res = self.client.get("/api/wallet/transactions/", {"type": "TOPUP", "from": "2025-10-16", "to": "2025-10-18"})
+        self.assertEqual([r["balance_after"] for r in res.json()["results"]], [4000, 3000, 2000])
+        self.assertEqual(self.client.get("/api/wallet/transactions/", {"type": "GIFT"}).status_code, 400)
+        self.assertEqual(self.client.get("/api/wallet/transactions/", {"from": "18/10"}).status_code, 400)
+
+    def test_export_streams_csv_for_staff_only(self):
+        self.assertEqual(self.client.get("/api/wallet/admin/transactions/export/").status_code, 403)
+        self.user.is_staff = True
+        self.user.save()
+        token_cache.clear()
+        res = self.client.get("/api/wallet/admin/transactions/export/", {"type": "TOPUP"})
+        self.assertTrue(res.streaming)
+        self.assertEqual(res["Content-Type"], "text/csv")
+        rows = list(csv.reader(b"".join(res.streaming_content).decode().splitlines()))
+        self.assertEqual(rows[0][:4], ["id", "user_id", "username", "type"])
+        self.assertEqual([r[2] for r in rows[1:]], ["student"] * 5 + ["other"])
+
+    async def test_export_streams_asynchronously_under_asgi(self):
+        await User.objects.filter(pk=self.user.pk).aupdate(is_staff=True)
+        token = await Token.objects.aget(user=self.user)
+        with mock.patch("apps.wallet.views.EXPORT_CHUNK_SIZE", 4):
+            res = await self.async_client.get("/api/wallet/admin/transactions/export/",
+                                              headers={"Authorization": f"Token {token.key}"})
+            self.assertTrue(res.is_async)
+            chunks = [chunk async for chunk in res.streaming_content]
+        self.assertEqual(len(chunks), 3)   # header, then rows 4 at a time
+        rows = list(csv.reader(b"".join(chunks).decode().splitlines()))
+        self.assertEqual(len(rows), 1 + 7)
+
+
+class WalletConditionalGetTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("student", password="pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        ledger.credit(self.user, 1000)
+
+    def test_unchanged_balance_is_304_from_the_stamp(self):
+        res = self.client.get("/api/wallet/")
+        self.assertEqual(res.json(), {"balance_minor": 1000})
+        self.assertEqual(res["Cache-Control"], "private, no-cache")
+        self.assertIn("Last-Modified", res)
+        with self.assertNumQueries(1):
+            again = self.client.get("/api/wallet/", HTTP_IF_NONE_MATCH=res["ETag"])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again["ETag"], res["ETag"])
 
-# Create your tests here.
+    def test_balance_change_is_200(self):
+        etag = self.client.get("/api/wallet/")["ETag"]
+        ledger.debit(self.user, 300)
+        res = self.client.get("/api/wallet/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.json(), {"balance_minor": 700})
+        self.assertNotEqual(res["ETag"], etag)
@@ -1,8 +1,10 @@
 from django.urls import path
-from .views import WalletView, TopupView
+from .views import WalletView, TopupView, WalletTransactionsView, WalletTransactionsExportView
 
 urlpatterns = [
     # will add endpoints later
     path("", WalletView.as_view(), name="wallet"),
     path("topup/", TopupView.as_view(), name="wallet-topup"),
+    path("transactions/", WalletTransactionsView.as_view(), name="wallet-transactions"),
+    path("admin/transactions/export/", WalletTransactionsExportView.as_view(), name="admin-wallet-export"),
 ]
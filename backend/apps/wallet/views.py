@@ -1,10 +1,26 @@
-from django.db import transaction
-from rest_framework import permissions, status
+import csv
+from datetime import date, datetime, time, timedelta
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import generics, permissions, status
+from rest_framework.exceptions import ParseError
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from apps.core.conditional import conditional
+from apps.core.idempotency import idempotent
+from apps.core.pagination import KeysetPagination
+from apps.core.routers import ReplicaReadMixin, replica_configured
+from apps.orders.views import IsAdminUser, streaming_supported
+from config.database import REPLICA
+from . import ledger
+from .metrics import TOPUP_MINOR, TOPUPS
 from .models import Wallet, WalletTx
-from .serializers import WalletSerializer, TopupSerializer
+from .serializers import WalletSerializer, TopupSerializer, WalletTxSerializer
 
 
 def _get_or_create_wallet(user):
@@ -12,9 +28,17 @@ def _get_or_create_wallet(user):
     return wallet
 
 
+def _wallet_stamp(request):
+    # every balance change appends a WalletTx (see ledger), so the latest one versions the balance
+    latest = (WalletTx.objects.filter(user=request.user).order_by("-created_at", "-id")
+              .values_list("id", "created_at").first())
+    return latest or (None, None)
+
+
 class WalletView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
+    @conditional("wallet", _wallet_stamp)
     def get(self, request):
         wallet = _get_or_create_wallet(request.user)
         return Response(WalletSerializer(wallet).data)
@@ -27,16 +51,114 @@ class TopupView(APIView):
     """
     permission_classes = [permissions.IsAuthenticated]
 
+    @idempotent("wallet.topup")
     @transaction.atomic
     def post(self, request):
         s = TopupSerializer(data=request.data)
         s.is_valid(raise_exception=True)
         amount = s.validated_data["amount_minor"]
-        wallet = _get_or_create_wallet(request.user)
-
-        wallet.balance_minor += amount
-        wallet.save(update_fields=["balance_minor"])
-        WalletTx.objects.create(user=request.user, type=WalletTx.TOPUP, amount_minor=amount, ref="mock-topup")
+        tx = ledger.credit(request.user, amount, WalletTx.TOPUP, ref="mock-topup")
+        transaction.on_commit(lambda: (TOPUPS.inc(), TOPUP_MINOR.inc(amount)))
 
-        return Response({"ok": True, "message": "Wallet topped up", "data": WalletSerializer(wallet).data},
+        return Response({"ok": True, "message": "Wallet topped up", "data": {"balance_minor": tx.balance_after}},
                         status=status.HTTP_200_OK)
+
+
+def _start_of(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _filter_transactions(queryset, params):
+    """?type=TOPUP|DEBIT|REFUND&from=YYYY-MM-DD&to=YYYY-MM-DD (both days inclusive)."""
+    tx_type = params.get("type")
+    if tx_type:
+        if tx_type not in dict(WalletTx.TYPES):
+            raise ParseError(f"type must be one of {', '.join(dict(WalletTx.TYPES))}.")
+        queryset = queryset.filter(type=tx_type)
+    try:
+        since = date.fromisoformat(params["from"]) if params.get("from") else None
+        until = date.fromisoformat(params["to"]) if params.get("to") else None
+    except ValueError:
+        raise ParseError("from and to must be YYYY-MM-DD.")
+    # ranges on created_at itself (not created_at__date) so the index is used
+    if since:
+        queryset = queryset.filter(created_at__gte=_start_of(since))
+    if until:
+        queryset = queryset.filter(created_at__lt=_start_of(until + timedelta(days=1)))
+    return queryset
+
+
+class WalletTransactionsView(ReplicaReadMixin, generics.ListAPIView):
+    """
+    GET /api/wallet/transactions/?type=&from=&to=&cursor=
+    The user's ledger, newest first, keyset-paginated on the (user, created_at) index.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = WalletTxSerializer
+    pagination_class = KeysetPagination
+
+    def get_queryset(self):
+        return _filter_transactions(WalletTx.objects.filter(user=self.request.user), self.request.query_params)
+
+
+class _Echo:
+    """csv.writer target that hands each row back instead of buffering it."""
+    def write(self, value):
+        return value
+
+
+EXPORT_COLUMNS = ("id", "user_id", "user__username", "type", "amount_minor", "balance_after", "ref", "created_at")
+EXPORT_CHUNK_SIZE = 2000
+
+
+EXPORT_HEADER = ("id", "user_id", "username", "type", "amount_minor", "balance_after", "ref", "created_at")
+
+
+def _csv_chunks(rows, writer):
+    """CSV text per EXPORT_CHUNK_SIZE rows of the export."""
+    yield writer.writerow(EXPORT_HEADER)
+    chunk = list(islice(rows, EXPORT_CHUNK_SIZE))
+    while chunk:
+        yield "".join(writer.writerow([*row[:-1], row[-1].isoformat()]) for row in chunk)
+        chunk = list(islice(rows, EXPORT_CHUNK_SIZE))
+
+
+async def _acsv_chunks(rows, writer):
+    """_csv_chunks for ASGI: each chunk is fetched off the event loop. Handing
+    ASGI a sync iterator would make Django collect the whole export first."""
+    chunks = _csv_chunks(rows, writer)
+    fetch = sync_to_async(next)
+    while True:
+        chunk = await fetch(chunks, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+class WalletTransactionsExportView(APIView):
+    """
+    GET /api/wallet/admin/transactions/export/?type=&from=&to=&user=
+    Every matching transaction as CSV, oldest first. Rows are fetched
+    EXPORT_CHUNK_SIZE at a time and written as they arrive, so memory stays
+    flat and the first bytes go out immediately however long the export is.
+    The body is a sync iterator under WSGI and an async one under ASGI.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        queryset = _filter_transactions(WalletTx.objects.all(), request.query_params)
+        if request.query_params.get("user"):
+            try:
+                queryset = queryset.filter(user_id=int(request.query_params["user"]))
+            except ValueError:
+                raise ParseError("user must be an id.")
+        # the rows are read while streaming, after the view has returned
+        queryset = queryset.using(REPLICA if replica_configured() else DEFAULT_DB_ALIAS)
+        rows = queryset.order_by("id").values_list(*EXPORT_COLUMNS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+        writer = csv.writer(_Echo())
+        stream = _acsv_chunks(rows, writer) if streaming_supported(request) else _csv_chunks(rows, writer)
+
+        filename = f"wallet-transactions-{timezone.localdate().isoformat()}.csv"
+        return StreamingHttpResponse(stream, content_type="text/csv",
+                                     headers={"Content-Disposition": f'attachment; filename="{filename}"'})
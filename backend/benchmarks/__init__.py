@@ -0,0 +1,15 @@
+"""
+In-process benchmarks. Run from backend/, e.g.
+
+    python -m benchmarks.menu_snapshot
+
+Each script builds a throwaway test database, so no server, Redis or
+external service is needed and db.sqlite3 is never touched.
+
+The end-to-end load test is lunch_rush (dataset from seed); save runs with
+--out and diff them with compare:
+
+    python -m benchmarks.lunch_rush --scale small --out before.json
+    python -m benchmarks.lunch_rush --scale small --out after.json
+    python -m benchmarks.compare before.json after.json
+"""
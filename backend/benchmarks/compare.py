@@ -0,0 +1,76 @@
+"""
+Diff two saved benchmark runs (e.g. from benchmarks.lunch_rush --out).
+
+    python -m benchmarks.compare base.json new.json [--threshold 10]
+
+For every endpoint present in both runs, flags p95/mean latency growth above
+--threshold percent and any increase in queries per request. Exits 1 when
+something regressed, so it can gate CI.
+"""
+import argparse
+import json
+import sys
+
+LATENCY_KEYS = ("p95_ms", "mean_ms")
+
+
+def _pct(base, new):
+    if not base:
+        return 0.0
+    return (new - base) / base * 100
+
+
+def compare(base, new, threshold):
+    rows, regressions = [], []
+    sections = {"overall": (base.get("overall"), new.get("overall"))}
+    for label in sorted(set(base.get("endpoints", {})) & set(new.get("endpoints", {}))):
+        sections[label] = (base["endpoints"][label], new["endpoints"][label])
+
+    for label, (b, n) in sections.items():
+        if not b or not n:
+            continue
+        row = {"endpoint": label}
+        for key in LATENCY_KEYS:
+            change = _pct(b[key], n[key])
+            row[key] = f"{b[key]:.2f} -> {n[key]:.2f} ({change:+.1f}%)"
+            if change > threshold:
+                regressions.append(f"{label}: {key} {change:+.1f}%")
+        bq, nq = b.get("queries_per_request"), n.get("queries_per_request")
+        if bq is not None and nq is not None:
+            row["queries"] = f"{bq} -> {nq}"
+            if nq > bq:
+                regressions.append(f"{label}: queries per request {bq} -> {nq}")
+        rows.append(row)
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10.0, help="allowed latency growth in percent")
+    args = parser.parse_args()
+
+    with open(args.base) as fh:
+        base = json.load(fh)
+    with open(args.new) as fh:
+        new = json.load(fh)
+
+    for key in ("benchmark", "scale", "sessions", "concurrency"):
+        b, n = base.get("meta", {}).get(key), new.get("meta", {}).get(key)
+        if b != n:
+            print(f"warning: runs differ in {key} ({b} vs {n}); numbers are not comparable")
+    rows, regressions = compare(base, new, args.threshold)
+    width = max(len(r["endpoint"]) for r in rows) if rows else 10
+    for r in rows:
+        print(f"{r['endpoint']:<{width}}  " + "  ".join(f"{k}={r[k]}" for k in (*LATENCY_KEYS, "queries") if k in r))
+    if regressions:
+        print("\nregressions:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print("\nno regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Shared helpers for the benchmark scripts."""
+import json
+import os
+import statistics
+import time
+from contextlib import contextmanager
+
+
+def setup_django():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    import django
+    django.setup()
+
+
+@contextmanager
+def test_database():
+    """Create (and afterwards destroy) a fresh test database."""
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    setup_test_environment()
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield
+    finally:
+        from apps.orders import quota
+        quota.reset()   # queued quota writes belong to the database about to go away
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[idx]
+
+
+def summarize(samples, queries=None, elapsed=None):
+    """Latency samples are in seconds; the summary is in milliseconds."""
+    out = {
+        "requests": len(samples),
+        "mean_ms": round(statistics.fmean(samples) * 1000, 3) if samples else 0.0,
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+    }
+    if elapsed:
+        out["throughput_rps"] = round(len(samples) / elapsed, 1)
+    if queries is not None:
+        out["queries_per_request"] = round(statistics.fmean(queries), 2) if queries else 0.0
+    return out
+
+
+def measure(fn, n):
+    """Call fn() n times; return (latencies, query counts, elapsed)."""
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    latencies, queries = [], []
+    started = time.perf_counter()
+    for _ in range(n):
+        with CaptureQueriesContext(connection) as ctx:
+            t0 = time.perf_counter()
+            fn()
+            latencies.append(time.perf_counter() - t0)
+        queries.append(len(ctx.captured_queries))
+    return latencies, queries, time.perf_counter() - started
+
+
+def print_report(title, results):
+    print(title)
+    print(json.dumps(results, indent=2))
@@ -0,0 +1,191 @@
+"""
+Scripted lunch-rush load test against a seeded database, all in-process.
+
+    python -m benchmarks.lunch_rush [--scale small] [--sessions 300] [--concurrency 4] [--out run.json]
+
+Each session is one student: browse the menu, add 1-3 items, sometimes
+change a quantity, view the cart, check out for a lunch slot, then read the
+wallet and order history. Every --dashboard-every sessions the staff user
+refreshes the admin dashboard and kitchen queue.
+
+Requests go through Django's test client (full middleware, URL routing,
+token auth and DRF rendering, no sockets). Results are per endpoint:
+latency percentiles, queries per request and status codes, plus overall
+throughput. Use --out to save them and benchmarks.compare to diff two runs.
+"""
+import argparse
+import json
+import logging
+import platform
+import random
+import subprocess
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from .harness import print_report, setup_django, summarize, test_database
+
+
+class Recorder:
+    """Per-endpoint latency, query count and status code samples (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.queries = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+
+    def call(self, label, fn):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            response = fn()
+            elapsed = time.perf_counter() - started
+        with self._lock:
+            self.latencies[label].append(elapsed)
+            self.queries[label].append(len(ctx.captured_queries))
+            self.statuses[label][response.status_code] += 1
+        return response
+
+    def report(self, elapsed):
+        endpoints = {}
+        for label in sorted(self.latencies):
+            endpoints[label] = {
+                **summarize(self.latencies[label], self.queries[label]),
+                "status": {str(code): n for code, n in sorted(self.statuses[label].items())},
+            }
+        every = [s for samples in self.latencies.values() for s in samples]
+        queries = [q for samples in self.queries.values() for q in samples]
+        return {"overall": summarize(every, queries, elapsed), "endpoints": endpoints}
+
+
+def pickup_times(day):
+    """Naive ISO strings for every 5 minutes from 11:30 to 14:55 on `day`."""
+    start = datetime.combine(day, datetime.min.time()).replace(hour=11, minute=30)
+    return [(start + timedelta(minutes=5 * i)).isoformat() for i in range(42)]
+
+
+def student_session(rec, client, rng, item_ids, pickups):
+    rec.call("GET catalog/categories", lambda: client.get("/api/catalog/categories/"))
+    for item_id in rng.sample(item_ids, rng.randint(1, 3)):
+        res = rec.call("POST orders/cart/items", lambda: client.post(
+            "/api/orders/cart/items/", {"item_id": item_id, "qty": rng.randint(1, 2)}, format="json"))
+    if rng.random() < 0.3 and res.status_code == 201:
+        line_id = res.json()["id"]
+        rec.call("PATCH orders/cart/items/<pk>", lambda: client.patch(
+            f"/api/orders/cart/items/{line_id}/", {"qty": rng.randint(1, 4)}, format="json"))
+    rec.call("GET orders/cart", lambda: client.get("/api/orders/cart/"))
+    pickup = rng.choice(pickups)
+    rec.call("POST orders/checkout", lambda: client.post(
+        "/api/orders/checkout/", {"pickup_time": pickup}, format="json"))
+    rec.call("GET wallet", lambda: client.get("/api/wallet/"))
+    rec.call("GET orders/orders", lambda: client.get("/api/orders/orders/"))
+
+
+def staff_refresh(rec, client):
+    rec.call("GET orders/admin/dashboard", lambda: client.get("/api/orders/admin/dashboard/"))
+    rec.call("GET orders/admin/kitchen", lambda: client.get("/api/orders/admin/kitchen/?minutes=60"))
+
+
+def run(sessions, concurrency, dashboard_every, seed):
+    from django.db import connection
+    from django.utils import timezone
+    from rest_framework.authtoken.models import Token
+    from rest_framework.test import APIClient
+
+    from apps.catalog.models import Item
+    from apps.orders.checkout import service_day_for
+
+    tokens = dict(Token.objects.filter(user__is_staff=False).values_list("user__username", "key"))
+    staff_key = Token.objects.get(user__username="staff").key
+    item_ids = list(Item.objects.filter(is_active=True).values_list("id", flat=True))
+    pickups = pickup_times(service_day_for(timezone.now()))
+    usernames = sorted(tokens)
+    rec = Recorder()
+
+    # the whole script is fixed up front, so runs with the same seed issue the same requests
+    plan_rng = random.Random(seed)
+    plan = [(plan_rng.choice(usernames), plan_rng.getrandbits(32)) for _ in range(sessions)]
+
+    def worker(shard):
+        # a failing request is recorded as a 500, not raised into the driver
+        client = APIClient(raise_request_exception=False)
+        staff = APIClient(raise_request_exception=False)
+        staff.credentials(HTTP_AUTHORIZATION=f"Token {staff_key}")
+        try:
+            for n, (username, session_seed) in shard:
+                client.credentials(HTTP_AUTHORIZATION=f"Token {tokens[username]}")
+                student_session(rec, client, random.Random(session_seed), item_ids, pickups)
+                if dashboard_every and n % dashboard_every == 0:
+                    staff_refresh(rec, staff)
+        finally:
+            connection.close()
+
+    shards = [list(enumerate(plan))[i::concurrency] for i in range(concurrency)]
+    started = time.perf_counter()
+    if concurrency == 1:
+        worker(shards[0])
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(worker, shards))
+    return rec.report(time.perf_counter() - started)
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    from .seed import SCALES, seed
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--sessions", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--dashboard-every", type=int, default=20)
+    parser.add_argument("--out", help="write results as JSON to this path")
+    args = parser.parse_args()
+
+    setup_django()
+    import django
+    from django.core.cache import cache
+
+    # 4xx/5xx are counted per endpoint in the report instead of logged
+    logging.getLogger("django.request").setLevel(logging.CRITICAL)
+
+    with test_database():
+        seed(args.scale, args.seed)
+        cache.clear()
+        results = run(args.sessions, args.concurrency, args.dashboard_every, args.seed)
+
+    results = {
+        "meta": {
+            "benchmark": "lunch_rush",
+            "scale": args.scale,
+            "seed": args.seed,
+            "sessions": args.sessions,
+            "concurrency": args.concurrency,
+            "git": _git_revision(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+        },
+        **results,
+    }
+    if args.out:
+        with open(args.out, "w") as fh:
+            json.dump(results, fh, indent=2)
+    print_report("lunch rush", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Menu search index on a large generated catalog.
+
+    python -m benchmarks.menu_search [--categories 50] [--items 100] [-n 2000]
+
+Times a full index build, an incremental sync after one item changes, and
+queries (exact words, prefixes, typos and two-word queries) against the
+index directly and through GET /api/catalog/search/. "icontains" is the
+LIKE scan the endpoint replaces, for comparison.
+"""
+import argparse
+import random
+import time
+
+from .harness import measure, print_report, setup_django, summarize, test_database
+from .seed import DISH_WORDS, ITEM_WORDS
+
+QUERIES = ["chicken", "wra", "chiken", "falafle bowl", "pan", "mushroom soup", "sandwhich", "beef cur"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--categories", type=int, default=50)
+    parser.add_argument("--items", type=int, default=100, help="items per category")
+    parser.add_argument("-n", type=int, default=2000, help="queries per mode")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.core.cache import cache
+    from django.db.models import Q
+    from rest_framework.test import APIClient
+
+    from apps.catalog.cache import get_menu_snapshot
+    from apps.catalog.models import Category, Item
+    from apps.catalog.search import BACKENDS, search_menu
+
+    rng = random.Random(7)
+    with test_database():
+        user = get_user_model().objects.create_user("bench", password="bench-pw")
+        for c in range(args.categories):
+            cat = Category.objects.create(name=f"Outlet {c}", sort_order=c)
+            Item.objects.bulk_create([
+                Item(category=cat, name=f"{rng.choice(ITEM_WORDS)} {rng.choice(DISH_WORDS)} {c}-{i}",
+                     description=" ".join(rng.choices(ITEM_WORDS + DISH_WORDS, k=8)), price_minor=100 * (i + 1))
+                for i in range(args.items)
+            ])
+        cache.clear()
+        snapshot = get_menu_snapshot()
+
+        results = {"items": args.categories * args.items}
+        for name, backend in BACKENDS.items():
+            index = backend()
+            started = time.perf_counter()
+            index.sync(snapshot)
+            results[f"{name}_build_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+            changed = snapshot._replace(version=snapshot.version + 1, data=[
+                {**snapshot.data[0], "items": [{**snapshot.data[0]["items"][0], "name": "Seasonal Special"},
+                                               *snapshot.data[0]["items"][1:]]},
+                *snapshot.data[1:],
+            ])
+            started = time.perf_counter()
+            index.sync(changed)
+            results[f"{name}_sync_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+            queries = iter(QUERIES * args.n)
+            results[name] = summarize(*measure(lambda: index.search(next(queries), 20), args.n))
+
+        client = APIClient()
+        client.force_authenticate(user)
+        search_menu("warm up")
+        queries = iter(QUERIES * args.n)
+        results["endpoint"] = summarize(*measure(lambda: client.get("/api/catalog/search/", {"q": next(queries)}),
+                                                 args.n))
+
+        def icontains():
+            q = Q()
+            for word in next(queries).split():
+                q &= Q(name__icontains=word) | Q(description__icontains=word)
+            list(Item.objects.filter(q, is_active=True)[:20])
+
+        queries = iter(QUERIES * args.n)
+        results["icontains"] = summarize(*measure(icontains, min(args.n, 500)))
+
+    print_report("menu search", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+GET /api/catalog/categories/ before and after the versioned menu snapshot.
+
+    python -m benchmarks.menu_snapshot [--categories 12] [--items 20] [-n 500]
+
+"uncached" replays the original view (Category query + one items query per
+category), "snapshot" is the current view, "revalidate" sends the ETag back.
+"""
+import argparse
+
+from .harness import measure, print_report, setup_django, summarize, test_database
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--categories", type=int, default=12)
+    parser.add_argument("--items", type=int, default=20, help="items per category")
+    parser.add_argument("-n", type=int, default=500, help="requests per mode")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.core.cache import cache
+    from rest_framework import generics
+    from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+
+    from apps.catalog.models import Category, Item
+    from apps.catalog.serializers import CategorySerializer
+
+    class UncachedCategoryListView(generics.ListAPIView):
+        queryset = Category.objects.filter(is_active=True).order_by("sort_order", "name")
+        serializer_class = CategorySerializer
+
+    with test_database():
+        user = get_user_model().objects.create_user("bench", password="bench-pw")
+        for c in range(args.categories):
+            cat = Category.objects.create(name=f"Category {c}", sort_order=c)
+            Item.objects.bulk_create([
+                Item(category=cat, name=f"Item {c}-{i}", description="x" * 80, price_minor=100 * (i + 1))
+                for i in range(args.items)
+            ])
+        cache.clear()
+
+        factory = APIRequestFactory()
+        uncached_view = UncachedCategoryListView.as_view()
+
+        def uncached():
+            request = factory.get("/api/catalog/categories/")
+            force_authenticate(request, user=user)
+            uncached_view(request).render()
+
+        client = APIClient()
+        client.force_authenticate(user)
+        etag = client.get("/api/catalog/categories/")["ETag"]
+
+        results = {}
+        for name, fn in [
+            ("uncached", uncached),
+            ("snapshot", lambda: client.get("/api/catalog/categories/")),
+            ("revalidate", lambda: client.get("/api/catalog/categories/", HTTP_IF_NONE_MATCH=etag)),
+        ]:
+            results[name] = summarize(*measure(fn, args.n))
+
+    print_report("menu snapshot", results)
+
+
+if __name__ == "__main__":
+    main()
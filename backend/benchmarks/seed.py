@@ -0,0 +1,172 @@
+"""
+Deterministic dataset for the load tests.
+
+    python -m benchmarks.seed --scale small      # prints row counts; test DB is thrown away
+
+seed(scale, seed) fills the current database: users with tokens and wallets,
+a full catalog, and `days` of order history (orders, order items, wallet
+top-ups and debits) ending yesterday, plus the sales rollup. The same scale
+and seed always give the same rows; only the dates move with today.
+"""
+import argparse
+import random
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from time import perf_counter
+
+SCALES = {
+    #          users, categories, items/category, days, orders/day
+    "tiny":   (50, 4, 6, 14, 20),
+    "small":  (500, 8, 12, 90, 80),
+    "medium": (2000, 12, 20, 365, 300),
+    "large":  (5000, 16, 25, 365, 1200),
+}
+
+PASSWORD = "bench-pw"
+ITEM_WORDS = ["Chicken", "Falafel", "Halloumi", "Tuna", "Veggie", "Beef", "Egg", "Paneer", "Turkey", "Mushroom"]
+DISH_WORDS = ["Wrap", "Bowl", "Sandwich", "Salad", "Burger", "Pasta", "Soup", "Toastie", "Rice", "Curry"]
+
+
+@contextmanager
+def explicit_timestamps(*fields):
+    """Let bulk_create keep the created_at values we set (auto_now_add would overwrite them)."""
+    saved = [(f, f.auto_now_add) for f in fields]
+    for f, _ in saved:
+        f.auto_now_add = False
+    try:
+        yield
+    finally:
+        for f, flag in saved:
+            f.auto_now_add = flag
+
+
+def seed(scale="small", seed=42, batch_size=2000):
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.hashers import make_password
+    from django.db import transaction
+    from django.utils import timezone
+    from rest_framework.authtoken.models import Token
+
+    from apps.catalog.models import Category, Item
+    from apps.orders.checkout import service_day_for
+    from apps.orders.models import Order, OrderItem
+    from apps.orders.rollup import rebuild_rollup
+    from apps.wallet.models import Wallet, WalletTx
+
+    n_users, n_categories, n_items, days, orders_per_day = SCALES[scale]
+    rng = random.Random(seed)
+    User = get_user_model()
+    tz = timezone.get_current_timezone()
+    today = service_day_for(timezone.now())
+
+    with transaction.atomic():
+        password = make_password(PASSWORD)
+        # accounts predate the history (MyOrdersView skips the archive for newer ones)
+        joined = timezone.make_aware(datetime.combine(today - timedelta(days=days + 1), time(7)), tz)
+        users = User.objects.bulk_create(
+            [User(username=f"student{i:05d}", password=password, date_joined=joined) for i in range(n_users)]
+            + [User(username="staff", password=password, is_staff=True, date_joined=joined)],
+            batch_size=batch_size,
+        )
+        students, staff = users[:-1], users[-1]
+        Token.objects.bulk_create(
+            [Token(key=f"{rng.getrandbits(160):040x}", user=u) for u in users], batch_size=batch_size
+        )
+        wallets = Wallet.objects.bulk_create(
+            [Wallet(user=u, balance_minor=rng.randrange(50_000, 500_000, 100)) for u in students],
+            batch_size=batch_size,
+        )
+        # the ledger opens with one top-up per student and must add up to the
+        # final balances (manage.py reconcile_wallets checks it)
+        balances = {w.user_id: w.balance_minor for w in wallets}
+
+        categories = Category.objects.bulk_create(
+            [Category(name=f"Category {c}", sort_order=c) for c in range(n_categories)]
+        )
+        items = Item.objects.bulk_create([
+            Item(category=cat, name=f"{rng.choice(ITEM_WORDS)} {rng.choice(DISH_WORDS)} {c}-{i}",
+                 description="Freshly made. " * rng.randint(1, 6), price_minor=rng.randrange(500, 4500, 50))
+            for c, cat in enumerate(categories) for i in range(n_items)
+        ], batch_size=batch_size)
+
+        order_fields = [Order._meta.get_field("created_at"), WalletTx._meta.get_field("created_at")]
+        with explicit_timestamps(*order_fields):
+            opened = timezone.make_aware(datetime.combine(today - timedelta(days=days + 1), time(8)), tz)
+            WalletTx.objects.bulk_create([
+                WalletTx(user_id=uid, type=WalletTx.TOPUP, amount_minor=b, balance_after=b, ref="seed", created_at=opened)
+                for uid, b in balances.items()
+            ], batch_size=batch_size)
+            for d in range(days, 0, -1):
+                _seed_day(rng, today - timedelta(days=d), tz, students, items, orders_per_day, balances, batch_size)
+        for w in wallets:
+            w.balance_minor = balances[w.user_id]
+        Wallet.objects.bulk_update(wallets, ["balance_minor"], batch_size=batch_size)
+
+        rebuild_rollup()
+
+    return {
+        "users": len(students),
+        "staff": staff.username,
+        "items": len(items),
+        "orders": Order.objects.count(),
+        "order_items": OrderItem.objects.count(),
+        "wallet_txs": WalletTx.objects.count(),
+    }
+
+
+def _seed_day(rng, day, tz, students, items, orders_per_day, balances, batch_size):
+    from django.utils import timezone
+
+    from apps.orders.models import Order, OrderItem
+    from apps.wallet.models import WalletTx
+
+    n = max(1, int(rng.gauss(orders_per_day, orders_per_day * 0.15)))
+    orders, lines, txs = [], [], []
+    for _ in range(n):
+        user = rng.choice(students)
+        # most orders land in the 11:30-14:00 lunch window
+        minute = int(rng.triangular(8 * 60, 19 * 60, 12 * 60 + 45))
+        pickup = timezone.make_aware(datetime.combine(day, time(minute // 60, minute % 60)), tz)
+        created = pickup - timedelta(minutes=rng.randint(10, 90))
+        picked = [(rng.choice(items), rng.randint(1, 3)) for _ in range(rng.randint(1, 4))]
+        total = sum(item.price_minor * qty for item, qty in picked)
+        status = rng.choices([Order.COMPLETED, Order.CANCELLED], weights=[97, 3])[0]
+        orders.append(Order(user=user, status=status, total_minor=total, paid_minor=total, pickup_time=pickup,
+                            service_day=day, created_at=created))
+        lines.append(picked)
+        while rng.random() < 0.08 or balances[user.pk] < total:
+            topup = rng.choice([5000, 10000, 20000])
+            balances[user.pk] += topup
+            txs.append(WalletTx(user=user, type=WalletTx.TOPUP, amount_minor=topup,
+                                balance_after=balances[user.pk], ref="seed", created_at=created - timedelta(minutes=1)))
+        balances[user.pk] -= total
+        txs.append(WalletTx(user=user, type=WalletTx.DEBIT, amount_minor=total, balance_after=balances[user.pk],
+                            ref="checkout", created_at=created))
+
+    orders = Order.objects.bulk_create(orders, batch_size=batch_size)
+    OrderItem.objects.bulk_create([
+        OrderItem(order=order, item=item, item_name=item.name, unit_price_minor=item.price_minor, qty=qty,
+                  line_total_minor=item.price_minor * qty)
+        for order, picked in zip(orders, lines) for item, qty in picked
+    ], batch_size=batch_size)
+    WalletTx.objects.bulk_create(txs, batch_size=batch_size)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    from .harness import print_report, setup_django, test_database
+
+    setup_django()
+    with test_database():
+        started = perf_counter()
+        counts = seed(args.scale, args.seed)
+        counts["seconds"] = round(perf_counter() - started, 2)
+    print_report(f"seed ({args.scale}, seed={args.seed})", counts)
+
+
+if __name__ == "__main__":
+    main()
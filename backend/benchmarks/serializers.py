@@ -0,0 +1,100 @@
+"""
+DRF serializers + JSONRenderer against the values()-based serializers and
+FastJSONRenderer, for a menu and an order history.
+
+    python -m benchmarks.serializers [--items 200] [--orders 100] [-n 300]
+
+Each mode goes from the database to response bytes; throughput_rps is
+serializations per second. "drf" is ModelSerializer over prefetched model
+instances rendered by JSONRenderer, "values" swaps in menu_data/orders_data,
+"values_orjson" also renders with FastJSONRenderer (the same as "values"
+when orjson isn't installed). The render_* modes time only the rendering of
+already built data. Every mode is checked to produce the same bytes.
+"""
+import argparse
+
+from .harness import measure, print_report, setup_django, summarize, test_database
+from .seed import DISH_WORDS, ITEM_WORDS
+
+LINES_PER_ORDER = 3
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=200, help="menu items (20 per category)")
+    parser.add_argument("--orders", type=int, default=100, help="orders in the history")
+    parser.add_argument("-n", type=int, default=300, help="serializations per mode")
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+    from django.utils import timezone
+    from rest_framework.renderers import JSONRenderer
+
+    from apps.catalog.models import Category, Item
+    from apps.catalog.serializers import CategorySerializer, menu_data
+    from apps.core.renderers import FastJSONRenderer, orjson
+    from apps.orders.models import Order, OrderItem
+    from apps.orders.serializers import ORDER_FIELDS, OrderSerializer, orders_data
+
+    json_renderer, fast_renderer = JSONRenderer(), FastJSONRenderer()
+
+    with test_database():
+        user = get_user_model().objects.create_user("bench", password="bench-pw")
+        items = []
+        for c in range(max(1, args.items // 20)):
+            category = Category.objects.create(name=f"Outlet {c}", sort_order=c)
+            items += Item.objects.bulk_create([
+                Item(category=category,
+                     name=f"{ITEM_WORDS[i % len(ITEM_WORDS)]} {DISH_WORDS[c % len(DISH_WORDS)]} {i}",
+                     description="Freshly made every morning, served with a side of your choice.",
+                     price_minor=500 + 25 * i, image_url=f"https://cdn.example.com/menu/{c}/{i}.jpg")
+                for i in range(20)
+            ])
+        now = timezone.now()
+        orders = Order.objects.bulk_create([
+            Order(user=user, status=Order.COMPLETED, total_minor=1500, paid_minor=1500, pickup_time=now,
+                  service_day=now.date()) for _ in range(args.orders)
+        ])
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, item=item, item_name=item.name, unit_price_minor=item.price_minor, qty=1,
+                      line_total_minor=item.price_minor)
+            for n, order in enumerate(orders)
+            for item in items[n % len(items):][:LINES_PER_ORDER]
+        ])
+
+        categories = Category.objects.filter(is_active=True).order_by("sort_order", "name")
+        history = Order.objects.filter(user=user).order_by("-created_at", "-id")
+
+        cases = {
+            "menu": {
+                "drf": lambda: json_renderer.render(CategorySerializer(categories.prefetch_related("items"),
+                                                                       many=True).data),
+                "values": lambda: json_renderer.render(menu_data()),
+                "values_orjson": lambda: fast_renderer.render(menu_data()),
+            },
+            "orders": {
+                "drf": lambda: json_renderer.render(OrderSerializer(history.prefetch_related("items"),
+                                                                    many=True).data),
+                "values": lambda: json_renderer.render(orders_data(list(history.values(*ORDER_FIELDS)))),
+                "values_orjson": lambda: fast_renderer.render(orders_data(list(history.values(*ORDER_FIELDS)))),
+            },
+        }
+
+        results = {"menu_items": len(items), "history_orders": len(orders), "orjson": orjson is not None}
+        for case, modes in cases.items():
+            outputs = {name: fn() for name, fn in modes.items()}
+            assert len(set(outputs.values())) == 1, f"{case}: modes disagree"
+            data = orjson.loads(outputs["drf"]) if orjson else None
+            results[case] = {"bytes": len(outputs["drf"])}
+            for name, fn in modes.items():
+                results[case][name] = summarize(*measure(fn, args.n))
+            if data is not None:
+                results[case]["render_json"] = summarize(*measure(lambda: json_renderer.render(data), args.n))
+                results[case]["render_orjson"] = summarize(*measure(lambda: fast_renderer.render(data), args.n))
+
+    print_report("serializers", results)
+
+
+if __name__ == "__main__":
+    main()
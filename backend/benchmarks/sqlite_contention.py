@@ -0,0 +1,136 @@
+"""
+Concurrent checkout stress test across SQLite profiles.
+
+    python -m benchmarks.sqlite_contention [--writers 16] [--orders 25] [--readers 4]
+
+Profiles:
+  rollback      the old settings: rollback journal, deferred transactions
+  wal-deferred  WAL pragmas but deferred transactions
+  wal           settings.DATABASES as shipped: WAL, synchronous=NORMAL, IMMEDIATE
+  wal+queue     the same plus SQLITE_WRITE_QUEUE (one writer thread)
+
+Each writer thread is a student who repeatedly adds a cart line (the
+statements of CartItemsView.post) and checks out; reader threads keep
+listing orders at the same time. The report counts "database is locked"
+failures and gives checkout throughput and p95 latency for checkouts and
+reads.
+"""
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .harness import percentile, print_report, setup_django, test_database
+
+
+def run_profile(options, write_queue, args):
+    from django.contrib.auth import get_user_model
+    from django.db import OperationalError, connection
+    from django.test import override_settings
+    from django.utils import timezone
+
+    from apps.catalog.models import Category, Item
+    from apps.core import writes
+    from apps.orders.checkout import checkout
+    from apps.orders.models import Cart, CartItem, Order
+    from apps.wallet.models import Wallet
+
+    saved_options = connection.settings_dict["OPTIONS"]
+    connection.settings_dict["OPTIONS"] = options
+    connection.close()
+    try:
+        with test_database(), override_settings(SQLITE_WRITE_QUEUE=write_queue, PICKUP_SLOT_CAPACITY=10**6):
+            User = get_user_model()
+            item = Item.objects.create(category=Category.objects.create(name="Food"), name="Wrap", price_minor=100)
+            # staff accounts skip the daily quota, so every attempt is a full checkout
+            users = User.objects.bulk_create([User(username=f"w{i}", is_staff=True) for i in range(args.writers)])
+            Wallet.objects.bulk_create([Wallet(user=u, balance_minor=10**8) for u in users])
+            carts = {u.pk: Cart.objects.create(user=u) for u in users}
+            pickup = timezone.make_aware(timezone.datetime(2025, 10, 25, 12, 30))
+            journal = connection.cursor().execute("PRAGMA journal_mode").fetchone()[0]
+
+            stop = threading.Event()
+            lock_errors = []
+            checkout_latency, read_latency = [], []
+
+            def add_line(user):
+                # same statements as CartItemsView.post: reads first, then writes
+                cart, _ = Cart.objects.get_or_create(user=user)
+                line, created = CartItem.objects.select_for_update().get_or_create(
+                    cart=cart, item=item, defaults={"qty": 1})
+                if not created:
+                    line.qty += 1
+                    line.save(update_fields=["qty"])
+
+            def writer(user):
+                try:
+                    for _ in range(args.orders):
+                        started = time.perf_counter()
+                        try:
+                            writes.run_write(add_line, user)
+                            checkout(user, pickup)
+                        except OperationalError as exc:
+                            lock_errors.append(str(exc))
+                            CartItem.objects.filter(cart=carts[user.pk]).delete()
+                            continue
+                        checkout_latency.append(time.perf_counter() - started)
+                finally:
+                    connection.close()
+
+            def reader(user):
+                try:
+                    while not stop.is_set():
+                        started = time.perf_counter()
+                        list(Order.objects.filter(user=user).order_by("-created_at")[:20])
+                        read_latency.append(time.perf_counter() - started)
+                        time.sleep(0.002)
+                finally:
+                    connection.close()
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.writers + args.readers) as pool:
+                readers = [pool.submit(reader, users[i % len(users)]) for i in range(args.readers)]
+                list(pool.map(writer, users))
+                elapsed = time.perf_counter() - started
+                stop.set()
+                for f in readers:
+                    f.result()
+            writes.write_queue.stop()
+
+            return {
+                "journal_mode": journal,
+                "checkouts": len(checkout_latency),
+                "lock_errors": len(lock_errors),
+                "checkouts_per_s": round(len(checkout_latency) / elapsed, 1),
+                "checkout_p95_ms": round(percentile(checkout_latency, 95) * 1000, 2),
+                "read_p95_ms": round(percentile(read_latency, 95) * 1000, 2),
+                "reads": len(read_latency),
+            }
+    finally:
+        connection.settings_dict["OPTIONS"] = saved_options
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--writers", type=int, default=16)
+    parser.add_argument("--orders", type=int, default=25, help="checkouts per writer")
+    parser.add_argument("--readers", type=int, default=4)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+
+    shipped = settings.DATABASES["default"]["OPTIONS"]
+    rollback = {"timeout": shipped.get("timeout", 20), "init_command": "PRAGMA journal_mode=DELETE"}
+    results = {
+        "rollback": run_profile(rollback, False, args),
+        "wal-deferred": run_profile({k: v for k, v in shipped.items() if k != "transaction_mode"}, False, args),
+        "wal": run_profile(dict(shipped), False, args),
+        "wal+queue": run_profile(dict(shipped), True, args),
+    }
+    print_report(f"{args.writers} writers x {args.orders} checkouts, {args.readers} readers", results)
+
+
+if __name__ == "__main__":
+    main()
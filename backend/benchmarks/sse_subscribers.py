@@ -0,0 +1,68 @@
+"""
+How many idle SSE subscribers one worker process holds.
+
+    python -m benchmarks.sse_subscribers [--subscribers 10000] [--budget-mb 256]
+
+Opens N subscriptions on one event loop, each parked in the same
+queue.get() wait as the /api/orders/events/ stream, then reports memory per
+idle subscriber and the time to fan one event out to all of them.
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from .harness import print_report, setup_django
+
+
+async def run(n_subscribers, budget_mb):
+    from apps.orders.events import InProcessBackend, Subscription
+
+    backend = InProcessBackend()
+    received = 0
+    all_received = asyncio.Event()
+
+    async def subscriber(sub):
+        nonlocal received
+        with sub:
+            await sub.queue.get()
+            received += 1
+            if received == n_subscribers:
+                all_received.set()
+
+    tracemalloc.start()
+    baseline = tracemalloc.take_snapshot()
+    tasks = [asyncio.create_task(subscriber(Subscription(backend, user_id=i))) for i in range(n_subscribers)]
+    await asyncio.sleep(0.1)  # let every task park on its queue
+    used = sum(s.size_diff for s in tracemalloc.take_snapshot().compare_to(baseline, "filename"))
+    tracemalloc.stop()
+
+    # wake everybody: publish one event per user from a worker thread, like a sync view would
+    started = time.perf_counter()
+    await asyncio.to_thread(lambda: [backend.publish(i, "order.updated", {"order_id": i})
+                                     for i in range(n_subscribers)])
+    await all_received.wait()
+    fan_out = time.perf_counter() - started
+    await asyncio.gather(*tasks)
+
+    per_sub = used / n_subscribers
+    return {
+        "subscribers": n_subscribers,
+        "bytes_per_idle_subscriber": round(per_sub),
+        "idle_subscribers_per_budget": int(budget_mb * 1024 * 1024 / per_sub),
+        "budget_mb": budget_mb,
+        "deliver_one_event_to_each_ms": round(fan_out * 1000, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--subscribers", type=int, default=10000)
+    parser.add_argument("--budget-mb", type=int, default=256)
+    args = parser.parse_args()
+    setup_django()
+    print_report("idle SSE subscribers per worker", asyncio.run(run(args.subscribers, args.budget_mb)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+GET /api/orders/cart/ with DRF's TokenAuthentication vs CachedTokenAuthentication.
+
+    python -m benchmarks.token_auth [--users 200] [-n 2000]
+
+Requests rotate over --users tokens so the cached run measures LRU hits for
+a realistic working set, not one hot entry.
+"""
+import argparse
+
+from .harness import measure, print_report, setup_django, summarize, test_database
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("-n", type=int, default=2000, help="requests per mode")
+    args = parser.parse_args()
+
+    setup_django()
+    from itertools import cycle
+
+    from django.contrib.auth import get_user_model
+    from django.contrib.auth.hashers import make_password
+    from rest_framework.authentication import TokenAuthentication
+    from rest_framework.authtoken.models import Token
+    from rest_framework.test import APIClient
+
+    from apps.accounts.authentication import CachedTokenAuthentication, token_cache
+    from apps.orders.views import CartView
+
+    User = get_user_model()
+    with test_database():
+        password = make_password("bench-pw")
+        users = User.objects.bulk_create([User(username=f"bench{i}", password=password) for i in range(args.users)])
+        keys = [Token.objects.create(user=u).key for u in users]
+        client = APIClient()
+
+        results = {}
+        for name, auth_class in [
+            ("drf_token", TokenAuthentication),
+            ("cached_token", CachedTokenAuthentication),
+        ]:
+            # authentication_classes is read from settings at import time, so swap it on the view
+            CartView.authentication_classes = [auth_class]
+            token_cache.clear()
+            headers = cycle([f"Token {k}" for k in keys])
+            for _ in range(args.users):   # warm-up: carts exist, cache is filled
+                client.get("/api/orders/cart/", HTTP_AUTHORIZATION=next(headers))
+            results[name] = summarize(*measure(
+                lambda: client.get("/api/orders/cart/", HTTP_AUTHORIZATION=next(headers)), args.n))
+
+    print_report("token auth on GET /api/orders/cart/", results)
+
+
+if __name__ == "__main__":
+    main()
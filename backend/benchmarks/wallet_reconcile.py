@@ -0,0 +1,70 @@
+"""
+Wallet ledger audit on a seeded history.
+
+    python -m benchmarks.wallet_reconcile [--scale medium] [--batch-size 500]
+
+Runs reconcile_batch over every wallet three times: a cold audit that
+replays each wallet's whole history and writes checkpoints, then the same
+audit after one day of new activity, which only replays rows past the
+checkpoints. Reports rows replayed, throughput and peak Python memory.
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from .harness import print_report, setup_django, test_database
+
+
+def audit(batch_size):
+    from apps.wallet.ledger import iter_wallet_batches, reconcile_batch
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    wallets = txs = mismatches = 0
+    for batch in iter_wallet_batches(batch_size):
+        result = reconcile_batch(batch)
+        wallets += result.wallets
+        txs += result.txs
+        mismatches += len(result.mismatches)
+    elapsed = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "wallets": wallets,
+        "txs_replayed": txs,
+        "mismatches": mismatches,
+        "seconds": round(elapsed, 2),
+        "txs_per_s": round(txs / elapsed) if elapsed else 0,
+        "peak_mib": round(peak / 2**20, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scale", default="medium")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.contrib.auth import get_user_model
+
+    from apps.wallet import ledger
+    from .seed import seed
+
+    with test_database():
+        counts = seed(args.scale, args.seed)
+        results = {"cold": audit(args.batch_size)}
+
+        rng = random.Random(args.seed)
+        students = list(get_user_model().objects.filter(is_staff=False))
+        for user in rng.sample(students, min(len(students), 300)):
+            ledger.debit(user, 100, ref="bench")
+        results["after one day"] = audit(args.batch_size)
+        results["idle"] = audit(args.batch_size)
+    print_report(f"wallet audit ({args.scale}: {counts['wallet_txs']} transactions)", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# config/database.py
+"""
+DATABASES built from the environment (.env is loaded by settings.py).
+
+    DB_ENGINE            sqlite (default) | postgresql
+    DB_NAME              SQLite file (relative to backend/) or PostgreSQL database
+    DB_USER / DB_PASSWORD / DB_HOST / DB_PORT     PostgreSQL only
+    DB_CONN_MAX_AGE      persistent connection lifetime in seconds (default 600)
+    DB_POOL              1 to use psycopg's connection pool (PostgreSQL, needs
+                         `pip install "psycopg[binary,pool]"`); DB_POOL_MIN_SIZE /
+                         DB_POOL_MAX_SIZE size it
+    DB_REPLICA_NAME      adds a "replica" alias (same engine/credentials)...
+    DB_REPLICA_HOST      ...optionally on another host
+
+With no DB_* variables this is the SQLite profile below and nothing changes.
+"""
+import os
+
+REPLICA = "replica"
+
+# SQLite tuned for concurrent use:
+#  - WAL: readers never wait for the writer, and commits don't fsync (synchronous=NORMAL)
+#  - IMMEDIATE transactions take the write lock at BEGIN, so a transaction
+#    that read first can't fail with "database is locked" when it tries to
+#    upgrade; it waits up to `timeout` seconds like any other writer
+#  - 128 MiB mmap and a ~20 MB page cache per connection
+#  - persistent connections (pragmas are paid once per connection, not per request)
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL;"
+    "PRAGMA synchronous=NORMAL;"
+    "PRAGMA mmap_size=134217728;"
+    "PRAGMA cache_size=-20000;"
+    "PRAGMA temp_store=MEMORY;"
+)
+
+
+def _flag(env, name):
+    return env.get(name, "").strip().lower() in ("1", "true", "yes", "on")
+
+
+def _sqlite(env, base_dir, name):
+    return {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": base_dir / name,
+        "OPTIONS": {
+            # seconds to wait for another writer (sets SQLite's busy_timeout)
+            "timeout": 20,
+            "transaction_mode": "IMMEDIATE",
+            "init_command": SQLITE_PRAGMAS,
+        },
+        "CONN_MAX_AGE": int(env.get("DB_CONN_MAX_AGE", 600)),
+        "CONN_HEALTH_CHECKS": True,
+    }
+
+
+def _postgresql(env, name, host):
+    options = {}
+    conn_max_age = int(env.get("DB_CONN_MAX_AGE", 600))
+    if _flag(env, "DB_POOL"):
+        options["pool"] = {
+            "min_size": int(env.get("DB_POOL_MIN_SIZE", 2)),
+            "max_size": int(env.get("DB_POOL_MAX_SIZE", 10)),
+        }
+        conn_max_age = 0   # the pool owns connection lifetime
+    return {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": name,
+        "USER": env.get("DB_USER", ""),
+        "PASSWORD": env.get("DB_PASSWORD", ""),
+        "HOST": host,
+        "PORT": env.get("DB_PORT", ""),
+        "OPTIONS": options,
+        "CONN_MAX_AGE": conn_max_age,
+        "CONN_HEALTH_CHECKS": True,
+    }
+
+
+def database_settings(base_dir, env=None):
+    env = os.environ if env is None else env
+    engine = env.get("DB_ENGINE", "sqlite").lower()
+    if engine in ("sqlite", "sqlite3"):
+        primary = _sqlite(env, base_dir, env.get("DB_NAME", "db.sqlite3"))
+        # file-backed so threaded tests get real SQLite locking (the default
+        # shared-cache in-memory DB fails fast with "database table is locked")
+        primary["TEST"] = {"NAME": base_dir / "test_db.sqlite3"}
+    elif engine in ("postgres", "postgresql"):
+        primary = _postgresql(env, env.get("DB_NAME", "smart_cafe"), env.get("DB_HOST", "localhost"))
+    else:
+        raise ValueError(f"Unsupported DB_ENGINE {engine!r}")
+
+    databases = {"default": primary}
+    replica_name = env.get("DB_REPLICA_NAME")
+    if replica_name:
+        if primary["ENGINE"].endswith("sqlite3"):
+            replica = _sqlite(env, base_dir, replica_name)
+        else:
+            replica = _postgresql(env, replica_name, env.get("DB_REPLICA_HOST", primary["HOST"]))
+        # tests run against the primary's test DB through the replica alias
+        replica["TEST"] = {"MIRROR": "default"}
+        databases[REPLICA] = replica
+    return databases
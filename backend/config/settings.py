@@ -12,9 +12,17 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 
+from corsheaders.defaults import default_headers
+from dotenv import load_dotenv
+
+from .database import database_settings
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# backend/.env (optional) fills in DB_* and other deployment settings
+load_dotenv(BASE_DIR / ".env")
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
@@ -53,18 +61,22 @@ INSTALLED_APPS = [
     'apps.orders',
     'apps.wallet',
     'apps.payments',
+    'apps.core',
 
 ]
 
 CORS_ALLOW_ALL_ORIGINS = True
+CORS_ALLOW_HEADERS = (*default_headers, "idempotency-key", "last-event-id")
 MIDDLEWARE = [
-    
+    'apps.core.instrumentation.RequestInstrumentationMiddleware',  # Server-Timing + query budgets (outermost)
+    'apps.core.compression.CompressionMiddleware',  # gzip/brotli for GET responses (see apps/core/compression.py)
     'corsheaders.middleware.CorsMiddleware',  # <-- add this first or near-first
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'apps.core.routers.ReplicaStickinessMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -92,11 +104,39 @@ WSGI_APPLICATION = 'config.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
+# Configured from DB_* environment variables (see config/database.py);
+# without them this is the tuned SQLite profile on db.sqlite3.
+DATABASES = database_settings(BASE_DIR)
+
+# Read-only views using ReplicaReadMixin read from the "replica" alias
+# when DB_REPLICA_NAME is set. After a user writes, their reads stay on the
+# primary for REPLICA_STICKY_SECONDS so they see their own changes.
+DATABASE_ROUTERS = ["apps.core.routers.PrimaryReplicaRouter"]
+REPLICA_STICKY_SECONDS = 5
+
+# Funnel short write transactions (checkout) through one writer thread
+# instead of letting writers contend on SQLite's lock (apps/core/writes.py).
+SQLITE_WRITE_QUEUE = False
+
+
+# Cache
+# Holds the catalog version counter and the serialized menu snapshot.
+# LocMem is per-process; point this at Redis/Memcached when running several
+# workers so they share one version counter and snapshot.
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'smart-cafe',
+    },
+    # daily order counters (apps/orders/quota.py): must not be culled, and
+    # must be shared (e.g. Redis) when running more than one worker
+    'quotas': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'smart-cafe-quotas',
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 1_000_000},
+    },
 }
 
 
@@ -145,9 +185,104 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # New stuff been added Below
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "apps.accounts.authentication.CachedTokenAuthentication",
     ],
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticated",
     ],
-}
\ No newline at end of file
+    # orjson when installed, same bytes as JSONRenderer (see apps/core/renderers.py)
+    "DEFAULT_RENDERER_CLASSES": [
+        "apps.core.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+}
+
+# Token auth cache (per process). Logout/deactivation invalidate locally;
+# other workers see it within AUTH_TOKEN_CACHE_TTL seconds.
+AUTH_TOKEN_CACHE_TTL = 60
+AUTH_TOKEN_CACHE_SIZE = 10_000
+# Token lifetime in seconds (None = never expires) and whether each login
+# replaces the previous token.
+AUTH_TOKEN_TTL = None
+AUTH_TOKEN_ROTATE_ON_LOGIN = False
+
+# Max SQL queries per request, by URL name. Over-budget requests are logged by
+# RequestInstrumentationMiddleware and fail QueryBudgetMixin assertions in tests.
+# Counts exclude BEGIN/COMMIT/SAVEPOINT and include token auth on a cache miss;
+# checkout also covers the first order of a day (quota rebuild and flush, slot
+# and rollup rows). Cart writes include touching Cart.updated_at, and cart,
+# my-orders and wallet reads the version stamp behind their ETag.
+QUERY_BUDGETS = {
+    "catalog-categories": 3,
+    "catalog-items": 2,
+    "catalog-search": 3,
+    "catalog-recommendations": 4,
+    "cart": 4,
+    "cart-items": 7,
+    "cart-item-detail": 5,
+    "cart-batch": 8,
+    "checkout": 23,
+    "pickup-slots": 4,
+    "my-orders": 4,
+    "order-reorder": 7,
+    "wallet": 3,
+    "wallet-topup": 8,
+    "wallet-transactions": 2,
+    "admin-dashboard": 6,
+    "admin-orders": 3,
+    "admin-kitchen-queue": 2,
+}
+# Warn when one statement repeats this often in a request (likely N+1)
+QUERY_REPEAT_WARNING = 5
+
+# /api/metrics: staff users, or a scraper sending `Bearer <METRICS_TOKEN>`
+# (METRICS_PUBLIC = True drops the check), and a shared directory when running
+# several worker processes (each flushes its totals there; empty it on deploy).
+METRICS_TOKEN = None
+METRICS_PUBLIC = False
+METRICS_MULTIPROCESS_DIR = None
+METRICS_FLUSH_INTERVAL = 1.0
+
+# Idempotency-Key records (checkout, top-up, cart add) are kept this many seconds
+IDEMPOTENCY_KEY_TTL = 24 * 60 * 60
+
+# Pub/sub behind /api/orders/events/ (SSE). The stream only works under ASGI
+# (config.asgi); under WSGI (runserver) it answers 503 and clients poll.
+ORDER_EVENTS_BACKEND = "apps.orders.events.InProcessBackend"
+
+# Pickup slots (apps.orders.slots): windows of PICKUP_SLOT_MINUTES between
+# open and close, each holding PICKUP_SLOT_CAPACITY "orders" or "items".
+PICKUP_SLOT_MINUTES = 15
+PICKUP_SLOT_CAPACITY = 30
+PICKUP_SLOT_UNIT = "orders"
+PICKUP_OPEN_TIME = "08:00"
+PICKUP_CLOSE_TIME = "20:00"
+# /api/orders/slots/ lists days from today up to this many days ahead
+PICKUP_BOOKING_DAYS = 7
+
+# /api/catalog/search/ index (apps/catalog/search.py): "memory" (prefix and
+# typo matching) or "fts5" (SQLite full-text, prefix matching only).
+CATALOG_SEARCH_BACKEND = "memory"
+
+# Daily order quota (apps/orders/quota.py). Members of a group listed in
+# DAILY_ORDER_LIMIT_BY_GROUP get that group's limit (None = unlimited).
+# Counters live in ORDER_QUOTA_STORE; OrderQuota is written behind in batches.
+DAILY_ORDER_LIMIT = 5
+DAILY_ORDER_LIMIT_BY_GROUP = {}
+ORDER_QUOTA_STORE = "apps.orders.quota.CacheCounterStore"
+ORDER_QUOTA_CACHE = "quotas"
+ORDER_QUOTA_FLUSH_BATCH = 500
+ORDER_QUOTA_FLUSH_INTERVAL = 5.0
+ORDER_QUOTA_GROUP_TTL = 60
+
+# CompressionMiddleware (apps/core/compression.py): GET responses smaller than
+# this many bytes go out uncompressed.
+COMPRESSION_MIN_SIZE = 1024
+
+# `manage.py build_recommendations`: popular items per pickup hour are counted
+# over this many days (apps/orders/recommendations.py).
+RECOMMENDATION_POPULARITY_DAYS = 28
+
+# `manage.py archive_orders` moves completed/cancelled orders older than this
+# many service days into ArchivedOrder (apps/orders/archive.py).
+ORDER_ARCHIVE_AFTER_DAYS = 90
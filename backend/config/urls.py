@@ -19,12 +19,15 @@ from django.contrib import admin
 from django.http import JsonResponse
 from django.urls import include, path
 
+from apps.core.views import metrics
+
 
 def root(_request):
     return JsonResponse({
         "service": "smart-cafe API",
         "links": {
             "health": "/api/healthz",
+            "metrics": "/api/metrics",
             "accounts": "/api/accounts/",
             "catalog": "/api/catalog/",
             "orders": "/api/orders/",
@@ -40,6 +43,7 @@ urlpatterns = [
     path("", root),                                          # <— adds a root response
     path("admin/", admin.site.urls),                         # Django Admin (back-office)
     path("api/healthz", healthz),
+    path("api/metrics", metrics, name="metrics"),
     path("api/accounts/", include("apps.accounts.urls")),
     path("api/catalog/", include("apps.catalog.urls")),
     path("api/orders/", include("apps.orders.urls")),
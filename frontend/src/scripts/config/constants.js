@@ -8,26 +8,39 @@ export const ENDPOINTS = {
   LOGOUT:       "/accounts/logout/",   // if you implemented it
   WALLET:         "/wallet/",
   WALLET_TOPUP:     "/wallet/topup/",
+  WALLET_TRANSACTIONS: "/wallet/transactions/",   // ?type=&from=&to=&cursor=
 
 
   MENU_CATEGORIES: "/catalog/categories/",   // ← we will use this key
   CART: "/orders/cart/",
   CART_ITEMS: "/orders/cart/items/",
+  CART_BATCH: "/orders/cart/batch/",   // several add/set/remove ops in one request
   CHECKOUT: "/orders/checkout/",
 
   // CATALOG (adjust if your URLs differ)
   CATEGORIES:   "/catalog/categories/",
   ITEMS:        "/catalog/items/",        // support ?category=ID, ?search=, etc.
+  MENU_SEARCH:  "/catalog/search/",       // ?q=&limit= (prefix + typo tolerant)
+  RECOMMENDATIONS: "/catalog/recommendations/",   // favorites, combos, popular now
 
 
   ORDERS: "/orders/orders",   // /api + this path => /api/orders/orders/
   ORDER_DETAIL: (id) => `/orders/${id}/`, // GET detail
+  ORDER_REORDER: (id) => `/orders/orders/${id}/reorder/`,   // POST: order lines -> cart
+  ORDER_EVENTS: "/orders/events/",   // Server-Sent Events: live order status (ASGI only)
+  ORDER_EVENTS_TICKET: "/orders/events/ticket/",   // POST: ?ticket= for ORDER_EVENTS, and whether it can stream
 
   // Admin endpoints
   ADMIN_DASHBOARD: "/orders/admin/dashboard/",
   ADMIN_ORDERS: "/orders/admin/orders/",
   ADMIN_ORDER_UPDATE: (id) => `/orders/admin/orders/${id}/`,
+  ADMIN_WALLET_EXPORT: "/wallet/admin/transactions/export/",   // CSV download
+  ADMIN_ORDERS_BULK_STATUS: "/orders/admin/orders/bulk-status/",
+  ADMIN_KITCHEN_QUEUE: "/orders/admin/kitchen/",   // ?minutes=30
   ADMIN_CATALOG_ITEMS: "/catalog/admin/items/",
+  ADMIN_CATALOG_IMPORT: "/catalog/admin/items/import/",            // JSON rows or text/csv, ?dry_run=1
+  ADMIN_CATALOG_BULK_UPDATE: "/catalog/admin/items/bulk-update/",
+  ADMIN_CATALOG_EXPORT: "/catalog/admin/items/export/",            // CSV, ?as=json
   ADMIN_CATALOG_CATEGORIES: "/catalog/admin/categories/",
 };
 
@@ -78,13 +78,42 @@ export async function renderCart() {
       : ''}
     <div style="display:flex;gap:10px;flex-wrap:wrap;margin-top:12px">
       <button id="clearCart" class="btn secondary">Clear Cart</button>
-      <a href="./checkout.html" class="btn">Proceed to Checkout</a>
+      <a id="toCheckout" href="./checkout.html" class="btn">Proceed to Checkout</a>
     </div>`;
 
   root.innerHTML = "";
   root.appendChild(list);
   root.appendChild(total);
 
+  // qty edits are sent together once the clicking stops: one POST /cart/batch/
+  const itemIdByLine = new Map(cart.items.map(ci => [ci.id, ci.item.id]));
+  const pendingQty = new Map(); // cart line id -> qty
+  let flushTimer;
+
+  function queueQty(lineId, qty) {
+    pendingQty.set(lineId, qty);
+    clearTimeout(flushTimer);
+    flushTimer = setTimeout(flushQty, 300);
+  }
+
+  // resolves false when the server refused the edits; the cart is then redrawn from the server
+  async function flushQty() {
+    clearTimeout(flushTimer);
+    if (!pendingQty.size) return true;
+    const lines = [...pendingQty.entries()];
+    pendingQty.clear();
+    const ops = lines.map(([lineId, qty]) => ({ op: "set", item_id: itemIdByLine.get(lineId), qty }));
+    try {
+      const snapshot = await OrderService.batchCart(ops, sessionStore.getToken());
+      lines.forEach(([lineId]) => refreshLineAndTotal(lineId, snapshot));
+      return true;
+    } catch (err) {
+      alert("Failed to update cart: " + (err?.message || err));
+      renderCart();
+      return false;
+    }
+  }
+
   // Wire actions
   root.addEventListener("click", async (e) => {
     const token = sessionStore.getToken();
@@ -92,6 +121,7 @@ export async function renderCart() {
       const id = Number(e.target.getAttribute("data-remove"));
       // Remove customization data
       customizationStore.remove(id);
+      pendingQty.delete(id); // don't bring it back with a queued qty change
       const snapshot = await OrderService.removeItem(id, token);
       return rerender(snapshot);
     }
@@ -99,16 +129,14 @@ export async function renderCart() {
       const id = Number(e.target.getAttribute("data-id"));
       const qtyEl = root.querySelector(`input.qty[data-id="${id}"]`);
       qtyEl.value = Number(qtyEl.value) + 1;
-      const snapshot = await OrderService.updateItem(id, Number(qtyEl.value), token);
-      return refreshLineAndTotal(id, snapshot);
+      return queueQty(id, Number(qtyEl.value));
     }
     if (e.target.classList.contains("dec")) {
       const id = Number(e.target.getAttribute("data-id"));
       const qtyEl = root.querySelector(`input.qty[data-id="${id}"]`);
       const next = Math.max(1, Number(qtyEl.value) - 1);
       qtyEl.value = next;
-      const snapshot = await OrderService.updateItem(id, next, token);
-      return refreshLineAndTotal(id, snapshot);
+      return queueQty(id, next);
     }
   });
 
@@ -116,11 +144,13 @@ export async function renderCart() {
     if (!e.target.classList.contains("qty")) return;
     const id = Number(e.target.getAttribute("data-id"));
     const qty = Math.max(1, Number(e.target.value || 1));
-    const snapshot = await OrderService.updateItem(id, qty, sessionStore.getToken());
-    refreshLineAndTotal(id, snapshot);
+    queueQty(id, qty);
   });
 
   document.getElementById("clearCart").addEventListener("click", async () => {
+    // drop queued qty edits, or they would put the lines back after the clear
+    clearTimeout(flushTimer);
+    pendingQty.clear();
     // Clear customization data
     cart.items.forEach(ci => {
       customizationStore.remove(ci.id);
@@ -129,6 +159,14 @@ export async function renderCart() {
     rerender(snapshot);
   });
 
+  // send the last qty edits before leaving, or checkout sees the old quantities
+  document.getElementById("toCheckout").addEventListener("click", async (e) => {
+    if (!pendingQty.size) return;
+    e.preventDefault();
+    const href = e.currentTarget.href;
+    if (await flushQty()) window.location.href = href;
+  });
+
   function refreshLineAndTotal(itemId, snapshot) {
     // Update the DOM from snapshot
     const found = snapshot.items.find(x => x.id === itemId);
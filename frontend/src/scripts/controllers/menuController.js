@@ -10,6 +10,8 @@ let allCategories = [];
 let allItems = [];
 let selectedCategory = "all";
 let searchQuery = "";
+let searchResultIds = null; // ranked ids from the server search, null = filter locally
+const SEARCH_LIMIT = 50; // the most /catalog/search/ returns in one response
 
 // Mock data structure for customization (to be replaced with backend data later)
 const getItemCustomizationData = (item) => {
@@ -113,8 +115,11 @@ function renderMenuItems() {
     filteredItems = filteredItems.filter(item => item.categoryId === Number(selectedCategory));
   }
   
-  // Filter by search query
-  if (searchQuery.trim()) {
+  // Filter by search query: server ranking when we have it, local match otherwise
+  if (searchQuery.trim() && searchResultIds) {
+    const byId = new Map(filteredItems.map(item => [item.id, item]));
+    filteredItems = searchResultIds.map(id => byId.get(id)).filter(Boolean);
+  } else if (searchQuery.trim()) {
     const query = searchQuery.toLowerCase();
     filteredItems = filteredItems.filter(item => 
       item.name.toLowerCase().includes(query) ||
@@ -195,6 +200,21 @@ function renderMenuItems() {
   });
 }
 
+async function searchMenu(query, token) {
+  const q = query.trim();
+  if (!q) return null;
+  try {
+    const res = await request(`${ENDPOINTS.MENU_SEARCH}?q=${encodeURIComponent(q)}&limit=${SEARCH_LIMIT}`,
+      "GET", null, token);
+    // a newer keystroke may have replaced the query while we waited
+    if (q !== searchQuery.trim()) return searchResultIds;
+    // a full page may be cut short: the local filter shows every match instead
+    return res.results.length < SEARCH_LIMIT ? res.results.map(item => item.id) : null;
+  } catch (err) {
+    return null; // fall back to the local filter
+  }
+}
+
 function setupEventListeners(token) {
   // Search input
   const searchInput = document.getElementById("searchInput");
@@ -202,7 +222,8 @@ function setupEventListeners(token) {
   searchInput.addEventListener("input", (e) => {
     searchQuery = e.target.value;
     clearTimeout(searchTimeout);
-    searchTimeout = setTimeout(() => {
+    searchTimeout = setTimeout(async () => {
+      searchResultIds = await searchMenu(searchQuery, token);
       renderMenuItems();
     }, 300); // Debounce search
   });
@@ -1,5 +1,6 @@
 import { sessionStore } from "../stores/sessionStore.js";
 import { OrdersQuery } from "../services/order.js";
+import { API_BASE, ENDPOINTS } from "../config/constants.js";
 
 const statusColors = {
   pending: "#f1c40f",
@@ -18,12 +19,50 @@ function badge(status){
   </span>`;
 }
 
+function orderCard(o){
+  const items = (o.items || []).map(i => `${i.item_name} × ${i.qty}`).join(", ");
+  const when = new Date(o.pickup_time).toLocaleString('en-AE', { timeZone: 'Asia/Dubai' });
+  const el = document.createElement("div");
+  el.className = "panel";
+  el.dataset.orderId = o.id;
+  el.innerHTML = `
+    <div style="display:flex;justify-content:space-between;gap:12px;align-items:flex-start;flex-wrap:wrap">
+      <div>
+        <h3 style="margin:0 0 6px 0">Order #${o.id}</h3>
+        <div>Pickup: <strong>${when}</strong></div>
+        <div style="opacity:.8;margin-top:4px">${items}</div>
+      </div>
+      <div style="text-align:right">
+        <div class="order-status">${badge(o.status)}</div>
+        <div style="margin-top:8px;font-size:18px;font-weight:700">${money(o.total_minor)}</div>
+      </div>
+    </div>`;
+  return el;
+}
+
+// Keyset-paginated history: fetch older orders on demand.
+function appendMoreButton(mount, list, next, token){
+  if (!next) return;
+  const btn = document.createElement("button");
+  btn.className = "btn";
+  btn.textContent = "Load older orders";
+  btn.addEventListener("click", async () => {
+    btn.disabled = true;
+    const page = await OrdersQuery.list(token, next);
+    page.results.forEach(o => list.appendChild(orderCard(o)));
+    btn.remove();
+    appendMoreButton(mount, list, page.next, token);
+  });
+  mount.appendChild(btn);
+}
+
 export async function renderOrders(){
   const token = sessionStore.getToken();
   const mount = document.getElementById("ordersContainer");
   mount.innerHTML = "<p>Loading orders…</p>";
 
-  const rows = await OrdersQuery.list(token);
+  const page = await OrdersQuery.list(token);
+  const rows = page.results;
   if (!rows.length){
     mount.innerHTML = `<div class="panel"><p>No orders yet.</p>
       <p><a class="btn" href="./menu.html">Order something</a></p></div>`;
@@ -32,26 +71,79 @@ export async function renderOrders(){
 
   const list = document.createElement("div");
   list.className = "grid";
-  rows.forEach(o=>{
-    const items = (o.items || []).map(i => `${i.item_name} × ${i.qty}`).join(", ");
-    const when = new Date(o.pickup_time).toLocaleString('en-AE', { timeZone: 'Asia/Dubai' });
-    const el = document.createElement("div");
-    el.className = "panel";
-    el.innerHTML = `
-      <div style="display:flex;justify-content:space-between;gap:12px;align-items:flex-start;flex-wrap:wrap">
-        <div>
-          <h3 style="margin:0 0 6px 0">Order #${o.id}</h3>
-          <div>Pickup: <strong>${when}</strong></div>
-          <div style="opacity:.8;margin-top:4px">${items}</div>
-        </div>
-        <div style="text-align:right">
-          <div>${badge(o.status)}</div>
-          <div style="margin-top:8px;font-size:18px;font-weight:700">${money(o.total_minor)}</div>
-        </div>
-      </div>`;
-    list.appendChild(el);
-  });
+  rows.forEach(o => list.appendChild(orderCard(o)));
 
   mount.innerHTML = "";
   mount.appendChild(list);
+  appendMoreButton(mount, list, page.next, token);
+  watchOrders(token);
+}
+
+// Live status updates: one long-lived SSE connection when the server can
+// stream (ASGI), otherwise the order list is polled (a 304 while unchanged).
+const POLL_MS = 15000;
+let orderEvents = null;
+let pollTimer = null;
+let watching = false;
+let lastEventId = null;
+
+function stopWatching(){
+  if (orderEvents) orderEvents.close();
+  clearInterval(pollTimer);
+  orderEvents = pollTimer = null;
+  watching = false;
+}
+
+function reloadOrders(){ stopWatching(); renderOrders(); }
+
+async function watchOrders(token){
+  if (watching) return;
+  watching = true;
+  let ticket = null;
+  try {
+    ticket = await OrdersQuery.eventsTicket(token);
+  } catch (err) {
+    // no ticket: poll instead
+  }
+  if (!ticket || !ticket.stream || !window.EventSource) return pollOrders(token);
+
+  // the ticket, not the API token, goes in the URL: EventSource can't send headers
+  const params = new URLSearchParams({ ticket: ticket.ticket });
+  if (lastEventId) params.set("last_event_id", lastEventId);
+  orderEvents = new EventSource(`${API_BASE.replace(/\/+$/, "")}${ENDPOINTS.ORDER_EVENTS}?${params}`);
+  orderEvents.addEventListener("order.updated", (e) => {
+    lastEventId = e.lastEventId;
+    const { order_id, status } = JSON.parse(e.data);
+    const el = document.querySelector(`[data-order-id="${order_id}"] .order-status`);
+    if (el) el.innerHTML = badge(status);
+  });
+  // new order, or a gap the server can't replay: reload the list
+  orderEvents.addEventListener("order.created", reloadOrders);
+  orderEvents.addEventListener("resync", reloadOrders);
+  // the browser retries a dropped stream by itself, but not once the server
+  // refuses it (an expired ticket): get a new ticket and resume from lastEventId
+  orderEvents.addEventListener("error", () => {
+    if (orderEvents.readyState !== EventSource.CLOSED) return;
+    stopWatching();
+    setTimeout(() => watchOrders(token), 3000);
+  });
+}
+
+function pollOrders(token){
+  pollTimer = setInterval(async () => {
+    let page;
+    try {
+      page = await OrdersQuery.list(token);
+    } catch (err) {
+      return; // try again next round
+    }
+    const first = document.querySelector("[data-order-id]");
+    if (page.results.length && (!first || Number(first.dataset.orderId) !== page.results[0].id)) {
+      return reloadOrders(); // a new order
+    }
+    page.results.forEach(o => {
+      const el = document.querySelector(`[data-order-id="${o.id}"] .order-status`);
+      if (el) el.innerHTML = badge(o.status);
+    });
+  }, POLL_MS);
 }
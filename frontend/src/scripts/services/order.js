@@ -11,6 +11,10 @@ export const OrderService = {
   updateItem(itemRowId, qty, token) {
     return request(`${ENDPOINTS.CART_ITEMS}${itemRowId}/`, "PATCH", { qty }, token);
   },
+  // ops: [{ op: "add" | "set" | "remove", item_id, qty }] -> cart snapshot
+  batchCart(ops, token) {
+    return request(ENDPOINTS.CART_BATCH, "POST", { ops }, token);
+  },
   removeItem(itemRowId, token) {
     return request(`${ENDPOINTS.CART_ITEMS}${itemRowId}/`, "DELETE", null, token);
   },
@@ -23,7 +27,12 @@ export const OrderService = {
 };
 
     export const OrdersQuery = {
-  list(token) {
-    return request(ENDPOINTS.ORDERS, "GET", null, token);
+  // `next` is the absolute URL the API returns for the following page
+  list(token, next = null) {
+    return request(next || ENDPOINTS.ORDERS, "GET", null, token);
+  },
+  // { ticket, expires_in, stream }: a short-lived ticket for the order event stream
+  eventsTicket(token) {
+    return request(ENDPOINTS.ORDER_EVENTS_TICKET, "POST", null, token);
   },
 };
\ No newline at end of file
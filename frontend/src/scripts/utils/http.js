@@ -10,7 +10,9 @@ export async function request(endpoint, method = "GET", data = null, token = nul
   const headers = { "Content-Type": "application/json", "Accept": "application/json" };
   if (token) headers["Authorization"] = `Token ${token}`;
 
-  const res = await fetch(joinUrl(API_BASE, endpoint), {
+  // absolute URLs (e.g. a paginated "next" link) are used as-is
+  const url = /^https?:\/\//.test(endpoint) ? endpoint : joinUrl(API_BASE, endpoint);
+  const res = await fetch(url, {
     method,
     headers,
     body: data ? JSON.stringify(data) : null,